@@ -2,6 +2,9 @@ import time
 from pathlib import Path
 import re
 
+from agent_skills.file_skills.frontmatter import split_body, status_line
+from agent_skills.file_skills.vault_writer import atomic_write
+
 DRAFTS_PATH = Path("../AI_Employee_Vault/Drafts")
 
 def draft_email_from_plan(plan_content: str) -> bool:
@@ -17,36 +20,36 @@ def draft_email_from_plan(plan_content: str) -> bool:
     try:
         DRAFTS_PATH.mkdir(exist_ok=True)
 
-        # Simple parsing logic. Assumes a structured plan.
-        to_match = re.search(r"To:\s*(.*)", plan_content)
-        subject_match = re.search(r"Subject:\s*(.*)", plan_content)
-        
-        # Find the body after the '---' separator
-        body_parts = plan_content.split("---", 1)
-        body = body_parts[1].strip() if len(body_parts) > 1 else "No body content found in plan."
+        # Recipient/subject from the frontmatter, else from To:/Subject: lines
+        fm, rest = split_body(plan_content)
+        to_match = re.search(r"To:\s*(.*)", rest)
+        subject_match = re.search(r"Subject:\s*(.*)", rest)
+        recipient = fm.recipient or (to_match.group(1).strip() if to_match else None)
+        subject = fm.subject or (subject_match.group(1).strip() if subject_match else None)
 
-        if not to_match or not subject_match:
+        # The body follows a '---' separator after the header lines; without
+        # one, everything after the frontmatter is the body
+        body_parts = rest.split("---", 1)
+        body = (body_parts[1] if len(body_parts) > 1 else rest).strip() or "No body content found in plan."
+
+        if not recipient or not subject:
             print("ERROR: Could not parse To/Subject from plan.")
             return False
-
-        recipient = to_match.group(1).strip()
-        subject = subject_match.group(1).strip()
         
         timestamp = time.strftime("%Y%m%d%H%M%S")
         draft_filename = f"DRAFT_EMAIL_{timestamp}.md"
         draft_path = DRAFTS_PATH / draft_filename
 
+        # Padded so the approved/failed transitions rewrite the status in place
         draft_frontmatter = f"""---
-status: draft
-recipient: {recipient}
+{status_line("draft")}recipient: {recipient}
 subject: "{subject}"
 ---
 
 """
         draft_content = draft_frontmatter + body
 
-        with open(draft_path, 'w', encoding='utf-8') as f:
-            f.write(draft_content)
+        atomic_write(draft_path, draft_content)
         
         print(f"Successfully created email draft: {draft_path}")
         return True
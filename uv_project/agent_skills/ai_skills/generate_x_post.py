@@ -1,67 +1,185 @@
-import subprocess
 import re
-import sys
-from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List, Union
 
-import subprocess
-import os
-import tempfile
-import sys
-from pathlib import Path
+from agent_skills import metrics
+from agent_skills.llm import complete, structured, extract_json, get_cache, model_key, LLMBackendError, LLMParseError
+from agent_skills.llm.reducer import reduce_content
 
-def generate_x_post(context: str) -> str:
+# Bump whenever the post prompt changes to invalidate cached posts
+X_POST_TEMPLATE_VERSION = "3"
+
+X_POST_MAX_CHARS = 50
+# Candidates requested per call; the best one is picked locally
+X_POST_CANDIDATES = 5
+
+# Pictographs, dingbats, flags and variation selectors
+EMOJI_RE = re.compile(
+    "[\U0001F000-\U0001FAFF\U00002600-\U000027BF\U0001F1E6-\U0001F1FF\U00002B00-\U00002BFF\uFE0F\u200D]"
+)
+HASHTAG_RE = re.compile(r"(?<!\w)#\w+")
+# Leading list markers such as "1.", "2)", "-" or "*"
+LIST_MARKER_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+# Chatter around the posts: "Here are five posts:", "Sure!", "Option 2", "Post 3:"
+META_LINE_RE = re.compile(
+    r"^(?:here(?:'s| is| are)\b|sure\b|okay\b|certainly\b|(?:option|post|candidate)\s*#?\d+\b)",
+    re.IGNORECASE
+)
+
+X_POST_SCHEMA = {"type": "array", "items": {"type": "string"}}
+
+
+@dataclass
+class Candidate:
+    """One proposed post and the constraints it breaks."""
+    text: str
+    violations: List[str] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        return not self.violations
+
+
+def check_post(text: str) -> Candidate:
+    violations = []
+    if not text:
+        violations.append("empty")
+    if len(text) > X_POST_MAX_CHARS:
+        violations.append("too_long")
+    if EMOJI_RE.search(text):
+        violations.append("emoji")
+    if HASHTAG_RE.search(text):
+        violations.append("hashtag")
+    return Candidate(text, violations)
+
+
+def clean_post(line: str) -> str:
+    """Strip list markers, quotes and markdown noise from one output line."""
+    line = LIST_MARKER_RE.sub("", line.strip())
+    return line.strip("*`").strip('"').strip("'").strip()
+
+
+def is_meta(text: str) -> bool:
+    """True for preamble and labels around the posts rather than a post itself."""
+    return text.endswith(":") or bool(META_LINE_RE.match(text))
+
+
+def parse_candidates(output: Union[str, List[str]]) -> List[Candidate]:
+    """Candidates from a JSON array of strings, else one per non-empty line.
+
+    Meta lines (see ``is_meta``) and duplicates are dropped.
     """
-    Generates an ultra-short X post (max 50 chars) using CCR (Claude Code Router).
-    Constraints: Professional builder voice, no emojis, no hashtags, no sales fluff.
+    if isinstance(output, str):
+        try:
+            value = extract_json(output)
+        except LLMParseError:
+            value = None
+        lines = value if isinstance(value, list) else output.splitlines()
+    else:
+        lines = output
+    seen = set()
+    candidates = []
+    for line in lines:
+        if not isinstance(line, str):
+            continue
+        text = clean_post(line)
+        if text and text not in seen and not is_meta(text):
+            seen.add(text)
+            candidates.append(check_post(text))
+    return candidates
+
+
+def pick_best(candidates: List[Candidate]):
+    """The longest valid candidate (most said within the limit), or None."""
+    valid = [c for c in candidates if c.valid]
+    return max(valid, key=lambda c: len(c.text)) if valid else None
+
+
+def generate_x_post_candidates(context: str, n: int = X_POST_CANDIDATES) -> List[Candidate]:
+    """
+    Asks for ``n`` candidate posts in a single LLM call and returns them all,
+    each annotated with the constraints it breaks.
     """
-    prompt = f"""Task: Write a punchy X post based on the CONTEXT below.
-    
-    CONSTRAINTS:
-    - MAXIMUM 50 CHARACTERS (including spaces).
+    prompt = f"""Task: Write {n} different punchy X posts based on the CONTEXT below.
+
+    CONSTRAINTS (for every post):
+    - MAXIMUM {X_POST_MAX_CHARS} CHARACTERS (including spaces).
     - Tone: Professional, direct, builder-focused.
     - NO emojis.
     - NO hashtags.
     - NO salesy language.
-    
+
     CONTEXT:
     {context}
-    
-    Output ONLY binary content of the post. No JSON, no markdown, just the text.
+
+    Output ONLY a JSON array of {n} strings, one post per string. No numbering, no markdown.
     """
+    try:
+        posts = structured(prompt, X_POST_SCHEMA, skill="x_post")
+    except LLMParseError as e:
+        # Still not an array after the repair: salvage the lines of the raw answer
+        posts = e.text
+    return parse_candidates(posts)
 
-    # We might need multiple attempts if Claude exceeds 50 chars
-    for attempt in range(2):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as tmp:
-            tmp.write(prompt)
-            tmp_path = tmp.name
-        
-        try:
-            result = subprocess.run(
-                ['cmd', '/c', 'ccr', 'code', '--print', tmp_path],
-                capture_output=True,
-                text=True,
-                shell=False,
-                stdin=subprocess.DEVNULL
-            )
-            
-            post = result.stdout.strip()
-            # Clean up potential markdown or noise
-            post = post.strip('"').strip("'").split('\n')[0].strip()
-            
-            if 0 < len(post) <= 50:
-                return post
-            
-            # If too long, tighten the prompt
-            prompt = f"SHORTEN THIS TO UNDER 50 CHARACTERS: {post}\nOutput ONLY the text."
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-
-    # Final fallback: just truncate
-    return post[:47] + "..." if post and len(post) > 50 else (post or "Automation loop active.")
+def generate_x_post(context: str) -> str:
+    """
+    Generates an ultra-short X post (max 50 chars) using CCR (Claude Code Router).
+    Constraints: Professional builder voice, no emojis, no hashtags, no sales fluff.
+    """
+    context = reduce_content(context, "x_post").text
+    try:
+        return get_cache().get_or_compute(
+            "x_post", X_POST_TEMPLATE_VERSION, context, lambda: _generate_x_post(context),
+            model=model_key("x_post")
+        )
+    except LLMBackendError:
+        return "Automation loop active."
+
+def _generate_x_post(context: str) -> str:
+    metrics.incr("x_post.calls")
+    candidates = []
+    try:
+        candidates = generate_x_post_candidates(context)
+    except LLMBackendError as e:
+        print(f"ERROR: generate_x_post candidate call failed: {e}")
+
+    best = pick_best(candidates)
+    metrics.incr("x_post.candidates", len(candidates))
+    metrics.incr("x_post.valid_candidates", sum(1 for c in candidates if c.valid))
+    if best:
+        return best.text
+
+    # Last resort: ask once more, tightening the shortest candidate we got
+    metrics.incr("x_post.retries")
+    shortest = min(candidates, key=lambda c: len(c.text)).text if candidates else ""
+    if shortest:
+        prompt = (f"SHORTEN THIS TO UNDER {X_POST_MAX_CHARS} CHARACTERS, no emojis, no hashtags: "
+                  f"{shortest}\nOutput ONLY the text.")
+    else:
+        prompt = (f"Write one X post of at most {X_POST_MAX_CHARS} characters, no emojis, "
+                  f"no hashtags, about:\n{context}\nOutput ONLY the text.")
+    try:
+        retry = parse_candidates(complete(prompt, skill="x_post"))
+    except LLMBackendError as e:
+        print(f"ERROR: generate_x_post retry failed: {e}")
+        retry = []
+
+    best = pick_best(retry)
+    if best:
+        return best.text
+    post = (retry or candidates or [None])[0]
+    if post is None:
+        raise LLMBackendError("generate_x_post: no output from any attempt")
+
+    # Final fallback: strip what breaks the rules and truncate
+    metrics.incr("x_post.truncated")
+    text = HASHTAG_RE.sub("", EMOJI_RE.sub("", post.text)).strip()
+    return text[:X_POST_MAX_CHARS - 3] + "..." if len(text) > X_POST_MAX_CHARS else text
 
 if __name__ == "__main__":
     test_context = "I just finished implementing a modular skill-based architecture for an AI employee system. It uses Claude for brains and Playwright for muscles."
     print(f"Testing generate_x_post...")
+    for candidate in generate_x_post_candidates(test_context):
+        print(f"  candidate ({len(candidate.text)} chars, {', '.join(candidate.violations) or 'ok'}): {candidate.text}")
     post = generate_x_post(test_context)
     print(f"Generated ({len(post)} chars): {post}")
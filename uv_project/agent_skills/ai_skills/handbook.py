@@ -0,0 +1,34 @@
+import os
+from pathlib import Path
+from typing import Optional
+
+VAULT = Path(__file__).resolve().parents[3] / "AI_Employee_Vault"
+# Obsidian saved the handbook with a doubled extension, so accept both names
+HANDBOOK_CANDIDATES = [
+    Path(os.environ["COMPANY_HANDBOOK"]) if os.environ.get("COMPANY_HANDBOOK") else None,
+    VAULT / "Company_Handbook.md",
+    VAULT / "Company_Handbook.md.md",
+]
+
+_cache = {"path": None, "mtime": None, "text": None}
+
+def handbook_context() -> Optional[str]:
+    """
+    Returns the Company_Handbook.md text wrapped as a prompt block, or None
+    if no handbook exists. The file is only re-read when its mtime changes so
+    the block stays byte-identical between calls and can be prompt-cached.
+    """
+    for path in HANDBOOK_CANDIDATES:
+        if path is None:
+            continue
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            continue
+        if _cache["path"] != path or _cache["mtime"] != mtime:
+            text = path.read_text(encoding="utf-8", errors="replace").strip()
+            _cache.update(path=path, mtime=mtime, text=text)
+        if not _cache["text"]:
+            return None
+        return f"COMPANY HANDBOOK (context for every decision):\n{_cache['text']}"
+    return None
@@ -1,55 +1,144 @@
-import subprocess
-import os
-import tempfile
-from pathlib import Path
 import re
+from pathlib import Path
+from typing import Optional
+
+from agent_skills import metrics
+from agent_skills.ai_skills.handbook import handbook_context
+from agent_skills.file_skills.frontmatter import read_frontmatter, status_line
+from agent_skills.file_skills.write_md import write_md
+from agent_skills.llm.reducer import reduce_content
+from agent_skills.llm import stream, get_cache, model_key, prefix_digest, LLMBackendError
 
-def plan_email(email_md: str) -> str:
-    prompt = f"""
-You are an AI employee.
-Read this email and create a Plan.md. The plan should be formatted as a markdown document with the following sections:
-- Intent: [One sentence describing the primary goal based on the email]
+# Bump whenever the Plan.md prompt changes to invalidate cached plans
+PLAN_TEMPLATE_VERSION = "2"
+
+PLAN_FORMAT = """- Intent: [One sentence describing the primary goal based on the email]
 - Proposed Action: [Numbered list of concrete steps the AI Employee would take]
 - Draft Response: [A draft email or message to the sender, with placeholders for information not yet available]
-- status: awaiting_approval
+- status: awaiting_approval"""
+
+# Frontmatter status of a plan whose sections are still streaming in
+GENERATING_STATUS = "generating"
 
-Output ONLY the markdown content for the Plan.md, ensuring it adheres strictly to the requested format and includes no conversational text or explanations.
+# Static Plan.md format, sent as a cacheable prefix ahead of the email
+PLAN_INSTRUCTIONS = f"""You are an AI employee.
+Read the email given after these instructions and create a Plan.md. The plan should be formatted as a markdown document with the following sections:
+{PLAN_FORMAT}
 
-EMAIL:
+Output ONLY the markdown content for the Plan.md, ensuring it adheres strictly to the requested format and includes no conversational text or explanations."""
+
+# A line that opens one of the Plan.md sections
+SECTION_RE = re.compile(
+    r'^\s*(?:\d+\.\s*)?(?:[-*]\s*)?(?:#+\s*)?(?:\*\*)?(Intent|Proposed Action|Draft Response|status)\b',
+    re.IGNORECASE
+)
+# "priority: high" in the item's frontmatter picks the model tier
+PRIORITY_RE = re.compile(r'^priority:\s*"?(\w+)', re.MULTILINE | re.IGNORECASE)
+# The last line of a plan; generation is cancelled as soon as it appears
+STATUS_RE = re.compile(r'^\s*(?:[-*]\s*)?status:\s*awaiting_approval', re.MULTILINE | re.IGNORECASE)
+
+def plan_prefix() -> list:
+    """Static prompt blocks shared by every planning call."""
+    handbook = handbook_context()
+    return [handbook, PLAN_INSTRUCTIONS] if handbook else [PLAN_INSTRUCTIONS]
+
+def plan_path_for(item_path: Path) -> Path:
+    """Location of the Plan.md that belongs to a Needs_Action item."""
+    return item_path.parent / f"PLAN_{item_path.stem}.md"
+
+def plan_complete(plan_path: Path) -> bool:
+    """True if a finished plan exists at ``plan_path`` (not one still being generated)."""
+    try:
+        return plan_path.stat().st_size > 0 and read_frontmatter(plan_path).status != GENERATING_STATUS
+    except OSError:
+        return False
+
+def in_progress(plan: str) -> str:
+    """A partial plan, marked so that nothing mistakes it for a finished one."""
+    return f"---\n{status_line(GENERATING_STATUS)}---\n\n{plan}"
+
+def plan_email(email_md: str, out_path: Optional[Path] = None) -> str:
+    """
+    Drafts a Plan.md for an email.
+
+    The model output is streamed: with ``out_path`` every finished section is
+    written to the plan file as soon as it arrives, marked ``status:
+    generating``, and generation is cancelled the moment the closing ``status:
+    awaiting_approval`` line is emitted. Only then is the real plan written.
+    Returns "" (and removes the partial plan) if no complete plan was produced.
+    """
+    email_md = reduce_content(email_md, "plan_email").text
+    priority = PRIORITY_RE.search(email_md)
+    priority = priority.group(1) if priority else None
+    prompt = f"""EMAIL:
 {email_md}
 """
-    
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as tmp:
-        tmp.write(prompt)
-        tmp_path = tmp.name
-    
+
+    prefix = plan_prefix()
     try:
-        result = subprocess.run(
-            ['cmd', '/c', 'ccr', 'code', '--print', tmp_path],
-            capture_output=True,
-            text=True,
-            shell=False,
-            stdin=subprocess.DEVNULL
+        full_output = get_cache().get_or_compute(
+            "plan_email",
+            f"{PLAN_TEMPLATE_VERSION}-{prefix_digest(prefix)}",
+            email_md,
+            lambda: stream_plan(prompt, prefix, out_path, priority),
+            model=model_key("plan_email", priority)
         )
-        full_output = result.stdout.strip()
-
-        # Try to find content starting from "1. **Intent**" or "Intent:"
-        plan_start_match = re.search(r'(^1\.\s*\*\*Intent\*\*|^\s*Intent:)', full_output, re.MULTILINE | re.IGNORECASE)
-        if plan_start_match:
-            # Extract from that point onwards
-            extracted_plan = full_output[plan_start_match.start():].strip()
-            # Then, try to find the "status: awaiting_approval" at the end of this extracted plan
-            status_match = re.search(r'^status:\s*awaiting_approval.*', extracted_plan, re.MULTILINE | re.IGNORECASE)
-            if status_match:
-                # If status is found, return the extracted plan up to and including the status line
-                return extracted_plan[:status_match.end()].strip()
-            else:
-                # If status not found, return the whole extracted block and let brain_loop decide
-                return extracted_plan
-        
-        # Fallback: if no clear plan start is found, return the entire output
-        return full_output
-
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+    except LLMBackendError as e:
+        print(f"ERROR: plan_email failed: {e}")
+        if out_path is not None and out_path.exists() and not plan_complete(out_path):
+            out_path.unlink()
+        return ""
+
+    plan = extract_plan(full_output)
+    if out_path is not None:
+        write_md(out_path, plan)
+    return plan
+
+def stream_plan(
+    prompt: str, prefix: list, out_path: Optional[Path] = None, priority: Optional[str] = None
+) -> str:
+    """Streams a plan from the LLM, writing finished sections to ``out_path``."""
+    output = ""
+    scanned = 0  # offset of the first line not yet checked for a section heading
+    with stream(prompt, prefix=prefix, skill="plan_email", priority=priority) as handle:
+        for chunk in handle:
+            output += chunk
+            if STATUS_RE.search(output):
+                metrics.incr("plan_email.early_stops")
+                break
+            if out_path is None:
+                continue
+            # A new heading means every section before it is complete
+            while True:
+                newline = output.find("\n", scanned)
+                if newline == -1:
+                    break
+                if scanned and SECTION_RE.match(output[scanned:newline]):
+                    write_md(out_path, in_progress(extract_plan(output[:scanned])))
+                scanned = newline + 1
+
+    if not output.strip():
+        raise LLMBackendError("plan_email: LLM returned empty output")
+    if not STATUS_RE.search(output):
+        # Raised inside the cache's compute step, so a cut-off plan is never cached
+        raise LLMBackendError("plan_email: output ended before the status line")
+    return output
+
+def extract_plan(full_output: str) -> str:
+    """Trims model output down to the Plan.md body (Intent ... status line)."""
+    # Try to find content starting from "1. **Intent**" or "Intent:"
+    plan_start_match = re.search(r'(^1\.\s*\*\*Intent\*\*|^\s*Intent:)', full_output, re.MULTILINE | re.IGNORECASE)
+    if plan_start_match:
+        # Extract from that point onwards
+        extracted_plan = full_output[plan_start_match.start():].strip()
+        # Then, try to find the "status: awaiting_approval" at the end of this extracted plan
+        status_match = re.search(r'^status:\s*awaiting_approval.*', extracted_plan, re.MULTILINE | re.IGNORECASE)
+        if status_match:
+            # If status is found, return the extracted plan up to and including the status line
+            return extracted_plan[:status_match.end()].strip()
+        else:
+            # If status not found, return the whole extracted block and let brain_loop decide
+            return extracted_plan
+
+    # Fallback: if no clear plan start is found, return the entire output
+    return full_output
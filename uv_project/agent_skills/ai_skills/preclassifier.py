@@ -0,0 +1,331 @@
+"""Local triage pre-classifier.
+
+A multinomial naive Bayes model over hashed token features that learns how
+past Inbox items were triaged. It is trained from where notes ended up
+(``Needs_Action/``, or ``Done/`` next to a ``PLAN_`` file once the worker
+archived them, vs plain ``Done/``), their frontmatter, the ``[Category] ...
+(Priority: x)`` lines in Dashboard.md, and every verdict the LLM returns
+afterwards. Notes that were routed by the fallback verdict are skipped.
+When it is confident enough, process_file_with_claude uses its verdict and
+skips the LLM call entirely.
+
+The model is saved on a background thread at most every ``SAVE_INTERVAL``
+seconds. The content digests it remembers are capped at
+``PRECLASSIFIER_MAX_SEEN`` (least recently seen dropped first), and the vault
+file signatures are pruned to the files still in the vault on every scan.
+"""
+
+import atexit
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from agent_skills import metrics
+
+PRECLASSIFIER_ENABLED = os.environ.get("PRECLASSIFIER", "1") != "0"
+PRECLASSIFIER_PATH = Path(os.environ.get(
+    "PRECLASSIFIER_PATH", Path(__file__).resolve().parents[2] / "preclassifier.json"
+))
+# Minimum posterior of the predicted destination before the LLM is skipped
+PRECLASSIFIER_THRESHOLD = float(os.environ.get("PRECLASSIFIER_THRESHOLD", "0.97"))
+# The model stays silent until it has seen at least this many labelled notes
+PRECLASSIFIER_MIN_DOCS = int(os.environ.get("PRECLASSIFIER_MIN_DOCS", "20"))
+# How many content digests are remembered to avoid learning the same note twice
+PRECLASSIFIER_MAX_SEEN = int(os.environ.get("PRECLASSIFIER_MAX_SEEN", "50000"))
+
+VAULT = Path(__file__).resolve().parents[3] / "AI_Employee_Vault"
+N_FEATURES = 1 << 18
+MAX_TOKENS = 400
+# Notes with fewer known features than this share are left to the LLM
+MIN_KNOWN_FEATURES = 0.5
+SAVE_INTERVAL = 10  # seconds
+# Bumped when the training data changes meaning; older saved models are discarded
+MODEL_VERSION = 2
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9'@._-]+")
+DASHBOARD_RE = re.compile(r"^- \[(\w+)\] (.+?): .* \(Priority: (\w+)\)\s*$")
+
+
+def features(content: str, name: str = "") -> List[int]:
+    """Hashed bag-of-words plus frontmatter and filename features."""
+    tokens = []
+    lines = content.splitlines()
+    if lines and lines[0].strip() == "---":
+        for line in lines[1:]:
+            if line.strip() == "---":
+                break
+            if ":" in line:
+                key, val = line.split(":", 1)
+                key = key.strip().lower()
+                if key in ("type", "source", "from"):
+                    tokens.append(f"fm:{key}={val.strip().lower()[:40]}")
+    if name:
+        stem = Path(name).stem.lower()
+        tokens.append(f"name:{re.split(r'[_0-9]', stem)[0]}")
+        tokens.append(f"ext:{Path(name).suffix.lower()}")
+    tokens.extend(TOKEN_RE.findall(content.lower())[:MAX_TOKENS])
+    return [zlib.crc32(t.encode("utf-8")) % N_FEATURES for t in tokens]
+
+
+class _Head:
+    """One naive Bayes classifier (destination, category or priority)."""
+
+    def __init__(self, data: Optional[dict] = None):
+        data = data or {}
+        self.docs: Dict[str, int] = data.get("docs", {})
+        self.totals: Dict[str, int] = data.get("totals", {})
+        self.counts: Dict[str, Dict[str, int]] = data.get("counts", {})
+        self.vocab = {f for c in self.counts.values() for f in c}
+
+    def to_dict(self) -> dict:
+        return {"docs": self.docs, "totals": self.totals, "counts": self.counts}
+
+    def learn(self, feats: List[int], label: str):
+        counts = self.counts.setdefault(label, {})
+        for f in feats:
+            key = str(f)
+            self.vocab.add(key)
+            counts[key] = counts.get(key, 0) + 1
+        self.docs[label] = self.docs.get(label, 0) + 1
+        self.totals[label] = self.totals.get(label, 0) + len(feats)
+
+    def predict(self, feats: List[int]) -> Tuple[Optional[str], float]:
+        total_docs = sum(self.docs.values())
+        if not total_docs:
+            return None, 0.0
+        # Unseen features carry no evidence but would still skew the scores
+        # towards the class with the fewest training tokens, so drop them.
+        known = [f for f in feats if str(f) in self.vocab]
+        if not feats or len(known) < MIN_KNOWN_FEATURES * len(feats):
+            return None, 0.0
+        feats = known
+        vocab = max(len(self.vocab), 1)
+        scores = {}
+        for label, n_docs in self.docs.items():
+            counts = self.counts.get(label, {})
+            denom = self.totals.get(label, 0) + vocab
+            score = math.log(n_docs / total_docs)
+            for f in feats:
+                score += math.log((counts.get(str(f), 0) + 1) / denom)
+            scores[label] = score
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        norm = sum(math.exp(s - top) for s in scores.values())
+        return best, 1.0 / norm
+
+    @property
+    def n_docs(self) -> int:
+        return sum(self.docs.values())
+
+
+class PreClassifier:
+    """Incrementally trained local classifier for Inbox triage verdicts."""
+
+    def __init__(self, path: Path = PRECLASSIFIER_PATH, threshold: float = PRECLASSIFIER_THRESHOLD):
+        self.path = Path(path)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._saving = False
+        self._last_save = 0.0
+        data = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not load pre-classifier model. Starting fresh. Error: {e}")
+        if data.get("version") != MODEL_VERSION:
+            data = {}
+        self.heads = {
+            name: _Head(data.get(name)) for name in ("destination", "category", "priority")
+        }
+        self.seen: "OrderedDict[str, None]" = OrderedDict.fromkeys(data.get("seen", []))
+        self.files = set(data.get("files", []))
+
+    def learn(self, content: str, verdict: dict, name: str = "") -> bool:
+        """Add one labelled note; returns False if this content was already learned."""
+        digest = hashlib.blake2b(content.encode("utf-8"), digest_size=12).hexdigest()
+        feats = features(content, name)
+        with self._lock:
+            if digest in self.seen:
+                self.seen.move_to_end(digest)
+                return False
+            self.seen[digest] = None
+            if len(self.seen) > PRECLASSIFIER_MAX_SEEN:
+                self.seen.popitem(last=False)
+            for head, value in verdict.items():
+                if head in self.heads and value:
+                    self.heads[head].learn(feats, str(value))
+            self._dirty = True
+        self.maybe_save()
+        return True
+
+    def classify(self, content: str, name: str = "") -> Optional[dict]:
+        """Return a full triage verdict, or None if the model is not confident."""
+        feats = features(content, name)
+        with self._lock:
+            destination = self.heads["destination"]
+            if destination.n_docs < PRECLASSIFIER_MIN_DOCS:
+                return None
+            dest, confidence = destination.predict(feats)
+            if dest is None or confidence < self.threshold:
+                return None
+            category, _ = self.heads["category"].predict(feats)
+            priority, _ = self.heads["priority"].predict(feats)
+        return {
+            "category": category or "Note",
+            "summary": f"Auto-triaged locally: {summarize(content)}",
+            "action_needed": dest == "Needs_Action",
+            "priority": priority or ("medium" if dest == "Needs_Action" else "low"),
+            "destination": dest,
+            "confidence": round(confidence, 4),
+        }
+
+    def train_from_vault(self, vault_path: Path = VAULT) -> int:
+        """Learn from every note already filed in Done/ and Needs_Action/.
+
+        Notes are reduced with ``read_for_triage`` first, so the features match
+        what ``classify`` sees at triage time. Signatures of notes that are no
+        longer in the vault are forgotten.
+        """
+        # Imported here: process_file imports this module
+        from agent_skills.file_skills.process_file import read_for_triage
+
+        labels, fallbacks = _dashboard_labels(vault_path / "Dashboard.md")
+        learned = 0
+        current: Set[str] = set()
+        for folder in ("Done", "Needs_Action"):
+            directory = vault_path / folder
+            if not directory.is_dir():
+                continue
+            entries = list(os.scandir(directory))
+            names = {entry.name for entry in entries}
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith(("PLAN_", "DRAFT_")):
+                    continue
+                if entry.name in fallbacks:
+                    continue  # its folder says nothing about the content
+                stat = entry.stat()
+                signature = f"{folder}/{entry.name}:{stat.st_size}:{int(stat.st_mtime)}"
+                current.add(signature)
+                if signature in self.files:
+                    continue
+                content = read_for_triage(entry.path)
+                if not content.strip():
+                    continue
+                # Handled actionable items are archived into Done/ with their plan
+                if folder == "Needs_Action" or f"PLAN_{Path(entry.name).stem}.md" in names:
+                    verdict = {"destination": "Needs_Action"}
+                else:
+                    verdict = {"destination": "Done"}
+                if entry.name in labels:
+                    verdict["category"], verdict["priority"] = labels[entry.name]
+                if self.learn(content, verdict, entry.name):
+                    learned += 1
+        with self._lock:
+            if current != self.files:
+                self.files = current
+                self._dirty = True
+        self.save()
+        return learned
+
+    def maybe_save(self):
+        """Save on a background thread if there are changes and the last save is old enough."""
+        with self._lock:
+            if not self._dirty or self._saving or time.time() - self._last_save <= SAVE_INTERVAL:
+                return
+            self._saving = True
+        threading.Thread(target=self._save_in_background, name="preclassifier-save", daemon=True).start()
+
+    def _save_in_background(self):
+        try:
+            self.save()
+        except OSError as e:
+            print(f"Warning: Could not save pre-classifier model. Error: {e}")
+        finally:
+            with self._lock:
+                self._saving = False
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {name: head.to_dict() for name, head in self.heads.items()}
+                data["seen"] = list(self.seen)
+                data["files"] = sorted(self.files)
+                data["version"] = MODEL_VERSION
+                payload = json.dumps(data)
+                self._dirty = False
+                self._last_save = time.time()
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(payload, encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+
+def summarize(content: str, limit: int = 100) -> str:
+    """Subject line or first line of the body, for locally triaged notes."""
+    subject = re.search(r"^(?:subject|title):\s*\"?(.+?)\"?\s*$", content, re.MULTILINE | re.IGNORECASE)
+    if subject:
+        return subject.group(1)[:limit]
+    body = content.split("---", 2)[-1] if content.lstrip().startswith("---") else content
+    for line in body.splitlines():
+        line = line.strip(" #*-\t")
+        if line:
+            return line[:limit]
+    return "(empty note)"
+
+
+def _dashboard_labels(dashboard: Path) -> Tuple[Dict[str, Tuple[str, str]], Set[str]]:
+    """(category, priority) per note name, and the names routed by a fallback verdict."""
+    labels: Dict[str, Tuple[str, str]] = {}
+    fallbacks: Set[str] = set()
+    try:
+        lines = dashboard.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return labels, fallbacks
+    for line in lines:
+        match = DASHBOARD_RE.match(line)
+        if not match:
+            continue
+        name = match.group(2)
+        if "Unable to" in line:
+            labels.pop(name, None)
+            fallbacks.add(name)
+        else:
+            labels[name] = (match.group(1), match.group(3).lower())
+            fallbacks.discard(name)
+    return labels, fallbacks
+
+
+_classifier: Optional[PreClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_preclassifier() -> Optional[PreClassifier]:
+    """Return the shared pre-classifier (trained from the vault on first use), or None if disabled."""
+    global _classifier
+    if not PRECLASSIFIER_ENABLED:
+        return None
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = PreClassifier()
+            learned = _classifier.train_from_vault()
+            if learned:
+                print(f"Pre-classifier learned {learned} notes from the vault.")
+            atexit.register(_classifier.save)
+        return _classifier
+
+
+def avoidance_rate() -> float:
+    """Share of triage requests answered locally without an LLM call."""
+    return metrics.ratio("triage.preclassified", "triage.requests")
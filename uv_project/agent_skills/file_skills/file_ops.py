@@ -5,6 +5,8 @@ import shutil
 from pathlib import Path
 from typing import Union, Optional
 
+from .vault_writer import atomic_write
+
 def read_file(filepath: Union[str, Path], encoding: str = 'utf-8') -> str:
     """Read the contents of a file.
 
@@ -56,8 +58,7 @@ def write_file(
         # Create parent directories if they don't exist
         filepath.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(filepath, 'w', encoding=encoding) as f:
-            f.write(content)
+        atomic_write(filepath, content, encoding=encoding)
     except Exception as e:
         raise IOError(f"Error writing file {filepath}: {e}")
 
@@ -0,0 +1,245 @@
+"""Shared YAML-style frontmatter parser for vault notes.
+
+Only the header block is parsed: simple ``key: value`` lines between a
+leading ``---`` line and the next ``---`` line. Keys are lower-cased and
+surrounding quotes are stripped from values.
+
+``read_frontmatter`` reads just the top of the file (growing the read only
+if the header is longer) and memoizes the result by file identity (inode,
+mtime, size), so unchanged notes are never re-read or re-parsed.
+
+``set_status`` changes the status of a note without touching its body. The
+status line is padded to ``STATUS_FIELD_WIDTH`` so that later transitions
+overwrite it in place; a header without room for the new value is rewritten
+with ``vault_writer.open_atomic``, which atomically replaces the note.
+"""
+
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from agent_skills import metrics
+from .vault_writer import commit, open_atomic
+
+# First read size; doubled until the closing --- is found or MAX_HEADER_BYTES
+HEADER_READ_SIZE = 4 * 1024
+MAX_HEADER_BYTES = 256 * 1024
+# Number of parsed headers kept in memory
+MEMO_SIZE = 4096
+# "status: <value>" is padded with spaces to this many characters
+STATUS_FIELD_WIDTH = 24
+
+FENCE = "---"
+
+
+@dataclass
+class Frontmatter:
+    """Parsed header of a note.
+
+    ``body_offset`` is where the body starts: a character offset for
+    ``parse_frontmatter`` and a byte offset for ``read_frontmatter``. It is 0
+    when the note has no frontmatter.
+    """
+    fields: Dict[str, str] = field(default_factory=dict)
+    body_offset: int = 0
+    present: bool = False
+
+    @property
+    def status(self) -> Optional[str]:
+        return self.fields.get("status")
+
+    @property
+    def recipient(self) -> Optional[str]:
+        return self.fields.get("recipient") or self.fields.get("to")
+
+    @property
+    def subject(self) -> Optional[str]:
+        return self.fields.get("subject")
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.fields.get(key.lower(), default)
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def _parse_lines(lines) -> Tuple[Dict[str, str], Optional[int]]:
+    """Fields of the header and the length of the header block, or None if it never closes.
+
+    ``lines`` may be str or bytes lines (keeping their line endings); the
+    length is counted in the same unit.
+    """
+    consumed = 0
+    fields: Dict[str, str] = {}
+    for i, line in enumerate(lines):
+        consumed += len(line)
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        stripped = line.strip()
+        if i == 0:
+            if stripped != FENCE:
+                return {}, 0
+            continue
+        if stripped == FENCE:
+            return fields, consumed
+        if ":" in line:
+            key, val = line.split(":", 1)
+            fields[key.strip().lower()] = _unquote(val)
+    return fields, None
+
+
+def parse_frontmatter(text: str) -> Frontmatter:
+    """Parse the header at the top of ``text``."""
+    text = text.lstrip("\ufeff")
+    fields, length = _parse_lines(text.splitlines(keepends=True))
+    if not length:
+        return Frontmatter()
+    return Frontmatter(fields, length, True)
+
+
+def split_body(text: str) -> Tuple[Frontmatter, str]:
+    """Frontmatter of ``text`` plus everything after it."""
+    text = text.lstrip("\ufeff")
+    fm = parse_frontmatter(text)
+    return fm, text[fm.body_offset:]
+
+
+_memo: "OrderedDict[str, Tuple[tuple, Frontmatter]]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _identity(stat: os.stat_result) -> tuple:
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _read_head(f) -> Tuple[bytes, int, Dict[str, str], Optional[int]]:
+    """Read the top of an open binary file until its header closes.
+
+    Returns the bytes read, the length of a UTF-8 BOM (0 or 3), the header
+    fields and the byte length of the header block (0 if there is none, None
+    if it never closes).
+    """
+    head = f.read(HEADER_READ_SIZE)
+    while True:
+        bom = 3 if head.startswith(b"\xef\xbb\xbf") else 0
+        fields, length = _parse_lines(head[bom:].splitlines(keepends=True))
+        if length is not None or len(head) >= MAX_HEADER_BYTES:
+            return head, bom, fields, length
+        more = f.read(len(head))
+        if not more:
+            return head, bom, fields, None  # end of file without a closing fence
+        head += more
+
+
+def read_frontmatter(path: Union[str, Path], stat: Optional[os.stat_result] = None) -> Frontmatter:
+    """Frontmatter of the note at ``path``, from a bounded read of its header.
+
+    Raises OSError if the file cannot be read.
+    """
+    key = os.path.abspath(path)
+    identity = _identity(stat or os.stat(key))
+    with _memo_lock:
+        cached = _memo.get(key)
+        if cached is not None and cached[0] == identity:
+            _memo.move_to_end(key)
+            metrics.incr("frontmatter.memo_hits")
+            return cached[1]
+
+    metrics.incr("frontmatter.reads")
+    with open(key, "rb") as f:
+        head, bom, fields, length = _read_head(f)
+    fm = Frontmatter(fields, bom + length, True) if length else Frontmatter()
+
+    with _memo_lock:
+        _memo[key] = (identity, fm)
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return fm
+
+
+def read_body(path: Union[str, Path], fm: Optional[Frontmatter] = None) -> str:
+    """Body of the note at ``path`` (everything after its frontmatter)."""
+    fm = fm or read_frontmatter(path)
+    with open(path, "rb") as f:
+        f.seek(fm.body_offset)
+        return f.read().decode("utf-8", errors="replace")
+
+
+def forget(path: Union[str, Path]):
+    """Drop the memoized header of ``path`` (e.g. after rewriting it in place)."""
+    with _memo_lock:
+        _memo.pop(os.path.abspath(path), None)
+
+
+def _status_line(status: str, newline: bytes, width: int = STATUS_FIELD_WIDTH) -> bytes:
+    return f"status: {status}".encode("utf-8").ljust(width) + newline
+
+
+def status_line(status: str) -> str:
+    """Padded ``status`` header line for a new note, so ``set_status`` can later overwrite it in place."""
+    return _status_line(status, b"\n").decode("utf-8")
+
+
+def set_status(path: Union[str, Path], new_status: str) -> bool:
+    """Set the ``status`` field of the note at ``path``, leaving its body untouched.
+
+    Returns True if the status line was overwritten in place and False if the
+    header had to be rewritten. Raises OSError if the note cannot be read or
+    written, and ValueError if its header is opened but never closed.
+    """
+    path = Path(path)
+    in_place = False
+    with open(path, "r+b") as f:
+        head, bom, fields, length = _read_head(f)
+        if length is None:
+            raise ValueError(f"{path.name} has an unterminated frontmatter header")
+        offset = bom
+        for line in head[bom:bom + (length or 0)].splitlines(keepends=True):
+            key = line.split(b":", 1)[0].strip().lower()
+            if offset > bom and b":" in line and key == b"status":
+                newline = line[len(line.rstrip(b"\r\n")):]
+                patched = _status_line(new_status, newline, len(line) - len(newline))
+                if len(patched) == len(line):
+                    f.seek(offset)
+                    f.write(patched)
+                    in_place = True
+                break
+            offset += len(line)
+    if in_place:
+        commit(path)
+        forget(path)
+        metrics.incr("frontmatter.status_in_place")
+        return True
+
+    # No room (or no status line, or no header): rewrite just the header
+    lines = head[bom:bom + length].splitlines(keepends=True) if length else [b"---\n", b"---\n"]
+    newline = lines[0][len(lines[0].rstrip(b"\r\n")):] or b"\n"
+    status = _status_line(new_status, newline)
+    header = [lines[0]]
+    for line in lines[1:-1]:
+        if b":" in line and line.split(b":", 1)[0].strip().lower() == b"status":
+            header.append(status)
+            status = None
+        else:
+            header.append(line)
+    if status is not None:
+        header.insert(1, status)
+    header.append(lines[-1])
+
+    with open(path, "rb") as src, open_atomic(path) as dst:
+        dst.write(head[:bom])
+        dst.write(b"".join(header))
+        src.seek(bom + (length or 0))
+        shutil.copyfileobj(src, dst)
+    forget(path)
+    metrics.incr("frontmatter.status_rewrites")
+    return False
@@ -1,4 +1,4 @@
-import re
+from .frontmatter import split_body
 
 def parse_plan(plan_text: str):
     """
@@ -11,24 +11,13 @@ def parse_plan(plan_text: str):
     ---
     BODY STARTS HERE
     """
-    # Extract metadata using regex
-    meta_match = re.search(r'---\s*(.*?)\s*---', plan_text, re.DOTALL)
-    if not meta_match:
+    fm, body = split_body(plan_text)
+    if not fm.present:
         return None
 
-    metadata = {}
-    for line in meta_match.group(1).split('\n'):
-        if ':' in line:
-            key, val = line.split(':', 1)
-            metadata[key.strip().lower()] = val.strip()
-
-    # Extract body (everything after the second ---)
-    parts = plan_text.split('---')
-    body = parts[2].strip() if len(parts) > 2 else ""
-
     return {
-        "recipient": metadata.get("recipient"),
-        "subject": metadata.get("subject"),
-        "body": body,
-        "status": metadata.get("status")
+        "recipient": fm.recipient,
+        "subject": fm.subject,
+        "body": body.strip(),
+        "status": fm.status
     }
@@ -1,131 +1,302 @@
-import subprocess
-import json
 from pathlib import Path
-import time
+import os
+from typing import Dict, List, Tuple
 
-def process_file_with_claude(file_path: str) -> dict:
-    '''Agent Skill: Analyze file and decide action'''
-    
-    MAX_RETRIES = 5
-    RETRY_DELAY = 1 # seconds
+from agent_skills import metrics
+from agent_skills.ai_skills.handbook import handbook_context
+from agent_skills.ai_skills.preclassifier import get_preclassifier
+from agent_skills.ai_skills.plan_email import PLAN_FORMAT, extract_plan
+from agent_skills.llm.reducer import reduce_content
+from agent_skills.llm import structured, get_cache, model_key, prefix_digest, LLMBackendError, LLMParseError
 
-    content = ""
-    for i in range(MAX_RETRIES):
-        try:
-            content = Path(file_path).read_text(encoding='utf-8')[:2000]
-            if content.strip(): # If content is not empty, we succeeded
-                break
-        except (PermissionError, FileNotFoundError, OSError) as e:
-            # File might be locked or not fully created yet
-            print(f"DEBUG: File read attempt {i+1} failed for {file_path}: {e}")
-        except UnicodeDecodeError:
-            try:
-                content = Path(file_path).read_text(encoding='utf-16')[:2000]
-                if content.strip():
-                    break
-            except Exception as e:
-                print(f"DEBUG: UnicodeDecodeError fallback attempt {i+1} failed for {file_path}: {e}")
-        
-        time.sleep(RETRY_DELAY) # Wait before retrying
-    
-    if not content.strip():
-        print(f"ERROR: Could not read content from {file_path} after {MAX_RETRIES} attempts.")
-        # Fallback for process_file_with_claude if content remains empty
-        return {
-            "category": "Note",
-            "summary": "Unable to read file content after multiple attempts",
-            "action_needed": False,
-            "priority": "low",
-            "destination": "Done"
-        }
-    
-    print(f"DEBUG: Content passed to Claude: [{content}]")
-    
-    prompt = f'''You must respond ONLY with valid JSON. Do not ask questions. Do not add explanations. Just analyze and output JSON.
+# Bump whenever the triage prompt or schema changes to invalidate cached verdicts
+TRIAGE_TEMPLATE_VERSION = "4"
+
+# Characters read from each file before it is reduced to the triage token budget
+TRIAGE_READ_LIMIT = 64 * 1024
+# Maximum number of files packed into one batch triage prompt
+TRIAGE_BATCH_SIZE = int(os.environ.get("TRIAGE_BATCH_SIZE", "8"))
+# Fused mode: the triage call also drafts the Plan.md for Needs_Action items,
+# saving brain_loop a second LLM round trip per email
+FUSED_TRIAGE = os.environ.get("FUSED_TRIAGE", "0") == "1"
 
-Analyze this file and respond with this exact JSON structure:
-{{
+TRIAGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "category": {"type": "string", "enum": ["Report", "Email", "Task", "Meeting", "Note"]},
+        "summary": {"type": "string"},
+        "action_needed": {"type": "boolean"},
+        "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+        "destination": {"type": "string", "enum": ["Needs_Action", "Done"]},
+        "confidence": {"type": "number"}
+    },
+    "required": ["category", "summary", "action_needed", "priority", "destination"]
+}
+
+TRIAGE_BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": dict(TRIAGE_SCHEMA["properties"], id={"type": "string"}),
+        "required": ["id"] + TRIAGE_SCHEMA["required"]
+    }
+}
+
+# Static part of the triage prompt, sent as a cacheable prefix ahead of the file
+TRIAGE_INSTRUCTIONS = '''You must respond ONLY with valid JSON. Do not ask questions. Do not add explanations. Just analyze and output JSON.
+
+Analyze the file given after these instructions and respond with this exact JSON structure:
+{
   "category": "Report|Email|Task|Meeting|Note",
   "summary": "one sentence summary",
   "action_needed": true or false,
   "priority": "high|medium|low",
-  "destination": "Needs_Action" or "Done"
-}}
+  "destination": "Needs_Action" or "Done",
+  "confidence": 0.0 to 1.0, how sure you are of this verdict
+}'''
+
+TRIAGE_BATCH_INSTRUCTIONS = '''You must respond ONLY with valid JSON. Do not ask questions. Do not add explanations. Just analyze and output JSON.
+
+You will be given several files, each introduced by a line "=== FILE <id> ===".
+Analyze every file independently and respond with a JSON array containing exactly one object per file:
+[
+  {
+    "id": "<id of the file>",
+    "category": "Report|Email|Task|Meeting|Note",
+    "summary": "one sentence summary",
+    "action_needed": true or false,
+    "priority": "high|medium|low",
+    "destination": "Needs_Action" or "Done",
+    "confidence": 0.0 to 1.0, how sure you are of this verdict
+  }
+]'''
+
+FUSED_PLAN_INSTRUCTIONS = f'''PLANNING: Add one more JSON field, "plan". When "destination" is "Needs_Action",
+it contains a complete Plan.md for the item as a markdown string with these sections:
+{PLAN_FORMAT}
+When "destination" is "Done", set "plan" to an empty string.'''
 
-File content:
+def triage_schema(batch: bool = False, with_plan: bool = False) -> dict:
+    """JSON schema of a triage answer; fused mode adds the required "plan" field.
+
+    Backends with native structured output build their forced tool from this
+    schema, so a field missing here would be dropped from the answer.
+    """
+    schema = TRIAGE_BATCH_SCHEMA if batch else TRIAGE_SCHEMA
+    if not with_plan:
+        return schema
+    item = schema["items"] if batch else schema
+    item = dict(
+        item,
+        properties=dict(item["properties"], plan={"type": "string"}),
+        required=item["required"] + ["plan"]
+    )
+    return dict(schema, items=item) if batch else item
+
+def triage_prefix(batch: bool = False, with_plan: bool = False) -> list:
+    """Static prompt blocks shared by every triage call."""
+    blocks = [TRIAGE_BATCH_INSTRUCTIONS if batch else TRIAGE_INSTRUCTIONS]
+    if with_plan:
+        blocks.append(FUSED_PLAN_INSTRUCTIONS)
+    handbook = handbook_context()
+    return [handbook] + blocks if handbook else blocks
+
+def clean_verdict(item: dict) -> dict:
+    """Keeps the schema fields (and a fused plan, trimmed) from a model answer."""
+    if not is_valid_verdict(item):
+        raise LLMParseError("Triage answer is missing required fields", text=str(item))
+    verdict = {k: item[k] for k in TRIAGE_SCHEMA["required"]}
+    if isinstance(item.get("confidence"), (int, float)):
+        verdict["confidence"] = item["confidence"]
+    plan = item.get("plan")
+    if isinstance(plan, str) and plan.strip() and verdict["destination"] == "Needs_Action":
+        verdict["plan"] = extract_plan(plan.strip())
+    return verdict
+
+def unreadable_verdict() -> dict:
+    return {
+        "category": "Note",
+        "summary": "Unable to read file content",
+        "action_needed": False,
+        "priority": "low",
+        "destination": "Done"
+    }
+
+def unavailable_verdict() -> dict:
+    return {
+        "category": "Note",
+        "summary": "Unable to analyze - CCR not responding",
+        "action_needed": True,
+        "priority": "medium",
+        "destination": "Needs_Action"
+    }
+
+def is_valid_verdict(verdict) -> bool:
+    return isinstance(verdict, dict) and all(k in verdict for k in TRIAGE_SCHEMA["required"])
+
+def read_for_triage(file_path: str) -> str:
+    """
+    Reads a file for triage and reduces it to the triage token budget
+    (quotes, signatures, footers removed). The watcher only hands over files
+    whose writes have settled, so there is nothing to wait for here.
+    """
+    path = Path(file_path)
+    try:
+        try:
+            content = path.read_text(encoding='utf-8')[:TRIAGE_READ_LIMIT]
+        except UnicodeDecodeError:
+            content = path.read_text(encoding='utf-16')[:TRIAGE_READ_LIMIT]
+    except (OSError, UnicodeError) as e:
+        print(f"ERROR: Could not read content from {file_path}: {e}")
+        return ""
+
+    if not content.strip():
+        print(f"ERROR: {file_path} is empty.")
+        return content
+    return reduce_content(content, "triage").text
+
+def process_file_with_claude(file_path: str, with_plan: bool = FUSED_TRIAGE) -> dict:
+    '''
+    Agent Skill: Analyze file and decide action.
+
+    With ``with_plan`` the verdict of a Needs_Action item also carries a
+    "plan" key holding its Plan.md body.
+    '''
+
+    content = read_for_triage(file_path)
+    if not content.strip():
+        # Fallback for process_file_with_claude if content remains empty
+        return unreadable_verdict()
+
+    verdict = local_verdict(file_path, content)
+    if verdict is not None:
+        return verdict
+    return triage_content(file_path, content, with_plan)
+
+def local_verdict(file_path: str, content: str):
+    """Verdict from the local pre-classifier, or None if the LLM is needed."""
+    metrics.incr("triage.requests")
+    classifier = get_preclassifier()
+    verdict = classifier.classify(content, Path(file_path).name) if classifier else None
+    if verdict is not None:
+        metrics.incr("triage.preclassified")
+        print(f"DEBUG: Pre-classified {file_path} locally (confidence {verdict['confidence']})")
+    return verdict
+
+def learn_verdict(file_path: str, content: str, verdict: dict):
+    """Feeds an LLM verdict back into the local pre-classifier."""
+    classifier = get_preclassifier()
+    if classifier:
+        classifier.learn(content, verdict, Path(file_path).name)
+
+def triage_content(file_path: str, content: str, with_plan: bool = FUSED_TRIAGE) -> dict:
+    """Single-file LLM triage of already-read ``content`` (cached)."""
+    print(f"DEBUG: Content passed to Claude: [{content}]")
+
+    prompt = f'''File content:
 ```
 {content}
 ```'''
-    
-    import tempfile
-    import os
-
-    # Create a temporary file for the prompt to avoid shell arg limits/issues
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as tmp:
-        tmp.write(prompt)
-        tmp_path = tmp.name
-    
+
+    prefix = triage_prefix(with_plan=with_plan)
     try:
-        # Use ccr code command with --print and the temp file path
-        # METHOD: cmd /c + shell=False + DEVNULL stdin prevents hanging
-        # This matches the working debug_ccr.py configuration exactly
-        result = subprocess.run(
-            ['cmd', '/c', 'ccr', 'code', '--print', tmp_path], 
-            capture_output=True, 
-            text=True, 
-            shell=False,
-            stdin=subprocess.DEVNULL
+        verdict = get_cache().get_or_compute(
+            "triage",
+            f"{TRIAGE_TEMPLATE_VERSION}-{prefix_digest(prefix)}",
+            content,
+            lambda: clean_verdict(
+                structured(prompt, triage_schema(with_plan=with_plan), prefix=prefix, skill="triage")
+            ),
+            model=model_key("triage")
         )
-    finally:
-        # cleanup
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
-    
-    # Debug: print what we got
-    print(f"CCR stdout: {result.stdout}")
-    print(f"CCR stderr: {result.stderr}")
-    print(f"CCR return code: {result.returncode}")
-    
-    if result.returncode != 0 or not result.stdout.strip():
-        print(f"Error: CCR command failed or returned empty output")
+    except (LLMBackendError, LLMParseError) as e:
+        # Never let a bad answer crash the watcher: the file is still routed
+        print(f"Error: {e}")
         # Fallback: return a default response for testing
-        return {
-            "category": "Note",
-            "summary": "Unable to analyze - CCR not responding",
-            "action_needed": True,
-            "priority": "medium",
-            "destination": "Needs_Action"
-        }
-    
-    import re
-    
-    # Clean up markdown formatting if present
-    output = result.stdout.strip()
-    
-    print(f"DEBUG: Raw CCR output length: {len(output)}")
-    
-    # Try to find JSON block within markdown fences
-    json_match = re.search(r'```json\s*(.*?)\s*```', output, re.DOTALL)
-    if json_match:
-        output = json_match.group(1)
-    else:
-        # Fallback: try to find just the JSON object by finding the first '{' and last '}'
-        start_brace = output.find('{')
-        end_brace = output.rfind('}')
-        if start_brace != -1 and end_brace != -1 and end_brace > start_brace:
-            output = output[start_brace : end_brace + 1]
-            
-    print(f"DEBUG: Cleaned output for parsing: {output}")
+        return unavailable_verdict()
+
+    learn_verdict(file_path, content, verdict)
+    return verdict
+
+def triage_files(
+    file_paths: List[str],
+    batch_size: int = TRIAGE_BATCH_SIZE,
+    with_plan: bool = FUSED_TRIAGE
+) -> Dict[str, dict]:
+    '''
+    Agent Skill: Analyze several files, packing up to ``batch_size`` of them
+    (each reduced to the triage token budget) into one LLM call. Returns a
+    verdict per input path. Files the batch answer does not cover (or a
+    batch whose output cannot be parsed) fall back to single-file triage
+    one by one.
+    '''
+    results: Dict[str, dict] = {}
+    version = f"{TRIAGE_TEMPLATE_VERSION}-{prefix_digest(triage_prefix(with_plan=with_plan))}"
+    cache = get_cache()
+
+    pending: List[Tuple[str, str]] = []
+    for file_path in file_paths:
+        content = read_for_triage(file_path)
+        if not content.strip():
+            results[file_path] = unreadable_verdict()
+            continue
+        verdict = local_verdict(file_path, content)
+        if verdict is None:
+            verdict = cache.peek("triage", version, content, model=model_key("triage"))
+        if verdict is not None:
+            results[file_path] = verdict
+        else:
+            pending.append((file_path, content))
+
+    for i in range(0, len(pending), max(1, batch_size)):
+        batch = pending[i:i + batch_size]
+        if len(batch) == 1:
+            file_path, content = batch[0]
+            results[file_path] = triage_content(file_path, content, with_plan)
+            continue
+        try:
+            verdicts = _triage_batch(batch, with_plan)
+        except LLMBackendError as e:
+            print(f"Error: {e}")
+            for file_path, _ in batch:
+                results[file_path] = unavailable_verdict()
+            continue
+        for file_path, content in batch:
+            verdict = verdicts.get(file_path)
+            if verdict is None:
+                print(f"DEBUG: Batch triage missed {file_path}, retrying on its own")
+                verdict = triage_content(file_path, content, with_plan)
+            else:
+                cache.store("triage", version, content, verdict, model=model_key("triage_batch"))
+                learn_verdict(file_path, content, verdict)
+            results[file_path] = verdict
+
+    return results
+
+def _triage_batch(batch: List[Tuple[str, str]], with_plan: bool = False) -> Dict[str, dict]:
+    """Runs one LLM call for ``batch`` and returns the valid verdicts keyed by path.
+
+    Raises LLMBackendError if the backend produced nothing at all.
+    """
+    ids = {f"f{n}": file_path for n, (file_path, _) in enumerate(batch, 1)}
+    sections = [
+        f"=== FILE {file_id} ===\n{content}"
+        for file_id, (_, content) in zip(ids, batch)
+    ]
+    prompt = "\n\n".join(sections)
+
     try:
-        return json.loads(output)
-    except json.JSONDecodeError as e:
-        print(f"JSON Parsing Error: {e}")
-        # Final fallback attempt: strip conversational preamble
-        if '{' in output and '}' in output:
-             start = output.find('{')
-             end = output.rfind('}') + 1
-             try:
-                 return json.loads(output[start:end])
-             except:
-                 pass
-        raise e
+        answer = structured(
+            prompt, triage_schema(batch=True, with_plan=with_plan),
+            prefix=triage_prefix(batch=True, with_plan=with_plan), skill="triage_batch"
+        )
+    except LLMParseError as e:
+        print(f"Batch triage output could not be parsed ({e}), falling back to per-file triage")
+        return {}
+
+    verdicts: Dict[str, dict] = {}
+    for item in answer:
+        if item["id"] not in ids:
+            continue
+        verdicts[ids[item["id"]]] = clean_verdict(item)
+    return verdicts
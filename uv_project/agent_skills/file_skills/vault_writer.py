@@ -0,0 +1,196 @@
+"""Atomic, durable writes for vault notes.
+
+Every note is written to a hidden temporary file next to its destination and
+then renamed into place, so watchers and readers only ever see a complete
+note: either the old content or the new one, never a partial write.
+
+How hard each write is pushed to disk is set by ``VAULT_DURABILITY``:
+
+- ``fsync``: fsync the file before the rename and its directory after it.
+  Nothing acknowledged is ever lost, at the cost of two fsyncs per note.
+- ``group`` (default): flush the file's data before the rename, but leave
+  the directory fsync that makes the rename durable to a background thread
+  that runs one per directory for everything renamed in the last
+  ``VAULT_GROUP_COMMIT_MS`` milliseconds. A crash can lose a rename from that
+  window (the old note comes back) but never leaves an empty or torn note
+  behind the new name. Notes changed in place via ``commit()`` have their
+  file fsync batched the same way.
+- ``none``: leave flushing to the OS.
+
+``flush()`` forces a pending group commit; it also runs at interpreter exit.
+"""
+
+import atexit
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Set, Union
+
+from agent_skills import metrics
+
+VAULT_DURABILITY = os.environ.get("VAULT_DURABILITY", "group").lower()
+VAULT_GROUP_COMMIT_MS = float(os.environ.get("VAULT_GROUP_COMMIT_MS", "50"))
+
+DURABILITY_MODES = ("fsync", "group", "none")
+TEMP_SUFFIX = ".tmp"
+
+PathLike = Union[str, Path]
+
+
+def is_temp_file(path: PathLike) -> bool:
+    """True for the hidden temporary files this module renames into place."""
+    name = Path(path).name
+    return name.startswith(".") and name.endswith(TEMP_SUFFIX)
+
+
+def _temp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}{TEMP_SUFFIX}")
+
+
+def _mode(durability: Optional[str]) -> str:
+    mode = (durability or VAULT_DURABILITY).lower()
+    if mode not in DURABILITY_MODES:
+        raise ValueError(f"Unknown durability mode '{mode}' (expected one of {DURABILITY_MODES})")
+    return mode
+
+
+def _fsync_path(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    metrics.incr("vault.writer.fsyncs")
+
+
+# The rename is made durable by the directory fsync; the file only needs its data
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
+
+def _fsync_dir(directory: Path):
+    # Directories cannot be opened for fsync on Windows; the rename is durable there
+    if os.name == "nt":
+        return
+    try:
+        _fsync_path(directory)
+    except OSError:
+        pass
+
+
+class GroupCommitter:
+    """Batches fsyncs of recently written notes into one pass every ``interval`` seconds."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending: Set[Path] = set()
+        self._dirs: Set[Path] = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, path: Path, data_synced: bool = False):
+        """Queue ``path``'s directory, and the file itself unless ``data_synced``."""
+        with self._lock:
+            if not data_synced:
+                self._pending.add(path)
+            self._dirs.add(path.parent)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="vault-group-commit", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """fsync every pending note and directory; returns the number of fsyncs."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, set()
+                dirs, self._dirs = self._dirs, set()
+            if not batch and not dirs:
+                return 0
+            for path in batch:
+                try:
+                    _fsync_path(path)
+                except OSError:
+                    pass  # moved or deleted since; whoever did that owns it now
+            for directory in dirs:
+                _fsync_dir(directory)
+            metrics.incr("vault.writer.group_commits")
+            metrics.set_gauge("vault.writer.group_commit_size", len(batch) + len(dirs))
+            return len(batch) + len(dirs)
+
+
+_committer = GroupCommitter(VAULT_GROUP_COMMIT_MS / 1000)
+atexit.register(_committer.flush)
+
+
+def flush() -> int:
+    """Force the pending group commit to disk now."""
+    return _committer.flush()
+
+
+def commit(path: PathLike, durability: Optional[str] = None):
+    """Apply the durability policy to ``path`` after it was changed in place."""
+    path = Path(path)
+    mode = _mode(durability)
+    if mode == "fsync":
+        _fsync_path(path)
+    elif mode == "group":
+        _committer.add(path)
+
+
+@contextmanager
+def open_atomic(path: PathLike, durability: Optional[str] = None) -> Iterator:
+    """Binary file handle whose content replaces ``path`` atomically on success.
+
+    If the block raises, the temporary file is removed and ``path`` is left
+    untouched.
+    """
+    path = Path(path)
+    mode = _mode(durability)
+    tmp = _temp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            yield f
+            if mode == "fsync":
+                f.flush()
+                os.fsync(f.fileno())
+                metrics.incr("vault.writer.fsyncs")
+            elif mode == "group":
+                # Data first, so a crash after the rename can never expose an empty note
+                f.flush()
+                _fdatasync(f.fileno())
+                metrics.incr("vault.writer.fsyncs")
+        if path.exists():
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    metrics.incr("vault.writer.writes")
+    if mode == "fsync":
+        _fsync_dir(path.parent)
+    elif mode == "group":
+        _committer.add(path, data_synced=True)
+
+
+def atomic_write(
+    path: PathLike,
+    content: Union[str, bytes],
+    encoding: str = "utf-8",
+    durability: Optional[str] = None
+) -> None:
+    """Write ``content`` to ``path`` via a temporary file and an atomic rename."""
+    data = content.encode(encoding) if isinstance(content, str) else content
+    with open_atomic(path, durability) as f:
+        f.write(data)
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from .vault_writer import atomic_write
+
 def write_md(path: Path, content: str) -> None:
-    """Writes content to a markdown file."""
-    path.write_text(content, encoding="utf-8")
+    """Writes content to a markdown file (atomically, via a temp file and rename)."""
+    atomic_write(path, content)
@@ -0,0 +1,22 @@
+"""Shared LLM layer used by the AI skills."""
+
+from .backends import (
+    Backend, CCRBackend, LLMRequest,
+    LLMError, LLMBackendError, LLMCancelledError, LLMParseError
+)
+from .anthropic_backend import AnthropicBackend
+from .cassette import CassetteBackend
+from .executor import (
+    LLMExecutor, StreamHandle, get_executor, set_executor, complete, structured, stream
+)
+from .parsing import extract_json
+from .structured import SchemaError, validate
+from .cache import LLMCache, get_cache, model_key, prefix_digest
+
+__all__ = [
+    'Backend', 'CCRBackend', 'AnthropicBackend', 'CassetteBackend', 'LLMRequest',
+    'LLMError', 'LLMBackendError', 'LLMCancelledError', 'LLMParseError',
+    'LLMExecutor', 'StreamHandle', 'get_executor', 'set_executor', 'complete', 'structured', 'stream',
+    'extract_json', 'SchemaError', 'validate',
+    'LLMCache', 'get_cache', 'model_key', 'prefix_digest'
+]
@@ -0,0 +1,164 @@
+"""Admission control for the shared LLM executor.
+
+``AdmissionController`` caps how many calls may run against the backend at
+once. The cap adapts AIMD-style: every call that succeeds within
+``tolerance`` x the baseline latency raises it by ``1/limit`` (about +1 per
+round trip of the whole window), while an error or a slow call halves it.
+Baselines are kept per skill and model, so a plan that is long by nature
+is never judged against the latency of a short triage call.
+A degraded backend therefore gets fewer concurrent calls instead of a pile
+of hung ``ccr`` processes.
+
+``CircuitBreaker`` stops calling a backend that keeps failing. After
+``failure_threshold`` consecutive failures it opens and every call fails
+immediately with LLMBackendError, which the skills already turn into their
+fallback results. After ``cooldown`` seconds one probe call is let through
+(half-open); its outcome closes or re-opens the breaker.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from agent_skills import metrics
+from .backends import LLMBackendError
+
+LLM_MIN_CONCURRENCY = int(os.environ.get("LLM_MIN_CONCURRENCY", "1"))
+# A call slower than this multiple of the baseline latency counts as congestion
+LLM_LATENCY_TOLERANCE = float(os.environ.get("LLM_LATENCY_TOLERANCE", "2.0"))
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))
+
+# Weight of a new sample in the baseline latency average
+BASELINE_ALPHA = 0.1
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class AdmissionController:
+    """AIMD concurrency limit shared by all executor workers."""
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = LLM_MIN_CONCURRENCY,
+        tolerance: float = LLM_LATENCY_TOLERANCE
+    ):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.tolerance = tolerance
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        # Average latency of successful calls, per "skill:model" key
+        self.baselines: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._publish()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Wait for a free slot; False if ``deadline`` (monotonic) passes first."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    metrics.incr("llm.admission.rejected")
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            self._publish()
+            return True
+
+    def release(self, latency: float, ok: bool, sample: bool = True, key: str = "default"):
+        """Free a slot and adapt the limit to the outcome of the call.
+
+        ``key`` names the kind of call (skill and model); its latency is only
+        compared with the baseline of the same key. ``sample=False`` frees
+        the slot without adapting, for calls that were cancelled and say
+        nothing about the backend.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if not sample:
+                self._publish()
+                self._cond.notify_all()
+                return
+            baseline = self.baselines.get(key)
+            slow = baseline is not None and latency > self.tolerance * baseline
+            if not ok or slow:
+                self.limit = max(float(self.min_limit), self.limit / 2)
+                metrics.incr("llm.admission.decreases")
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            if ok:
+                # The baseline only follows successful calls so that timeouts
+                # cannot drag it up to the point where they look normal
+                self.baselines[key] = latency if baseline is None else (
+                    (1 - BASELINE_ALPHA) * baseline + BASELINE_ALPHA * latency
+                )
+            self._publish()
+            self._cond.notify_all()
+
+    def _publish(self):
+        metrics.set_gauge("llm.admission.limit", int(self.limit))
+        metrics.set_gauge("llm.in_flight", self.in_flight)
+
+
+class CircuitBreaker:
+    """Fails calls fast while the backend is known to be down."""
+
+    def __init__(
+        self,
+        failure_threshold: int = LLM_BREAKER_FAILURES,
+        cooldown: float = LLM_BREAKER_COOLDOWN
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._publish()
+
+    def check(self, skill: str = "default"):
+        """Raise LLMBackendError if calls are currently not allowed."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        metrics.incr("llm.breaker.rejected")
+        raise LLMBackendError(f"LLM circuit breaker is {self.state}; failing fast ({skill})")
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.failures = 0
+                if self.state != CLOSED:
+                    print("LLM circuit breaker closed: backend recovered", flush=True)
+                    self._set_state(CLOSED)
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"LLM circuit breaker opened after {self.failures} failure(s)", flush=True)
+                    metrics.incr("llm.breaker.opened")
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def abandon(self):
+        """Forget a call that ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            self._probing = False
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._publish()
+
+    def _publish(self):
+        metrics.set_gauge("llm.breaker.state", _STATE_GAUGE[self.state])
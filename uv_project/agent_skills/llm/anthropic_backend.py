@@ -0,0 +1,188 @@
+"""Anthropic Messages API backend.
+
+Note: This module requires the 'anthropic' library.
+Install it with: pip install anthropic
+
+Static instruction blocks (``LLMRequest.prefix``) are sent as system blocks
+with a cache breakpoint on the last one, so repeated calls from a skill only
+pay full price for the per-call payload. All workers share one client and
+therefore one pooled HTTP connection pool.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from agent_skills import metrics
+from .backends import Backend, LLMBackendError, LLMCancelledError, LLMRequest
+
+try:
+    import anthropic
+    import httpx
+    ANTHROPIC_AVAILABLE = True
+except ImportError:
+    ANTHROPIC_AVAILABLE = False
+
+ANTHROPIC_MODEL = os.environ.get("ANTHROPIC_MODEL", "claude-sonnet-4-5")
+ANTHROPIC_MAX_TOKENS = int(os.environ.get("ANTHROPIC_MAX_TOKENS", "1024"))
+# Falls back to the SDK default (api.anthropic.com) when unset; point it at a
+# local stand-in server to run the skills without network access.
+ANTHROPIC_BASE_URL = os.environ.get("ANTHROPIC_BASE_URL") or None
+
+_clients: Dict[Optional[str], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _check_anthropic():
+    """Check if anthropic library is available."""
+    if not ANTHROPIC_AVAILABLE:
+        raise ImportError(
+            "The 'anthropic' library is required for the Anthropic backend. "
+            "Install it with: pip install anthropic"
+        )
+
+
+def get_client(base_url: Optional[str] = None, max_connections: int = 10):
+    """Return the shared Anthropic client for ``base_url``, creating it on first use."""
+    _check_anthropic()
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            http_client = anthropic.DefaultHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                )
+            )
+            client = anthropic.Anthropic(base_url=base_url, http_client=http_client)
+            _clients[base_url] = client
+        return client
+
+
+# Name of the forced tool used to get schema-constrained answers
+STRUCTURED_TOOL = "respond"
+
+
+def build_tool(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Tool definition whose input is the requested answer.
+
+    Tool inputs must be objects, so any other schema is wrapped in a
+    ``{"result": ...}`` object and unwrapped again in ``complete``.
+    """
+    if schema.get("type") != "object":
+        schema = {"type": "object", "properties": {"result": schema}, "required": ["result"]}
+    return {
+        "name": STRUCTURED_TOOL,
+        "description": "Return the answer in the required structure.",
+        "input_schema": schema,
+    }
+
+
+def build_system_blocks(prefix: List[str]) -> List[Dict[str, Any]]:
+    """Turn static prefix blocks into system blocks, cached up to the last one."""
+    blocks: List[Dict[str, Any]] = [{"type": "text", "text": text} for text in prefix if text]
+    if blocks:
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+class AnthropicBackend(Backend):
+    """Calls the Messages API directly instead of shelling out to CCR."""
+
+    name = "anthropic"
+
+    def __init__(
+        self,
+        model: str = ANTHROPIC_MODEL,
+        base_url: Optional[str] = ANTHROPIC_BASE_URL,
+        max_tokens: int = ANTHROPIC_MAX_TOKENS,
+        client: Any = None
+    ):
+        """Initialize the backend.
+
+        Args:
+            model: Model name sent with every request
+            base_url: API base URL; None uses the SDK default
+            max_tokens: Output token cap per request
+            client: Pre-built Anthropic client (defaults to the shared pooled one)
+        """
+        self.model = model
+        self.base_url = base_url
+        self.max_tokens = max_tokens
+        self.client = client or get_client(base_url)
+
+    def _params(self, request: LLMRequest) -> Dict[str, Any]:
+        params: Dict[str, Any] = {
+            "model": request.model or self.model,
+            "max_tokens": self.max_tokens,
+            "messages": [{"role": "user", "content": request.prompt}],
+        }
+        system = build_system_blocks(list(request.prefix))
+        if system:
+            params["system"] = system
+        if request.timeout is not None:
+            params["timeout"] = request.timeout
+        if request.schema is not None:
+            params["tools"] = [build_tool(request.schema)]
+            params["tool_choice"] = {"type": "tool", "name": STRUCTURED_TOOL}
+        return params
+
+    def complete(self, request: LLMRequest) -> str:
+        # Tool answers are short, so only free-text calls are worth cancelling
+        if request.cancel is not None and request.schema is None:
+            return self._complete_cancellable(request)
+        try:
+            message = self.client.messages.create(**self._params(request))
+        except anthropic.APIError as e:
+            raise LLMBackendError(f"Anthropic API error ({request.skill}): {e}")
+
+        self._record_usage(message)
+        if request.schema is not None:
+            for block in message.content:
+                if getattr(block, "type", "") == "tool_use":
+                    value = block.input
+                    if request.schema.get("type") != "object" and isinstance(value, dict):
+                        value = value.get("result")
+                    return json.dumps(value)
+        text = "".join(
+            block.text for block in message.content if getattr(block, "type", "") == "text"
+        ).strip()
+        if not text:
+            raise LLMBackendError(f"Anthropic API returned empty output ({request.skill})")
+        return text
+
+    def _complete_cancellable(self, request: LLMRequest) -> str:
+        # Streaming lets a cancelled call drop its connection mid-generation
+        parts = []
+        chunks = self.stream(request)
+        try:
+            for chunk in chunks:
+                if request.cancelled():
+                    raise LLMCancelledError(f"Anthropic call cancelled ({request.skill})")
+                parts.append(chunk)
+        finally:
+            chunks.close()
+        text = "".join(parts).strip()
+        if not text:
+            raise LLMBackendError(f"Anthropic API returned empty output ({request.skill})")
+        return text
+
+    def stream(self, request: LLMRequest) -> Iterator[str]:
+        try:
+            # Leaving the context manager early closes the HTTP response, which
+            # stops generation server-side
+            with self.client.messages.stream(**self._params(request)) as stream:
+                for text in stream.text_stream:
+                    yield text
+                self._record_usage(stream.get_final_message())
+        except anthropic.APIError as e:
+            raise LLMBackendError(f"Anthropic API error ({request.skill}): {e}")
+
+    def _record_usage(self, message: Any):
+        usage = getattr(message, "usage", None)
+        if usage is None:
+            return
+        for field in ("input_tokens", "output_tokens",
+                      "cache_creation_input_tokens", "cache_read_input_tokens"):
+            metrics.incr(f"llm.anthropic.{field}", getattr(usage, field, None) or 0)
@@ -0,0 +1,239 @@
+"""LLM backends used by the shared executor.
+
+A backend turns one ``LLMRequest`` into the model's raw text output. Each
+executor worker owns its own backend instance, so implementations do not need
+to be thread-safe.
+"""
+
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# `ccr code --print <file>` is the invocation every skill used before the
+# executor existed: cmd /c + shell=False + DEVNULL stdin prevents hanging.
+CCR_COMMAND = ['cmd', '/c', 'ccr', 'code', '--print']
+CCR_STATUS_COMMAND = ['cmd', '/c', 'ccr', 'status']
+# CCR picks the model named in this tag ("provider,model") instead of its default route
+CCR_MODEL_TAG = "<CCR-SUBAGENT-MODEL>{model}</CCR-SUBAGENT-MODEL>\n"
+# How often a running ccr process is checked for cancellation
+CANCEL_POLL_INTERVAL = 0.25
+
+
+class LLMError(Exception):
+    """Base class for LLM layer failures."""
+
+
+class LLMBackendError(LLMError):
+    """The backend failed to produce any output (crash, timeout, empty stdout)."""
+
+
+class LLMCancelledError(LLMBackendError):
+    """The call was cancelled by the executor (e.g. the losing half of a hedge)."""
+
+
+class LLMParseError(LLMError):
+    """The backend answered but the output did not match the requested schema."""
+
+    def __init__(self, message: str, text: str = ""):
+        super().__init__(message)
+        self.text = text
+
+
+@dataclass
+class LLMRequest:
+    """A single prompt submitted to the executor.
+
+    ``prefix`` holds static instruction blocks (schemas, formats, handbook)
+    that are identical across calls; backends that support prompt caching
+    send them as a cached prefix ahead of the per-call ``prompt``.
+
+    ``model`` is chosen by the routing policy; None means the backend's
+    default model.
+
+    ``cancel`` is set by the executor when the answer is no longer wanted;
+    backends should check it while they wait and stop early.
+    """
+    prompt: str
+    schema: Optional[Dict[str, Any]] = None
+    skill: str = "default"
+    timeout: Optional[float] = None
+    prefix: Sequence[str] = ()
+    model: Optional[str] = None
+    cancel: Optional[threading.Event] = field(default=None, compare=False, repr=False)
+
+    def cancelled(self) -> bool:
+        return self.cancel is not None and self.cancel.is_set()
+
+    def full_prompt(self) -> str:
+        """Prefix blocks and prompt joined into one text, for backends without caching."""
+        return "\n\n".join(list(self.prefix) + [self.prompt])
+
+
+class Backend:
+    """Interface implemented by every LLM backend."""
+
+    name = "base"
+
+    def complete(self, request: LLMRequest) -> str:
+        """Return the raw text output for ``request``."""
+        raise NotImplementedError
+
+    def stream(self, request: LLMRequest) -> Iterator[str]:
+        """Yield the output incrementally. Closing the generator must stop generation.
+
+        Backends without native streaming yield the complete answer once.
+        """
+        yield self.complete(request)
+
+    def healthy(self) -> bool:
+        """Cheap liveness probe used by the executor's health check."""
+        return True
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class CCRBackend(Backend):
+    """Runs prompts through Claude Code Router (`ccr code --print`).
+
+    `ccr code --print` is a one-shot CLI, so a process is still started per
+    prompt; the router service it talks to stays warm between calls.
+    """
+
+    name = "ccr"
+
+    def __init__(self, command: Optional[List[str]] = None):
+        self.command = list(command or CCR_COMMAND)
+
+    @staticmethod
+    def prompt_text(request: LLMRequest) -> str:
+        text = request.full_prompt()
+        return CCR_MODEL_TAG.format(model=request.model) + text if request.model else text
+
+    def complete(self, request: LLMRequest) -> str:
+        # Pass the prompt through a temp file to avoid shell arg limits/issues
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as tmp:
+            tmp.write(self.prompt_text(request))
+            tmp_path = tmp.name
+
+        proc = None
+        try:
+            try:
+                proc = subprocess.Popen(
+                    self.command + [tmp_path],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    shell=False,
+                    stdin=subprocess.DEVNULL
+                )
+            except OSError as e:
+                raise LLMBackendError(f"Could not start CCR: {e}")
+
+            deadline = None if request.timeout is None else time.monotonic() + request.timeout
+            while True:
+                try:
+                    stdout, stderr = proc.communicate(timeout=CANCEL_POLL_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    if request.cancelled():
+                        raise LLMCancelledError(f"CCR call cancelled ({request.skill})")
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise LLMBackendError(f"CCR timed out after {request.timeout}s ({request.skill})")
+        finally:
+            if proc is not None and proc.poll() is None:
+                proc.kill()
+                proc.communicate()
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        if proc.returncode != 0 or not stdout.strip():
+            print(f"CCR stderr: {stderr}", flush=True)
+            raise LLMBackendError(
+                f"CCR command failed or returned empty output (return code {proc.returncode})"
+            )
+        return stdout.strip()
+
+    def stream(self, request: LLMRequest) -> Iterator[str]:
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as tmp:
+            tmp.write(self.prompt_text(request))
+            tmp_path = tmp.name
+
+        proc = None
+        try:
+            try:
+                proc = subprocess.Popen(
+                    self.command + [tmp_path],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    stdin=subprocess.DEVNULL,
+                    text=True,
+                    encoding='utf-8',
+                    bufsize=1
+                )
+            except OSError as e:
+                raise LLMBackendError(f"Could not start CCR: {e}")
+
+            # stdout is read on a helper thread so the deadline and cancellation
+            # are honoured even while ccr prints nothing
+            lines: "queue.Queue[Optional[str]]" = queue.Queue()
+
+            def read():
+                try:
+                    for line in proc.stdout:
+                        lines.put(line)
+                except (OSError, ValueError):
+                    pass  # stdout closed because the process was killed
+                finally:
+                    lines.put(None)
+
+            threading.Thread(target=read, name="ccr-stream-reader", daemon=True).start()
+            deadline = None if request.timeout is None else time.monotonic() + request.timeout
+            produced = False
+            while True:
+                if request.cancelled():
+                    raise LLMCancelledError(f"CCR call cancelled ({request.skill})")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise LLMBackendError(f"CCR timed out after {request.timeout}s ({request.skill})")
+                try:
+                    line = lines.get(timeout=CANCEL_POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                if line is None:
+                    break
+                produced = produced or bool(line.strip())
+                yield line
+            proc.wait(timeout=max(0.1, deadline - time.monotonic()) if deadline is not None else None)
+            if proc.returncode != 0 or not produced:
+                raise LLMBackendError(
+                    f"CCR command failed or returned empty output (return code {proc.returncode})"
+                )
+        except subprocess.TimeoutExpired:
+            raise LLMBackendError(f"CCR timed out after {request.timeout}s ({request.skill})")
+        finally:
+            # Reached early when the consumer closes the stream, or on a timeout
+            # or cancellation: stop generation
+            if proc is not None and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def healthy(self) -> bool:
+        try:
+            result = subprocess.run(
+                CCR_STATUS_COMMAND,
+                capture_output=True,
+                text=True,
+                shell=False,
+                stdin=subprocess.DEVNULL,
+                timeout=30
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return result.returncode == 0
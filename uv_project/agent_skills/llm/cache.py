@@ -0,0 +1,266 @@
+"""Content-addressed on-disk cache for LLM responses.
+
+Entries are keyed by a hash of (skill, prompt template version, normalized
+content, model) and stored in a small SQLite database. Call sites pass
+``model_key(skill, priority)`` as the model, which names both the backend and
+the model ``routing`` picks for the call's tier, so retargeting a tier misses
+instead of serving the old model's answers. The store is bounded
+by total payload size (least recently used entries are evicted first) and by
+age (entries older than the TTL are treated as misses). Concurrent identical
+requests inside one process share a single computation (singleflight).
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from agent_skills import metrics
+from . import routing
+
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = Path(os.environ.get(
+    "LLM_CACHE_PATH", Path(__file__).resolve().parents[2] / "llm_cache.sqlite3"
+))
+LLM_CACHE_MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024)
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def normalize_content(content: str) -> str:
+    """Collapse whitespace so cosmetic edits do not miss the cache."""
+    return re.sub(r"\s+", " ", content).strip()
+
+
+def prefix_digest(prefix: Sequence[str]) -> str:
+    """Short hash of static prompt blocks, for folding into a template version."""
+    return hashlib.sha256("\x00".join(prefix).encode("utf-8")).hexdigest()[:12]
+
+
+def model_key(skill: str, priority: Optional[str] = None) -> str:
+    """Model part of the cache key for a call of ``skill`` about an item of ``priority``."""
+    from .executor import get_executor
+    model = routing.model_for(routing.tier_for(skill, priority))
+    return f"{get_executor().model_id}|{model or 'default'}"
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMCache:
+    """Size-bounded LRU + TTL cache of LLM results, shared across restarts."""
+
+    def __init__(
+        self,
+        path: Path = LLM_CACHE_PATH,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl: float = LLM_CACHE_TTL
+    ):
+        """Open (or create) the cache database.
+
+        Args:
+            path: SQLite file holding the entries
+            max_bytes: Upper bound on the total size of stored values
+            ttl: Seconds after which an entry expires
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, skill TEXT, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+
+    @staticmethod
+    def make_key(skill: str, version: str, content: str, model: str) -> str:
+        payload = json.dumps([skill, version, normalize_content(content), model])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key`` or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created > self.ttl:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                metrics.incr("llm.cache.expired")
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def put(self, key: str, value: Any, skill: str = ""):
+        """Store ``value`` (must be JSON-serializable) and evict down to ``max_bytes``."""
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, skill, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, skill, data, len(data), now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        metrics.incr("llm.cache.evictions", len(doomed))
+
+    def _model(self, model: Optional[str]) -> str:
+        if model is not None:
+            return model
+        from .executor import get_executor
+        return get_executor().model_id
+
+    def peek(self, skill: str, version: str, content: str, model: Optional[str] = None) -> Optional[Any]:
+        """Look up a result without computing it on a miss."""
+        key = self.make_key(skill, version, content, self._model(model))
+        metrics.incr("llm.cache.lookups")
+        value = self.get(key)
+        metrics.incr("llm.cache.hits" if value is not None else "llm.cache.misses")
+        return value
+
+    def store(self, skill: str, version: str, content: str, value: Any, model: Optional[str] = None):
+        """Cache a result computed outside ``get_or_compute`` (e.g. by a batch call)."""
+        self.put(self.make_key(skill, version, content, self._model(model)), value, skill)
+
+    def get_or_compute(
+        self,
+        skill: str,
+        version: str,
+        content: str,
+        compute: Callable[[], Any],
+        model: Optional[str] = None
+    ) -> Any:
+        """Return the cached result, or run ``compute`` once and cache it.
+
+        Concurrent callers asking for the same key wait for the first caller's
+        result instead of computing it again. Exceptions from ``compute`` are
+        propagated to every waiter and nothing is cached.
+        """
+        key = self.make_key(skill, version, content, self._model(model))
+        metrics.incr("llm.cache.lookups")
+
+        value = self.get(key)
+        if value is not None:
+            metrics.incr("llm.cache.hits")
+            metrics.incr(f"llm.cache.{skill}.hits")
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            metrics.incr("llm.cache.shared")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        metrics.incr("llm.cache.misses")
+        metrics.incr(f"llm.cache.{skill}.misses")
+        try:
+            flight.value = compute()
+            if flight.value is not None:
+                self.put(key, flight.value, skill)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus the current size of the store."""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {
+            "hits": metrics.get("llm.cache.hits"),
+            "misses": metrics.get("llm.cache.misses"),
+            "shared": metrics.get("llm.cache.shared"),
+            "evictions": metrics.get("llm.cache.evictions"),
+            "hit_rate": metrics.ratio("llm.cache.hits", "llm.cache.lookups"),
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _NullCache:
+    """Stand-in used when caching is disabled with LLM_CACHE=0."""
+
+    def get_or_compute(self, skill, version, content, compute, model=None):
+        return compute()
+
+    def peek(self, skill, version, content, model=None):
+        return None
+
+    def store(self, skill, version, content, value, model=None):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+_cache: Optional[Any] = None
+_cache_lock = threading.Lock()
+
+
+def recording() -> bool:
+    """True while a cassette is being recorded."""
+    from .cassette import LLM_CASSETTE_MODE
+    from .executor import LLM_BACKEND
+    return LLM_BACKEND == "cassette" and LLM_CASSETTE_MODE == "record"
+
+
+def get_cache():
+    """Return the process-wide LLM cache, opening it on first use.
+
+    The cache is bypassed while a cassette is recorded: a cached answer would
+    never reach the backend, so its prompt would be missing at replay time.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if recording():
+                print("Recording a cassette: the LLM cache is bypassed.", flush=True)
+            _cache = LLMCache() if LLM_CACHE_ENABLED and not recording() else _NullCache()
+        return _cache
@@ -0,0 +1,235 @@
+"""Record/replay backend for offline, deterministic pipeline runs.
+
+With ``LLM_BACKEND=cassette`` every skill talks to a ``CassetteBackend``:
+
+- ``LLM_CASSETTE_MODE=record`` forwards each request to the real backend
+  (``LLM_CASSETTE_INNER``, "ccr" by default) and appends the prompt hash,
+  response and observed latency to the cassette file (JSON lines). The LLM
+  cache is bypassed while recording so that every prompt reaches the
+  backend and ends up in the cassette.
+- ``LLM_CASSETTE_MODE=replay`` answers from the cassette without starting
+  any process or opening any connection. ``LLM_CASSETTE_LATENCY`` selects
+  how long a replayed call takes: ``none`` (instant), ``recorded`` (the
+  latency seen while recording) or ``synthetic`` (sampled from a log-normal
+  fitted to the recorded latencies of the same skill).
+
+Replays are keyed on skill + whitespace-normalized full prompt. Prompts that
+were never recorded raise LLMBackendError, so skills take their usual
+fallback path, unless ``LLM_CASSETTE_MISS=skill`` is set, in which case the
+recorded responses of the same skill are served round-robin (useful for
+load tests where note contents carry fresh timestamps).
+
+Run ``python -m agent_skills.llm.cassette [path]`` to summarize a cassette.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from agent_skills import metrics
+from .backends import Backend, LLMBackendError, LLMCancelledError, LLMRequest
+from .cache import normalize_content
+
+LLM_CASSETTE_PATH = Path(os.environ.get(
+    "LLM_CASSETTE_PATH", Path(__file__).resolve().parents[2] / "llm_cassette.jsonl"
+))
+LLM_CASSETTE_MODE = os.environ.get("LLM_CASSETTE_MODE", "replay")
+LLM_CASSETTE_INNER = os.environ.get("LLM_CASSETTE_INNER", "ccr")
+LLM_CASSETTE_LATENCY = os.environ.get("LLM_CASSETTE_LATENCY", "none")
+# Multiplies every replayed latency (0.1 = ten times faster than recorded)
+LLM_CASSETTE_SPEED = float(os.environ.get("LLM_CASSETTE_SPEED", "1.0"))
+LLM_CASSETTE_MISS = os.environ.get("LLM_CASSETTE_MISS", "error")
+
+
+def request_key(request: LLMRequest) -> str:
+    payload = json.dumps([request.skill, request.model, normalize_content(request.full_prompt())])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """The recorded interactions in one cassette file, shared by all workers."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries: Dict[str, dict] = {}
+        self.by_skill: Dict[str, List[dict]] = {}
+        self._next: Dict[str, int] = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a torn last line from an interrupted recording
+                self._add(entry)
+
+    def _add(self, entry: dict):
+        self.entries[entry["key"]] = entry
+        self.by_skill.setdefault(entry["skill"], []).append(entry)
+
+    def record(self, request: LLMRequest, response: str, latency: float):
+        entry = {
+            "key": request_key(request),
+            "skill": request.skill,
+            "model": request.model,
+            "prompt_chars": len(request.full_prompt()),
+            "response": response,
+            "latency": round(latency, 4),
+            "recorded": time.time(),
+        }
+        with self._lock:
+            self._add(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def lookup(self, request: LLMRequest, on_miss: str = "error") -> Optional[dict]:
+        with self._lock:
+            entry = self.entries.get(request_key(request))
+            if entry is not None or on_miss != "skill":
+                return entry
+            recorded = self.by_skill.get(request.skill)
+            if not recorded:
+                return None
+            i = self._next.get(request.skill, 0)
+            self._next[request.skill] = i + 1
+            return recorded[i % len(recorded)]
+
+    def latencies(self, skill: str) -> List[float]:
+        with self._lock:
+            return [e["latency"] for e in self.by_skill.get(skill, []) if e.get("latency")]
+
+
+_cassettes: Dict[Path, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: Path = LLM_CASSETTE_PATH) -> Cassette:
+    path = Path(path).resolve()
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path)
+        return _cassettes[path]
+
+
+class CassetteBackend(Backend):
+    """Records real LLM calls to a cassette, or replays them offline."""
+
+    name = "cassette"
+
+    def __init__(
+        self,
+        mode: str = LLM_CASSETTE_MODE,
+        path: Path = LLM_CASSETTE_PATH,
+        inner: Optional[Backend] = None,
+        latency: str = LLM_CASSETTE_LATENCY,
+        speed: float = LLM_CASSETTE_SPEED,
+        on_miss: str = LLM_CASSETTE_MISS
+    ):
+        """Initialize the backend.
+
+        Args:
+            mode: "record" or "replay"
+            path: Cassette file (JSON lines)
+            inner: Backend that answers while recording (defaults to LLM_CASSETTE_INNER)
+            latency: Replay latency model: "none", "recorded" or "synthetic"
+            speed: Factor applied to every replayed latency
+            on_miss: "error" or "skill" (see module docstring)
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if latency not in ("none", "recorded", "synthetic"):
+            raise ValueError(f"Unknown cassette latency model: {latency}")
+        self.mode = mode
+        self.cassette = get_cassette(path)
+        self.latency = latency
+        self.speed = speed
+        self.on_miss = on_miss
+        self.inner = inner
+        if mode == "record" and inner is None:
+            from .executor import make_backend
+            self.inner = make_backend(LLM_CASSETTE_INNER)
+
+    def complete(self, request: LLMRequest) -> str:
+        if self.mode == "record":
+            started = time.monotonic()
+            text = self.inner.complete(request)
+            self.cassette.record(request, text, time.monotonic() - started)
+            metrics.incr("llm.cassette.recorded")
+            return text
+        return self._replay(request)
+
+    def stream(self, request: LLMRequest) -> Iterator[str]:
+        if self.mode == "replay":
+            yield self._replay(request)
+            return
+        started = time.monotonic()
+        parts = []
+        for chunk in self.inner.stream(request):
+            parts.append(chunk)
+            yield chunk
+        # Only complete answers are recorded; a cancelled stream never gets here
+        self.cassette.record(request, "".join(parts).strip(), time.monotonic() - started)
+        metrics.incr("llm.cassette.recorded")
+
+    def _replay(self, request: LLMRequest) -> str:
+        entry = self.cassette.lookup(request, self.on_miss)
+        if entry is None:
+            metrics.incr("llm.cassette.misses")
+            raise LLMBackendError(f"No cassette recording for this prompt ({request.skill})")
+        metrics.incr("llm.cassette.hits")
+        delay = self._delay(entry) * self.speed
+        if request.timeout is not None and delay > request.timeout:
+            time.sleep(request.timeout)
+            raise LLMBackendError(f"Cassette replay timed out after {request.timeout}s ({request.skill})")
+        if delay > 0 and request.cancel is not None:
+            if request.cancel.wait(delay):
+                raise LLMCancelledError(f"Cassette replay cancelled ({request.skill})")
+        elif delay > 0:
+            time.sleep(delay)
+        return entry["response"]
+
+    def _delay(self, entry: dict) -> float:
+        if self.latency == "recorded":
+            return entry.get("latency", 0.0)
+        if self.latency == "synthetic":
+            samples = [math.log(x) for x in self.cassette.latencies(entry["skill"]) if x > 0]
+            if len(samples) < 2:
+                return entry.get("latency", 0.0)
+            return random.lognormvariate(statistics.mean(samples), statistics.stdev(samples))
+        return 0.0
+
+    def healthy(self) -> bool:
+        return self.inner.healthy() if self.mode == "record" else True
+
+    def close(self) -> None:
+        if self.inner is not None:
+            self.inner.close()
+
+
+def summarize(path: Path = LLM_CASSETTE_PATH) -> str:
+    cassette = Cassette(path)
+    lines = [f"{path}: {len(cassette.entries)} recordings"]
+    for skill, entries in sorted(cassette.by_skill.items()):
+        latencies = sorted(e.get("latency", 0.0) for e in entries)
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        lines.append(f"  {skill}: {len(entries)} calls, p50 {p50:.2f}s, p95 {p95:.2f}s")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(summarize(Path(sys.argv[1]) if len(sys.argv) > 1 else LLM_CASSETTE_PATH))
@@ -0,0 +1,646 @@
+"""Shared, long-lived LLM executor.
+
+All AI skills submit prompts here instead of each starting and tearing down
+its own backend. The executor keeps ``pool_size`` worker threads alive, each
+owning a backend instance that is reused across calls. Idle workers probe
+their backend every ``health_interval`` seconds, and a backend that fails its
+health check or ``max_failures`` calls in a row is closed and recreated.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, TimeoutError as FutureTimeout, wait
+from dataclasses import replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Type
+
+from agent_skills import metrics
+from . import routing
+from .admission import AdmissionController, CircuitBreaker
+from .backends import Backend, CCRBackend, LLMBackendError, LLMCancelledError, LLMParseError, LLMRequest
+from .parsing import extract_json
+from .structured import build, parse_structured, repair_prompt
+
+LLM_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", "4"))
+LLM_HEALTH_INTERVAL = float(os.environ.get("LLM_HEALTH_INTERVAL", "60"))
+LLM_MAX_FAILURES = int(os.environ.get("LLM_MAX_FAILURES", "3"))
+# Deadline for calls that do not pass their own timeout: queueing, waiting for
+# an admission slot and the backend call itself must all fit in it
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", "180"))
+# Extra seconds a caller waits past the deadline for the worker to report back
+DEADLINE_GRACE = 5.0
+
+# Hedging (opt-in per skill): a call still running after the skill's rolling
+# p95 latency is duplicated on another worker and the first valid answer wins
+LLM_HEDGE_SKILLS = {s.strip() for s in os.environ.get("LLM_HEDGE_SKILLS", "").split(",") if s.strip()}
+# Calls with side effects are never duplicated, whatever LLM_HEDGE_SKILLS says
+LLM_HEDGE_SKILLS -= {"send_email"}
+# Maximum share of hedge-enabled calls that may send a duplicate
+LLM_HEDGE_BUDGET = float(os.environ.get("LLM_HEDGE_BUDGET", "0.1"))
+# Successful calls of a skill needed before its p95 is trusted
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW = 200
+# "ccr" shells out to Claude Code Router, "anthropic" calls the Messages API,
+# "cassette" records or replays calls offline (see cassette.py)
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "ccr")
+
+
+def model_id_for(name: str) -> str:
+    """Identifies the model behind backend ``name`` (used in cache keys)."""
+    if name == "anthropic":
+        from .anthropic_backend import ANTHROPIC_MODEL
+        return f"anthropic:{ANTHROPIC_MODEL}"
+    if name == "cassette":
+        from .cassette import LLM_CASSETTE_INNER, LLM_CASSETTE_MODE, LLM_CASSETTE_PATH
+        if LLM_CASSETTE_MODE == "record":
+            return model_id_for(LLM_CASSETTE_INNER)
+        return f"cassette:{LLM_CASSETTE_PATH.name}"
+    return f"ccr:{os.environ.get('CCR_MODEL', 'default')}"
+
+
+def default_model_id() -> str:
+    return model_id_for(LLM_BACKEND)
+
+
+def make_backend(name: str) -> Backend:
+    if name == "anthropic":
+        from .anthropic_backend import AnthropicBackend
+        return AnthropicBackend()
+    if name == "cassette":
+        from .cassette import CassetteBackend
+        return CassetteBackend()
+    return CCRBackend()
+
+
+def default_backend_factory() -> Backend:
+    return make_backend(LLM_BACKEND)
+
+
+class _Job:
+    def __init__(self, request: LLMRequest):
+        self.request = request
+        self.future: Future = Future()
+        self.submitted = time.monotonic()
+        self.deadline = self.submitted + (request.timeout or LLM_DEADLINE)
+        self.cancel = threading.Event()
+
+
+class _StreamJob(_Job):
+    def __init__(self, request: LLMRequest):
+        super().__init__(request)
+        self.chunks: "queue.Queue[Optional[str]]" = queue.Queue()
+
+
+class StreamHandle:
+    """Iterates over the text chunks of a streaming completion.
+
+    Call ``close()`` (or leave the ``with`` block) to stop generation early;
+    the worker then closes the backend stream, which kills the CCR process or
+    drops the HTTP response. Iterating raises LLMBackendError (and cancels
+    the call) if no chunk arrives before the call's deadline.
+    """
+
+    def __init__(self, job: _StreamJob):
+        self._job = job
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            try:
+                chunk = self._job.chunks.get(
+                    timeout=max(0.0, self._job.deadline - time.monotonic() + DEADLINE_GRACE)
+                )
+            except queue.Empty:
+                self._job.cancel.set()
+                self._job.future.cancel()
+                metrics.incr("llm.deadline_exceeded")
+                raise LLMBackendError(f"LLM stream missed its deadline ({self._job.request.skill})")
+            if chunk is None:
+                break
+            yield chunk
+        error = self._job.future.exception()
+        if error is not None and not self._job.cancel.is_set():
+            raise error
+
+    def close(self):
+        self._job.cancel.set()
+
+    def text(self) -> str:
+        """Block until the stream ends and return everything generated."""
+        return self._job.future.result()
+
+    def __enter__(self) -> "StreamHandle":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Worker(threading.Thread):
+    def __init__(self, executor: "LLMExecutor", index: int):
+        super().__init__(name=f"llm-worker-{index}", daemon=True)
+        self.executor = executor
+        self.backend: Optional[Backend] = None
+        self.failures = 0
+
+    def run(self):
+        self.backend = self.executor._new_backend()
+        while True:
+            try:
+                job = self.executor._jobs.get(timeout=self.executor.health_interval)
+            except queue.Empty:
+                self._health_check()
+                continue
+            if job is None:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                # The caller gave up (or a hedge won) while the job was queued
+                if job.cancel.is_set():
+                    self.executor.breaker.abandon()
+                else:
+                    self.executor.breaker.record(False)
+                continue
+            self._execute(job)
+        self._close_backend()
+
+    def _execute(self, job: _Job):
+        metrics.incr("llm.calls")
+        metrics.set_gauge("llm.queue_depth", self.executor._jobs.qsize())
+        admission, breaker = self.executor.admission, self.executor.breaker
+        if not admission.acquire(job.deadline):
+            breaker.record(False)
+            self._fail_unstarted(job, LLMBackendError(
+                f"LLM deadline expired before a slot was free ({job.request.skill})"
+            ))
+            return
+
+        # The backend gets whatever is left of the call's deadline
+        request = replace(
+            job.request, timeout=max(0.1, job.deadline - time.monotonic()), cancel=job.cancel
+        )
+        started = time.monotonic()
+        kind = f"{job.request.skill}:{job.request.model or 'default'}"
+        try:
+            if isinstance(job, _StreamJob):
+                text = self._stream(job, request)
+            else:
+                text = self.backend.complete(request)
+        except LLMCancelledError as e:
+            admission.release(time.monotonic() - started, ok=True, sample=False)
+            breaker.abandon()
+            job.future.set_exception(e)
+            return
+        except Exception as e:
+            admission.release(time.monotonic() - started, ok=False, key=kind)
+            breaker.record(False)
+            metrics.incr("llm.errors")
+            self.failures += 1
+            job.future.set_exception(e)
+            if self.failures >= self.executor.max_failures:
+                print(f"LLM {self.name}: {self.failures} consecutive failures, restarting backend", flush=True)
+                self._restart()
+            return
+        admission.release(time.monotonic() - started, ok=True, key=kind)
+        breaker.record(True)
+        self.failures = 0
+        latency = time.monotonic() - job.submitted
+        metrics.incr("llm.latency_seconds", latency)
+        model = job.request.model or "default"
+        metrics.incr(f"llm.model.{model}.calls")
+        metrics.incr(f"llm.model.{model}.latency_seconds", latency)
+        if not job.cancel.is_set():
+            self.executor._observe_latency(job.request.skill, latency)
+        job.future.set_result(text)
+
+    def _fail_unstarted(self, job: _Job, error: Exception):
+        metrics.incr("llm.errors")
+        if isinstance(job, _StreamJob):
+            job.chunks.put(None)
+        job.future.set_exception(error)
+
+    def _stream(self, job: _StreamJob, request: LLMRequest) -> str:
+        parts = []
+        chunks = self.backend.stream(request)
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                job.chunks.put(chunk)
+                if job.cancel.is_set():
+                    metrics.incr("llm.stream.cancelled")
+                    break
+        finally:
+            chunks.close()
+            job.chunks.put(None)
+        return "".join(parts)
+
+    def _health_check(self):
+        try:
+            ok = self.backend.healthy()
+        except Exception:
+            ok = False
+        if not ok:
+            print(f"LLM {self.name}: backend failed health check, restarting", flush=True)
+            self._restart()
+
+    def _restart(self):
+        metrics.incr("llm.restarts")
+        self._close_backend()
+        self.backend = self.executor._new_backend()
+        self.failures = 0
+
+    def _close_backend(self):
+        if self.backend is not None:
+            try:
+                self.backend.close()
+            except Exception as e:
+                print(f"LLM {self.name}: error closing backend: {e}", flush=True)
+            self.backend = None
+
+
+def _confidence(value: Any) -> Optional[float]:
+    """Self-reported confidence of an answer (the lowest one for a list)."""
+    if isinstance(value, dict):
+        return value.get("confidence")
+    if isinstance(value, list):
+        scores = [v.get("confidence") for v in value if isinstance(v, dict)]
+        scores = [c for c in scores if isinstance(c, (int, float))]
+        return min(scores) if scores else None
+    return None
+
+
+class LLMExecutor:
+    """A pool of warm LLM workers behind a single ``complete()`` call."""
+
+    def __init__(
+        self,
+        backend_factory: Callable[[], Backend] = default_backend_factory,
+        pool_size: int = LLM_POOL_SIZE,
+        health_interval: float = LLM_HEALTH_INTERVAL,
+        max_failures: int = LLM_MAX_FAILURES,
+        model_id: Optional[str] = None
+    ):
+        """Initialize the executor and start its workers.
+
+        Args:
+            backend_factory: Callable creating one backend per worker
+            pool_size: Number of warm workers kept alive
+            health_interval: Seconds an idle worker waits before probing its backend
+            max_failures: Consecutive failed calls after which a backend is recreated
+            model_id: Name of the model the backends talk to (defaults to the
+                configured LLM_BACKEND model)
+        """
+        self.backend_factory = backend_factory
+        self.model_id = model_id or default_model_id()
+        self.pool_size = max(1, pool_size)
+        self.health_interval = health_interval
+        self.max_failures = max(1, max_failures)
+        self._jobs: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers: List[_Worker] = []
+        self.admission = AdmissionController(self.pool_size)
+        self.breaker = CircuitBreaker()
+        self._latencies: Dict[str, deque] = {}
+        self._hedge_calls = 0
+        self._hedges_sent = 0
+        for i in range(self.pool_size):
+            self._start_worker(i)
+        metrics.set_gauge("llm.pool_size", self.pool_size)
+
+    def _new_backend(self) -> Backend:
+        return self.backend_factory()
+
+    def _start_worker(self, index: int) -> _Worker:
+        worker = _Worker(self, index)
+        worker.start()
+        if index < len(self._workers):
+            self._workers[index] = worker
+        else:
+            self._workers.append(worker)
+        return worker
+
+    def _ensure_workers(self):
+        """Replace any worker thread that died unexpectedly."""
+        with self._lock:
+            for i, worker in enumerate(self._workers):
+                if not worker.is_alive():
+                    metrics.incr("llm.restarts")
+                    self._start_worker(i)
+
+    def _observe_latency(self, skill: str, latency: float):
+        with self._lock:
+            self._latencies.setdefault(skill, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def latency_p95(self, skill: str) -> Optional[float]:
+        """Rolling p95 latency of recent successful calls, or None if too few."""
+        with self._lock:
+            samples = sorted(self._latencies.get(skill, ()))
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def submit(self, request: LLMRequest) -> Future:
+        """Queue a request and return a Future resolving to the raw text."""
+        return self._enqueue(_Job(request)).future
+
+    def _enqueue(self, job: _Job) -> _Job:
+        if self._closed:
+            raise LLMBackendError("LLM executor is shut down")
+        self.breaker.check(job.request.skill)
+        self._ensure_workers()
+        self._jobs.put(job)
+        return job
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        prefix: Sequence[str] = (),
+        skill: str = "default",
+        timeout: Optional[float] = None,
+        tier: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> StreamHandle:
+        """Run a prompt on a warm worker and iterate over its output as it arrives.
+
+        ``tier`` and ``priority`` select the model as in ``complete``.
+
+        Returns:
+            A StreamHandle yielding text chunks; close it to cancel generation
+
+        Raises:
+            LLMBackendError: Immediately if the circuit breaker is open, or while
+                iterating if the backend fails
+        """
+        request = LLMRequest(prompt=prompt, skill=skill, timeout=timeout, prefix=tuple(prefix))
+        self._route(request, tier or routing.tier_for(skill, priority))
+        metrics.incr(f"llm.skill.{skill}.calls")
+        return StreamHandle(self._enqueue(_StreamJob(request)))
+
+    def complete(
+        self,
+        prompt: str,
+        schema: Optional[Dict[str, Any]] = None,
+        *,
+        prefix: Sequence[str] = (),
+        skill: str = "default",
+        timeout: Optional[float] = None,
+        tier: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> Any:
+        """Run a prompt on a warm worker and wait for the answer.
+
+        Args:
+            prompt: Per-call prompt text
+            schema: JSON schema of the expected answer. When given, the output is
+                parsed as JSON and the decoded value is returned instead of text.
+            prefix: Static instruction blocks placed before ``prompt``; cached by
+                backends that support prompt caching
+            skill: Name of the calling skill (used for logging and metrics)
+            timeout: Deadline in seconds for the whole call, including time spent
+                queued (defaults to LLM_DEADLINE)
+            tier: Model tier ("small" or "large"); defaults to the routing
+                policy for ``skill`` and ``priority``
+            priority: Priority of the item the call is about, if known
+
+        Returns:
+            The model's text, or the decoded JSON value when ``schema`` is set
+
+        Raises:
+            LLMBackendError: If the backend fails, returns nothing, misses the
+                deadline or the circuit breaker is open
+            LLMParseError: If ``schema`` is set and the output is not valid JSON
+        """
+        request = LLMRequest(
+            prompt=prompt, schema=schema, skill=skill, timeout=timeout, prefix=tuple(prefix)
+        )
+        self._route(request, tier or routing.tier_for(skill, priority))
+        text = self._run(request)
+        if schema is None:
+            return text
+        return extract_json(text)
+
+    def structured(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        into: Optional[Type] = None,
+        *,
+        prefix: Sequence[str] = (),
+        skill: str = "default",
+        timeout: Optional[float] = None,
+        tier: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> Any:
+        """Run a prompt and return an answer that is guaranteed to match ``schema``.
+
+        Backends with native structured output (Anthropic tool use) are asked
+        for the schema directly. An answer that does not parse or validate is
+        sent back once with the validation errors for repair, on the next
+        larger model tier when one is configured. An answer whose
+        ``confidence`` field is below LLM_ESCALATE_BELOW is re-asked on the
+        next tier as well.
+
+        Args:
+            prompt: Per-call prompt text
+            schema: JSON schema the answer must satisfy
+            into: Optional dataclass (or callable taking keyword arguments) the
+                validated object is turned into
+            prefix: Static instruction blocks placed before ``prompt``
+            skill: Name of the calling skill (used for logging and metrics)
+            timeout: Deadline in seconds for each of the (at most two) calls
+            tier, priority: Model selection, as in ``complete``
+
+        Returns:
+            The validated value, or an ``into`` instance built from it
+
+        Raises:
+            LLMBackendError: If the backend fails (see ``complete``)
+            LLMParseError: If the answer is still invalid after the repair attempt
+        """
+        tier = tier or routing.tier_for(skill, priority)
+        request = LLMRequest(
+            prompt=prompt, schema=schema, skill=skill, timeout=timeout, prefix=tuple(prefix)
+        )
+        self._route(request, tier)
+        text = self._run(request)
+        try:
+            value = parse_structured(text, schema)
+        except LLMParseError as e:
+            print(f"DEBUG: {skill} answer invalid ({e}), asking for a repair", flush=True)
+            metrics.incr("llm.structured.repairs")
+            metrics.incr(f"llm.structured.{skill}.repairs")
+            repair = LLMRequest(
+                prompt=repair_prompt(text, e, schema), schema=schema,
+                skill=f"{skill}_repair", timeout=timeout
+            )
+            if routing.can_escalate(tier):
+                self._route(repair, routing.next_tier(tier), "parse_failure")
+            else:
+                self._route(repair, tier)
+            try:
+                value = parse_structured(self._run(repair), schema)
+            except LLMParseError:
+                metrics.incr("llm.structured.failures")
+                raise
+            metrics.incr("llm.structured.repaired")
+        else:
+            if routing.should_escalate(tier, _confidence(value)):
+                upper = LLMRequest(
+                    prompt=prompt, schema=schema, skill=skill, timeout=timeout, prefix=tuple(prefix)
+                )
+                self._route(upper, routing.next_tier(tier), "low_confidence")
+                try:
+                    value = parse_structured(self._run(upper), schema)
+                except (LLMBackendError, LLMParseError) as e:
+                    # The small model's answer is still valid, just less certain
+                    print(f"DEBUG: {skill} escalation failed ({e}), keeping the first answer", flush=True)
+        return build(into, value)
+
+    def _route(self, request: LLMRequest, tier: str, reason: str = "default"):
+        request.model = routing.model_for(tier)
+        routing.record(request.skill, tier, request.model, reason)
+
+    def _run(self, request: LLMRequest) -> str:
+        metrics.incr(f"llm.skill.{request.skill}.calls")
+        job = self._enqueue(_Job(request))
+        if request.skill in LLM_HEDGE_SKILLS:
+            return self._hedged_result(job)
+        return self._result(job)
+
+    def _result(self, job: _Job) -> str:
+        try:
+            return job.future.result(timeout=job.deadline - time.monotonic() + DEADLINE_GRACE)
+        except FutureTimeout:
+            job.cancel.set()
+            job.future.cancel()
+            metrics.incr("llm.deadline_exceeded")
+            raise LLMBackendError(f"LLM call missed its deadline ({job.request.skill})")
+
+    def _hedged_result(self, job: _Job) -> str:
+        """Wait for ``job``; past the skill's p95, race it against a duplicate."""
+        skill = job.request.skill
+        p95 = self.latency_p95(skill)
+        with self._lock:
+            self._hedge_calls += 1
+        if p95 is None:
+            return self._result(job)
+        done, _ = wait([job.future], timeout=p95)
+        if done or not self._take_hedge_budget():
+            return self._result(job)
+        try:
+            hedge = self._enqueue(_Job(job.request))
+        except LLMBackendError:
+            return self._result(job)  # breaker opened meanwhile
+        hedge.deadline = job.deadline
+        metrics.incr("llm.hedge.sent")
+        metrics.incr(f"llm.hedge.{skill}.sent")
+
+        pending = {job.future: job, hedge.future: hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(
+                list(pending), timeout=job.deadline - time.monotonic() + DEADLINE_GRACE,
+                return_when=FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for future in done:
+                finished = pending.pop(future)
+                error = future.exception()
+                if error is not None or not self._valid(finished.request, future.result()):
+                    error = error or LLMBackendError(f"Invalid answer ({skill})")
+                    continue
+                for loser in pending.values():
+                    loser.cancel.set()
+                    loser.future.cancel()
+                if finished is hedge:
+                    metrics.incr("llm.hedge.wins")
+                    metrics.incr(f"llm.hedge.{skill}.wins")
+                self._publish_hedge_rates()
+                return future.result()
+
+        for loser in pending.values():
+            loser.cancel.set()
+            loser.future.cancel()
+        self._publish_hedge_rates()
+        if error is not None:
+            raise error
+        metrics.incr("llm.deadline_exceeded")
+        raise LLMBackendError(f"LLM call missed its deadline ({skill})")
+
+    def _take_hedge_budget(self) -> bool:
+        with self._lock:
+            if self._hedges_sent + 1 > LLM_HEDGE_BUDGET * self._hedge_calls:
+                metrics.incr("llm.hedge.over_budget")
+                return False
+            self._hedges_sent += 1
+            return True
+
+    @staticmethod
+    def _valid(request: LLMRequest, text: str) -> bool:
+        if request.schema is None:
+            return bool(text and text.strip())
+        try:
+            extract_json(text)
+        except LLMParseError:
+            return False
+        return True
+
+    def _publish_hedge_rates(self):
+        with self._lock:
+            calls, sent = self._hedge_calls, self._hedges_sent
+        metrics.set_gauge("llm.hedge.rate", sent / calls if calls else 0.0)
+        metrics.set_gauge("llm.hedge.win_rate", metrics.ratio("llm.hedge.wins", "llm.hedge.sent"))
+
+    def shutdown(self, wait: bool = True):
+        """Stop all workers and close their backends."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _ in self._workers:
+                self._jobs.put(None)
+        if wait:
+            for worker in self._workers:
+                worker.join(timeout=5)
+
+
+_executor: Optional[LLMExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> LLMExecutor:
+    """Return the process-wide executor, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = LLMExecutor()
+            atexit.register(_executor.shutdown, False)
+        return _executor
+
+
+def set_executor(executor: Optional[LLMExecutor]) -> None:
+    """Replace the process-wide executor (e.g. with a differently configured pool)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor is not executor:
+            _executor.shutdown(wait=False)
+        _executor = executor
+
+
+def complete(prompt: str, schema: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+    """Shortcut for ``get_executor().complete(...)``."""
+    return get_executor().complete(prompt, schema, **kwargs)
+
+
+def structured(prompt: str, schema: Dict[str, Any], into: Optional[Type] = None, **kwargs) -> Any:
+    """Shortcut for ``get_executor().structured(...)``."""
+    return get_executor().structured(prompt, schema, into, **kwargs)
+
+
+def stream(prompt: str, **kwargs) -> StreamHandle:
+    """Shortcut for ``get_executor().stream(...)``."""
+    return get_executor().stream(prompt, **kwargs)
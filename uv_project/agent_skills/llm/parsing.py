@@ -0,0 +1,37 @@
+import json
+import re
+from typing import Any
+
+from .backends import LLMParseError
+
+
+def extract_json(output: str) -> Any:
+    """
+    Pulls a JSON value out of raw model output.
+
+    Handles ```json fences and conversational preamble around a bare object
+    or array. Raises LLMParseError (carrying the raw text) if nothing parses.
+    """
+    text = output.strip()
+
+    # Try to find JSON block within markdown fences
+    json_match = re.search(r'```(?:json)?\s*(.*?)\s*```', text, re.DOTALL)
+    if json_match:
+        text = json_match.group(1)
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    # Fallback: slice from the first opening bracket to the matching last closing one
+    for open_char, close_char in (('{', '}'), ('[', ']')):
+        start = text.find(open_char)
+        end = text.rfind(close_char)
+        if start != -1 and end > start:
+            try:
+                return json.loads(text[start:end + 1])
+            except json.JSONDecodeError:
+                continue
+
+    raise LLMParseError("Could not parse JSON from LLM output", text=output)
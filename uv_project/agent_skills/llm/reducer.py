@@ -0,0 +1,175 @@
+"""Shrinks note content before it is put into a prompt.
+
+Quoted reply chains, signatures, HTML markup and tracking footers carry no
+signal for triage or planning but cost input tokens and latency. ``reduce_content``
+strips them, collapses whitespace and then fits what is left into the token
+budget of the calling skill, using a cheap local token estimate.
+"""
+
+import html
+import math
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from agent_skills import metrics
+
+# Approximate input-token budget per skill for the variable part of the prompt
+TOKEN_BUDGETS = {
+    "triage": 500,
+    "plan_email": 1500,
+    "x_post": 300,
+}
+DEFAULT_BUDGET = 1000
+TRUNCATION_MARKER = "\n[... truncated]"
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+_HTML_HINT_RE = re.compile(r"<(html|body|div|p|br|table|span)\b", re.IGNORECASE)
+_HTML_DROP_RE = re.compile(r"<(script|style|head)\b.*?</\1>", re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_RE = re.compile(r"<(br|/p|/div|/tr|/h\d|li)\b[^>]*>", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+# Lines that start a quoted reply chain; everything from here on is history
+_QUOTE_HEADER_RE = re.compile(
+    r"^(On .{0,200}wrote:|-{2,}\s*Original Message\s*-{2,}|-{2,}\s*Forwarded message\s*-{2,}"
+    r"|From: .+\n(Sent|Date): .+)\s*$",
+    re.IGNORECASE | re.MULTILINE
+)
+# Lines that start a signature block
+_SIGNATURE_RE = re.compile(
+    r"^(-- ?|Sent from my \w+.*|Get Outlook for \w+.*|(Best|Kind|Warm)? ?regards,?|Cheers,?|Thanks,?)\s*$",
+    re.IGNORECASE | re.MULTILINE
+)
+# Lines that mark the beginning of a marketing / tracking footer
+_FOOTER_RE = re.compile(
+    r"unsubscribe|view (it |this )?in (your )?browser|manage (your )?(email )?preferences"
+    r"|you are receiving this|you received this|privacy policy|© ?\d{4}|copyright \d{4}",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class ReducedContent:
+    """Reduced text plus how much was saved."""
+    text: str
+    original_bytes: int
+    reduced_bytes: int
+    original_tokens: int
+    reduced_tokens: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.reduced_bytes
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.reduced_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast token estimate: ~4 characters per word piece, 1 per punctuation mark."""
+    return sum(math.ceil(len(piece) / 4) for piece in _WORD_RE.findall(text))
+
+
+def strip_html(text: str) -> str:
+    if not _HTML_HINT_RE.search(text):
+        return text
+    text = _HTML_DROP_RE.sub("", text)
+    text = _HTML_BREAK_RE.sub("\n", text)
+    text = _HTML_TAG_RE.sub("", text)
+    return html.unescape(text)
+
+
+def strip_quoted(text: str) -> str:
+    match = _QUOTE_HEADER_RE.search(text)
+    if match and match.start() > 0:
+        text = text[:match.start()]
+    return "\n".join(line for line in text.splitlines() if not line.lstrip().startswith(">"))
+
+
+def strip_signature(text: str) -> str:
+    # Only treat a sign-off as a signature if it sits in the last third of the note
+    for match in _SIGNATURE_RE.finditer(text):
+        if match.start() >= len(text) * 2 / 3:
+            return text[:match.start()]
+    return text
+
+
+def strip_footer(text: str) -> str:
+    lines = text.splitlines()
+    tail_start = max(0, len(lines) - 15)
+    for i in range(tail_start, len(lines)):
+        if _FOOTER_RE.search(lines[i]):
+            return "\n".join(lines[:i])
+    return text
+
+
+def collapse_whitespace(text: str) -> str:
+    text = re.sub(r"[ \t\u00a0]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def fit_to_budget(text: str, budget: int) -> str:
+    """Cut ``text`` at a line boundary so it fits in ``budget`` estimated tokens."""
+    if estimate_tokens(text) <= budget:
+        return text
+    kept = []
+    used = estimate_tokens(TRUNCATION_MARKER)
+    for line in text.splitlines():
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            # Keep the head of an over-long line rather than dropping it whole
+            room = (budget - used) * 4
+            if room > 20:
+                kept.append(line[:room])
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept) + TRUNCATION_MARKER
+
+
+def split_frontmatter(text: str):
+    """Return (frontmatter block including fences, body); frontmatter may be ''."""
+    if text.startswith("---"):
+        end = text.find("\n---", 3)
+        if end != -1:
+            end = text.find("\n", end + 4)
+            end = len(text) if end == -1 else end + 1
+            return text[:end], text[end:]
+    return "", text
+
+
+def reduce_content(text: str, skill: str = "default", budget: Optional[int] = None) -> ReducedContent:
+    """Strip noise from ``text`` and fit it to the token budget of ``skill``.
+
+    The YAML frontmatter is kept verbatim; only the body is reduced.
+    """
+    if budget is None:
+        budget = TOKEN_BUDGETS.get(skill, DEFAULT_BUDGET)
+    original_tokens = estimate_tokens(text)
+
+    header, body = split_frontmatter(text.replace("\r\n", "\n"))
+    body = strip_html(body)
+    body = strip_quoted(body)
+    body = strip_footer(body)
+    body = strip_signature(body)
+    body = collapse_whitespace(body)
+    body = fit_to_budget(body, max(budget - estimate_tokens(header), 50))
+    reduced = (header + "\n" + body).strip() if header else body
+
+    result = ReducedContent(
+        text=reduced,
+        original_bytes=len(text.encode("utf-8")),
+        reduced_bytes=len(reduced.encode("utf-8")),
+        original_tokens=original_tokens,
+        reduced_tokens=estimate_tokens(reduced),
+    )
+    metrics.incr(f"reducer.{skill}.calls")
+    metrics.incr(f"reducer.{skill}.bytes_saved", result.bytes_saved)
+    metrics.incr(f"reducer.{skill}.tokens_saved", result.tokens_saved)
+    if result.bytes_saved > 0:
+        print(f"DEBUG: Reduced {skill} input by {result.bytes_saved} bytes "
+              f"(~{result.tokens_saved} tokens, {result.original_tokens} -> {result.reduced_tokens})")
+    return result
@@ -0,0 +1,101 @@
+"""Cost/latency-aware model routing.
+
+Every call is assigned a tier: ``small`` (fast, cheap) or ``large``. Short,
+mechanical skills (triage, X posts) default to ``small``; open-ended ones
+(plans, sending email) to ``large``. The priority of the item, when known,
+overrides the skill default: high-priority items always get the large model
+and low-priority ones the small one. Callers escalate to the next tier when
+an answer fails to parse or reports low confidence.
+
+Tier -> model names come from ``LLM_MODEL_SMALL`` / ``LLM_MODEL_LARGE``. For
+the Anthropic backend they default to Haiku / ``ANTHROPIC_MODEL``; for CCR
+they default to None, i.e. whatever the router is configured to use, which
+turns routing into a no-op until the tiers are configured.
+
+Decisions are counted in metrics (``llm.route.<skill>.<tier>``,
+``llm.route.escalations``) and, with ``LLM_ROUTING_LOG`` set, appended to a
+JSON-lines file for offline tuning.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from agent_skills import metrics
+
+LLM_ROUTING_ENABLED = os.environ.get("LLM_ROUTING", "1") != "0"
+LLM_ROUTING_LOG = os.environ.get("LLM_ROUTING_LOG") or None
+# Answers reporting a confidence below this are retried on the next tier
+LLM_ESCALATE_BELOW = float(os.environ.get("LLM_ESCALATE_BELOW", "0.6"))
+
+SMALL, LARGE = "small", "large"
+TIERS = (SMALL, LARGE)
+
+SKILL_TIERS = {
+    "triage": SMALL,
+    "triage_batch": SMALL,
+    "x_post": SMALL,
+    "plan_email": LARGE,
+    "send_email": LARGE,
+}
+DEFAULT_TIER = LARGE
+
+_PRIORITY_TIERS = {"high": LARGE, "low": SMALL}
+_log_lock = threading.Lock()
+
+
+def tier_for(skill: str, priority: Optional[str] = None) -> str:
+    """Tier a call from ``skill`` about an item of ``priority`` should use."""
+    if not LLM_ROUTING_ENABLED:
+        return DEFAULT_TIER
+    if priority and priority.lower() in _PRIORITY_TIERS:
+        return _PRIORITY_TIERS[priority.lower()]
+    return SKILL_TIERS.get(skill.split("_repair")[0], DEFAULT_TIER)
+
+
+def next_tier(tier: str) -> Optional[str]:
+    """The tier to escalate to, or None if ``tier`` is already the largest."""
+    index = TIERS.index(tier) if tier in TIERS else len(TIERS) - 1
+    return TIERS[index + 1] if index + 1 < len(TIERS) else None
+
+
+def model_for(tier: str) -> Optional[str]:
+    """Model name for ``tier`` on the configured backend (None = backend default)."""
+    configured = os.environ.get(f"LLM_MODEL_{tier.upper()}")
+    if configured:
+        return configured
+    from .executor import LLM_BACKEND
+    backend = LLM_BACKEND
+    if backend == "cassette":
+        from .cassette import LLM_CASSETTE_INNER
+        backend = LLM_CASSETTE_INNER
+    if backend == "anthropic":
+        from .anthropic_backend import ANTHROPIC_MODEL
+        return "claude-haiku-4-5" if tier == SMALL else ANTHROPIC_MODEL
+    return None
+
+
+def can_escalate(tier: str) -> bool:
+    """True if escalating from ``tier`` would actually reach a different model."""
+    upper = next_tier(tier)
+    return LLM_ROUTING_ENABLED and upper is not None and model_for(upper) != model_for(tier)
+
+
+def should_escalate(tier: str, confidence) -> bool:
+    """True if an answer with self-reported ``confidence`` warrants the next tier."""
+    return isinstance(confidence, (int, float)) and confidence < LLM_ESCALATE_BELOW and can_escalate(tier)
+
+
+def record(skill: str, tier: str, model: Optional[str], reason: str = "default"):
+    """Count a routing decision and append it to the routing log, if enabled."""
+    metrics.incr(f"llm.route.{skill}.{tier}")
+    if reason != "default":
+        metrics.incr("llm.route.escalations")
+        metrics.incr(f"llm.route.{skill}.escalations")
+        print(f"DEBUG: Escalating {skill} to the {tier} model ({reason})", flush=True)
+    if LLM_ROUTING_LOG:
+        entry = {"ts": time.time(), "skill": skill, "tier": tier, "model": model, "reason": reason}
+        with _log_lock, open(LLM_ROUTING_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
@@ -0,0 +1,105 @@
+"""Schema-validated structured output.
+
+``LLMExecutor.structured()`` asks for an answer matching a JSON schema and
+only returns values that pass ``validate``. Backends with native support
+(the Anthropic backend, via a forced tool call) return the JSON directly;
+for the rest the JSON is pulled out of the text with ``extract_json``. An
+answer that does not parse or validate gets exactly one repair round trip,
+which shows the model its own answer and the validation errors; if that
+fails too, LLMParseError is raised and the caller takes its fallback path.
+
+Only the schema keywords the skills use are checked: ``type``, ``enum``,
+``properties``, ``required`` and ``items``.
+"""
+
+import dataclasses
+import json
+from typing import Any, Dict, List, Optional, Type
+
+from .backends import LLMParseError
+from .parsing import extract_json
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float),
+    "null": type(None),
+}
+
+REPAIR_TEMPLATE = '''Your previous answer did not match the required JSON schema.
+
+Problems:
+{errors}
+
+Previous answer:
+{answer}
+
+Required JSON schema:
+{schema}
+
+Respond ONLY with the corrected JSON. Keep the content of the previous answer; fix only the structure and values listed above. Do not perform any task again.'''
+
+
+def validate(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """Return a list of human-readable schema violations (empty if valid)."""
+    errors: List[str] = []
+    expected = schema.get("type")
+    if expected:
+        python_type = _TYPES.get(expected)
+        # bool is a subclass of int, but true/false is not a number in JSON
+        if python_type and (not isinstance(value, python_type) or (
+            isinstance(value, bool) and expected in ("integer", "number")
+        )):
+            return [f"{path}: expected {expected}, got {type(value).__name__}"]
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}: missing required field '{key}'")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate(value[key], sub_schema, f"{path}.{key}"))
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def parse_structured(text: str, schema: Dict[str, Any]) -> Any:
+    """Decode ``text`` and check it against ``schema``; raise LLMParseError otherwise."""
+    value = extract_json(text)
+    errors = validate(value, schema)
+    if errors:
+        raise SchemaError(errors, text)
+    return value
+
+
+class SchemaError(LLMParseError):
+    """The output parsed as JSON but does not match the schema."""
+
+    def __init__(self, errors: List[str], text: str = ""):
+        super().__init__("LLM output does not match the schema: " + "; ".join(errors[:5]), text=text)
+        self.errors = errors
+
+
+def repair_prompt(answer: str, error: LLMParseError, schema: Dict[str, Any]) -> str:
+    errors = getattr(error, "errors", None) or ["the answer is not valid JSON"]
+    return REPAIR_TEMPLATE.format(
+        errors="\n".join(f"- {e}" for e in errors[:20]),
+        answer=answer.strip()[:4000],
+        schema=json.dumps(schema, indent=2)
+    )
+
+
+def build(into: Optional[Type], value: Any) -> Any:
+    """Turn a validated value into ``into`` (a dataclass, or any callable taking kwargs)."""
+    if into is None:
+        return value
+    if dataclasses.is_dataclass(into):
+        names = {f.name for f in dataclasses.fields(into)}
+        return into(**{k: v for k, v in value.items() if k in names})
+    return into(**value)
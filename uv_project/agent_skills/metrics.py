@@ -0,0 +1,64 @@
+"""Process-wide counters and gauges shared by the agent skills.
+
+Every long-running loop (watcher, brain loop, vault worker, sender) lives in
+its own process, so a plain in-memory registry is enough. Call ``snapshot()``
+to inspect the current values or ``log_snapshot()`` to print them.
+"""
+
+import threading
+from typing import Dict, Union
+
+Number = Union[int, float]
+
+_lock = threading.Lock()
+_counters: Dict[str, Number] = {}
+_gauges: Dict[str, Number] = {}
+
+
+def incr(name: str, amount: Number = 1) -> None:
+    """Increment a monotonically growing counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_gauge(name: str, value: Number) -> None:
+    """Record the current value of something that goes up and down."""
+    with _lock:
+        _gauges[name] = value
+
+
+def get(name: str, default: Number = 0) -> Number:
+    """Return a counter or gauge value."""
+    with _lock:
+        if name in _counters:
+            return _counters[name]
+        return _gauges.get(name, default)
+
+
+def ratio(numerator: str, denominator: str) -> float:
+    """Return counter ``numerator / denominator`` (0.0 when nothing was counted)."""
+    with _lock:
+        total = _counters.get(denominator, 0)
+        return _counters.get(numerator, 0) / total if total else 0.0
+
+
+def snapshot() -> Dict[str, Number]:
+    """Return a copy of every counter and gauge."""
+    with _lock:
+        data = dict(_counters)
+        data.update(_gauges)
+        return data
+
+
+def log_snapshot(prefix: str = "") -> None:
+    """Print all metrics, optionally only those starting with ``prefix``."""
+    for name, value in sorted(snapshot().items()):
+        if name.startswith(prefix):
+            print(f"METRIC {name} = {value}", flush=True)
+
+
+def reset() -> None:
+    """Clear all metrics."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
@@ -0,0 +1,17 @@
+"""Vault-level infrastructure shared by the daemons (index, scheduler, ...)."""
+
+from .index import VaultIndex, get_index
+from .journal import VaultJournal, get_journal
+from .lease import Lease, LeaseLost, LeaseManager
+from .pool import WorkerPool
+from .scheduler import Stage, VaultScheduler
+from .settle import SettleTracker
+from .verdicts import KnownVerdict, VerdictStore, get_verdict_store
+from .workqueue import Job, TopicConsumer, WorkQueue, get_work_queue
+
+__all__ = [
+    'VaultIndex', 'get_index', 'VaultJournal', 'get_journal', 'Lease', 'LeaseLost',
+    'LeaseManager', 'WorkerPool', 'Stage', 'VaultScheduler', 'SettleTracker', 'Job',
+    'TopicConsumer', 'WorkQueue', 'get_work_queue', 'KnownVerdict', 'VerdictStore',
+    'get_verdict_store'
+]
@@ -0,0 +1,371 @@
+"""SQLite index of the notes in the vault.
+
+One row per file: folder, name, note type and status, the frontmatter fields,
+size, mtime and a content hash. The daemons query it (``find``) instead of
+globbing and reading every note on each pass. The index is kept current by
+watchdog events (``watch``) and by ``reconcile``, which walks the vault with
+``os.scandir`` and only re-reads files whose size or mtime changed.
+
+The database runs in WAL mode, so the watcher, brain loop, vault worker and
+sender processes can all share one index file.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from agent_skills import metrics
+from agent_skills.file_skills.frontmatter import read_frontmatter
+from agent_skills.file_skills.vault_writer import is_temp_file
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+VAULT_INDEX_PATH = Path(os.environ.get(
+    "VAULT_INDEX_PATH", Path(__file__).resolve().parents[2] / "vault_index.sqlite3"
+))
+# With a live observer, a full reconcile only runs this often as a safety net
+VAULT_RECONCILE_INTERVAL = float(os.environ.get("VAULT_RECONCILE_INTERVAL", "300"))
+# Directories under the vault that are never indexed
+SKIP_DIRS = {".obsidian", ".trash", ".git", ".leases"}
+
+PathLike = Union[str, Path]
+
+
+def _check_watchdog():
+    """Check if watchdog library is available."""
+    if not WATCHDOG_AVAILABLE:
+        raise ImportError(
+            "The 'watchdog' library is required to keep the vault index live. "
+            "Install it with: pip install watchdog"
+        )
+
+
+def read_header(path: Path, stat: Optional[os.stat_result] = None) -> Dict[str, str]:
+    """Frontmatter fields of a note, from a bounded (and memoized) read of its header."""
+    try:
+        return read_frontmatter(path, stat).fields
+    except OSError:
+        return {}
+
+
+def content_hash(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def note_type(name: str, fields: Dict[str, str]) -> str:
+    """Type from the frontmatter, else from the file name prefix (PLAN_, DRAFT_EMAIL_...)."""
+    if fields.get("type"):
+        return fields["type"].lower()
+    if name.startswith("PLAN_"):
+        return "plan"
+    if name.startswith("DRAFT_EMAIL_"):
+        return "draft_email"
+    return "note"
+
+
+class VaultIndex:
+    """Incrementally maintained index of every file in the vault."""
+
+    def __init__(self, vault_path: PathLike, path: PathLike = VAULT_INDEX_PATH):
+        """Open (or create) the index for ``vault_path``.
+
+        Args:
+            vault_path: Root of the Obsidian vault
+            path: SQLite file holding the index
+        """
+        self.vault_path = Path(os.path.abspath(vault_path))
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS notes ("
+            " path TEXT PRIMARY KEY, folder TEXT NOT NULL, name TEXT NOT NULL,"
+            " type TEXT, status TEXT, fields TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime REAL NOT NULL, hash TEXT, indexed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS notes_folder_status ON notes(folder, status)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS notes_hash ON notes(hash)")
+        self._last_reconcile = 0.0
+        self.observer = None
+        self._listeners: List[Callable[[Path], None]] = []
+
+    def key(self, path: PathLike) -> Optional[str]:
+        """Vault-relative POSIX path of ``path``, or None if it lies outside the vault."""
+        try:
+            return Path(os.path.abspath(path)).relative_to(self.vault_path).as_posix()
+        except ValueError:
+            return None
+
+    def update(self, path: PathLike, stat: Optional[os.stat_result] = None) -> bool:
+        """Bring the row for ``path`` up to date; returns True if it changed."""
+        key = self.key(path)
+        if key is None or is_temp_file(key) or any(part in SKIP_DIRS for part in key.split("/")):
+            return False
+        path = self.vault_path / key
+        try:
+            stat = stat or path.stat()
+        except OSError:
+            return self.remove(path)
+        if not os.path.isfile(path):
+            return False
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime FROM notes WHERE path = ?", (key,)
+            ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return False
+        try:
+            fields = read_header(path, stat)
+            digest = content_hash(path)
+        except OSError:
+            return False  # vanished or locked mid-read; the next event fixes it
+        parts = key.split("/")
+        folder = parts[0] if len(parts) > 1 else ""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO notes"
+                " (path, folder, name, type, status, fields, size, mtime, hash, indexed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, folder, parts[-1], note_type(parts[-1], fields), fields.get("status"),
+                 json.dumps(fields), stat.st_size, stat.st_mtime, digest, time.time())
+            )
+        metrics.incr("vault.index.updates")
+        return True
+
+    def remove(self, path: PathLike) -> bool:
+        """Drop ``path`` (and anything below it) from the index."""
+        key = self.key(path)
+        if key is None:
+            return False
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM notes WHERE path = ? OR path LIKE ?", (key, key + "/%")
+            )
+        return cursor.rowcount > 0
+
+    def subscribe(self, listener: Callable[[Path], None]):
+        """Call ``listener(path)`` for every file event, after the row is updated.
+
+        Listeners fire even when the row was already current, since another
+        process sharing the index may have updated it first.
+        """
+        self._listeners.append(listener)
+
+    def notify(self, path: PathLike):
+        for listener in list(self._listeners):
+            try:
+                listener(Path(path))
+            except Exception as e:
+                print(f"ERROR: Vault index listener failed for {path}: {e}", flush=True)
+
+    def refresh(self, *paths: PathLike):
+        """Re-index ``paths`` right away, e.g. after this process moved or rewrote them."""
+        for path in paths:
+            self.update(path)
+
+    def reconcile(self, folders: Optional[Iterable[str]] = None) -> int:
+        """Sync the index with the disk using stat data only; returns rows changed.
+
+        Files whose size and mtime match the index are not opened.
+        """
+        started = time.monotonic()
+        folders = list(folders) if folders else None
+        roots = [self.vault_path / f for f in folders] if folders else [self.vault_path]
+        seen = set()
+        changed = 0
+        stack = [root for root in roots if root.is_dir()]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        stack.append(Path(entry.path))
+                elif entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # moved away since the directory was listed
+                    seen.add(self.key(entry.path))
+                    if self.update(entry.path, stat):
+                        changed += 1
+
+        with self._lock:
+            if folders:
+                marks = ",".join("?" for _ in folders)
+                rows = self._db.execute(
+                    f"SELECT path FROM notes WHERE folder IN ({marks})", tuple(folders)
+                ).fetchall()
+            else:
+                rows = self._db.execute("SELECT path FROM notes").fetchall()
+            stale = [(p,) for (p,) in rows if p not in seen]
+            self._db.executemany("DELETE FROM notes WHERE path = ?", stale)
+        changed += len(stale)
+        self._last_reconcile = time.monotonic()
+        metrics.incr("vault.index.reconciles")
+        metrics.set_gauge("vault.index.reconcile_seconds", round(time.monotonic() - started, 3))
+        return changed
+
+    def maybe_reconcile(self, interval: float, folders: Optional[Iterable[str]] = None) -> int:
+        """``reconcile`` if the last one is more than ``interval`` seconds old."""
+        if time.monotonic() - self._last_reconcile < interval:
+            return 0
+        return self.reconcile(folders)
+
+    def sync(self) -> int:
+        """Cheap call for the top of every loop pass.
+
+        Reconciles every time when no observer is running, otherwise only
+        every VAULT_RECONCILE_INTERVAL seconds to catch missed events.
+        """
+        return self.maybe_reconcile(VAULT_RECONCILE_INTERVAL if self.observer else 0)
+
+    def find(
+        self,
+        folder: Optional[str] = None,
+        status: Optional[str] = None,
+        prefix: Optional[str] = None,
+        type: Optional[str] = None,
+        suffix: Optional[str] = None,
+        exclude_prefix: Sequence[str] = (),
+        name: Optional[str] = None,
+        **fields: str
+    ) -> List[Path]:
+        """Paths of the notes matching every given criterion, oldest first.
+
+        Example: ``index.find(folder="Needs_Action", status="approved", prefix="PLAN_")``.
+        ``name`` restricts the query to one file name, which turns it into a
+        match test for a single note. Extra keyword arguments match
+        frontmatter fields exactly.
+        """
+        query = "SELECT path, fields FROM notes WHERE 1 = 1"
+        args: List[Any] = []
+        for column, value in (("folder", folder), ("status", status), ("type", type), ("name", name)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                args.append(value)
+        if prefix:
+            query += " AND substr(name, 1, ?) = ?"
+            args += [len(prefix), prefix]
+        if suffix:
+            query += " AND substr(name, -?) = ?"
+            args += [len(suffix), suffix]
+        for excluded in exclude_prefix:
+            query += " AND substr(name, 1, ?) != ?"
+            args += [len(excluded), excluded]
+        query += " ORDER BY mtime, path"
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+        results = []
+        for key, data in rows:
+            if fields:
+                values = json.loads(data)
+                if any(values.get(k) != v for k, v in fields.items()):
+                    continue
+            results.append(self.vault_path / key)
+        return results
+
+    def get(self, path: PathLike) -> Optional[Dict[str, Any]]:
+        """The indexed record for ``path``, or None if it is not indexed."""
+        key = self.key(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path, folder, name, type, status, fields, size, mtime, hash"
+                " FROM notes WHERE path = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        names = ("path", "folder", "name", "type", "status", "fields", "size", "mtime", "hash")
+        record = dict(zip(names, row))
+        record["fields"] = json.loads(record["fields"])
+        return record
+
+    def exists(self, path: PathLike) -> bool:
+        return self.get(path) is not None
+
+    def watch(self):
+        """Keep the index live from filesystem events; returns the started observer."""
+        _check_watchdog()
+        observer = Observer()
+        observer.schedule(IndexEventHandler(self), str(self.vault_path), recursive=True)
+        observer.daemon = True
+        observer.start()
+        self.observer = observer
+        return observer
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class IndexEventHandler(FileSystemEventHandler):
+    """Applies watchdog events to a VaultIndex."""
+
+    def __init__(self, index: VaultIndex):
+        self.index = index
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.index.update(event.src_path)
+            self.index.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.index.update(event.src_path)
+            self.index.notify(event.src_path)
+
+    def on_deleted(self, event):
+        self.index.remove(event.src_path)
+
+    def on_moved(self, event):
+        self.index.remove(event.src_path)
+        if event.is_directory:
+            self.index.reconcile()
+        else:
+            self.index.update(event.dest_path)
+            self.index.notify(event.dest_path)
+
+
+_indexes: Dict[Path, VaultIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(vault_path: PathLike, watch: bool = True) -> VaultIndex:
+    """Return the shared index for ``vault_path``, reconciled and (if possible) live.
+
+    The first call per process walks the vault once and, when watchdog is
+    installed and ``watch`` is set, starts an observer that keeps it current.
+    """
+    root = Path(os.path.abspath(vault_path))
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = VaultIndex(root)
+            changed = index.reconcile()
+            print(f"Vault index ready ({changed} change(s) since last run).", flush=True)
+            if watch and WATCHDOG_AVAILABLE:
+                index.watch()
+            _indexes[root] = index
+        return index
@@ -0,0 +1,204 @@
+"""Persistent pipeline journal for crash recovery.
+
+Like a git index, the journal remembers for every file a daemon has touched
+its size, mtime and content hash together with the last pipeline stage that
+completed for it (plus any data that stage produced, e.g. a triage verdict).
+Entries are grouped by ``scope`` (one per daemon or stage) so the processes
+can share a single file.
+
+On start-up a daemon diffs its folder against the journal with one
+``os.scandir`` pass (``diff``): files that are new or whose size/mtime (and
+then hash) changed are queued, unchanged files resume after their last
+completed stage, and entries for files that are gone are dropped. Nothing is
+re-read unless its stat data changed.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from agent_skills import metrics
+from .index import content_hash
+
+VAULT_JOURNAL_PATH = Path(os.environ.get(
+    "VAULT_JOURNAL_PATH", Path(__file__).resolve().parents[2] / "vault_journal.sqlite3"
+))
+
+PathLike = Union[str, Path]
+
+
+class JournalEntry(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+    hash: Optional[str]
+    stage: str
+    data: Any
+
+
+class JournalDiff(NamedTuple):
+    changed: List[Path]          # new, or content differs from the journal
+    unchanged: List[JournalEntry]  # same content; resume after ``entry.stage``
+
+
+def _entry(row) -> JournalEntry:
+    return JournalEntry(*row[:5], json.loads(row[5]) if row[5] is not None else None)
+
+
+class VaultJournal:
+    """Per-file record of the last completed pipeline stage."""
+
+    def __init__(self, path: PathLike = VAULT_JOURNAL_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            " scope TEXT NOT NULL, path TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime REAL NOT NULL, hash TEXT,"
+            " stage TEXT NOT NULL, data TEXT, updated REAL NOT NULL,"
+            " PRIMARY KEY (scope, path))"
+        )
+
+    @staticmethod
+    def key(path: PathLike) -> str:
+        return Path(os.path.abspath(path)).as_posix()
+
+    def record(
+        self,
+        scope: str,
+        path: PathLike,
+        stage: str,
+        data: Any = None,
+        digest: Optional[str] = None
+    ) -> Optional[JournalEntry]:
+        """Note that ``stage`` completed for ``path``; returns None if the file is gone."""
+        try:
+            stat = os.stat(path)
+            digest = digest or content_hash(Path(path))
+        except OSError:
+            return None
+        entry = JournalEntry(self.key(path), stat.st_size, stat.st_mtime, digest, stage, data)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO journal"
+                " (scope, path, size, mtime, hash, stage, data, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (scope, entry.path, entry.size, entry.mtime, entry.hash, stage,
+                 json.dumps(data) if data is not None else None, time.time())
+            )
+        metrics.incr(f"journal.{scope}.{stage}")
+        return entry
+
+    def forget(self, scope: str, path: PathLike):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM journal WHERE scope = ? AND path = ?", (scope, self.key(path))
+            )
+
+    def entries(self, scope: str) -> Dict[str, JournalEntry]:
+        """Every entry of ``scope``, keyed by absolute POSIX path."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, size, mtime, hash, stage, data FROM journal WHERE scope = ?", (scope,)
+            ).fetchall()
+        return {row[0]: _entry(row) for row in rows}
+
+    def get(self, scope: str, path: PathLike) -> Optional[JournalEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path, size, mtime, hash, stage, data FROM journal"
+                " WHERE scope = ? AND path = ?", (scope, self.key(path))
+            ).fetchone()
+        return _entry(row) if row is not None else None
+
+    def retain(self, scope: str, paths: Iterable[PathLike]) -> int:
+        """Drop every entry of ``scope`` except those for ``paths``; returns rows dropped."""
+        keep = {self.key(p) for p in paths}
+        stale = [(scope, key) for key in self.entries(scope) if key not in keep]
+        with self._lock:
+            self._db.executemany("DELETE FROM journal WHERE scope = ? AND path = ?", stale)
+        return len(stale)
+
+    def matches(self, entry: JournalEntry, path: PathLike, stat: os.stat_result) -> bool:
+        """True if ``path`` still has the content ``entry`` was recorded for.
+
+        Only files whose size or mtime moved are hashed; a file that was
+        merely touched keeps its entry (with the new mtime).
+        """
+        if stat.st_size != entry.size:
+            return False
+        if stat.st_mtime == entry.mtime:
+            return True
+        try:
+            same = content_hash(Path(path)) == entry.hash
+        except OSError:
+            return False
+        if same:
+            with self._lock:
+                self._db.execute(
+                    "UPDATE journal SET mtime = ? WHERE path = ? AND hash = ?",
+                    (stat.st_mtime, entry.path, entry.hash)
+                )
+        return same
+
+    def diff(self, scope: str, directory: PathLike, suffix: str = "") -> JournalDiff:
+        """Compare the files directly in ``directory`` with the journal, in one scandir pass.
+
+        Entries under ``directory`` whose file no longer exists are dropped.
+        """
+        started = time.monotonic()
+        known = self.entries(scope)
+        prefix = self.key(directory) + "/"
+        changed: List[Path] = []
+        unchanged: List[JournalEntry] = []
+        seen = set()
+        try:
+            scanned = list(os.scandir(directory))
+        except OSError:
+            scanned = []
+        for dir_entry in scanned:
+            if not dir_entry.is_file() or not dir_entry.name.endswith(suffix):
+                continue
+            key = self.key(dir_entry.path)
+            seen.add(key)
+            entry = known.get(key)
+            if entry is not None and self.matches(entry, dir_entry.path, dir_entry.stat()):
+                unchanged.append(entry)
+            else:
+                changed.append(Path(dir_entry.path))
+
+        gone = [(scope, key) for key in known
+                if key.startswith(prefix) and "/" not in key[len(prefix):] and key not in seen]
+        if gone:
+            with self._lock:
+                self._db.executemany("DELETE FROM journal WHERE scope = ? AND path = ?", gone)
+        metrics.set_gauge(f"journal.{scope}.diff_seconds", round(time.monotonic() - started, 3))
+        metrics.set_gauge(f"journal.{scope}.changed", len(changed))
+        metrics.set_gauge(f"journal.{scope}.unchanged", len(unchanged))
+        return JournalDiff(changed, unchanged)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_journals: Dict[Path, VaultJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(path: PathLike = VAULT_JOURNAL_PATH) -> VaultJournal:
+    """Return the per-process journal stored at ``path``."""
+    path = Path(os.path.abspath(path))
+    with _journals_lock:
+        if path not in _journals:
+            _journals[path] = VaultJournal(path)
+        return _journals[path]
@@ -0,0 +1,216 @@
+"""Lease-based claiming of vault notes across processes and hosts.
+
+Several VaultWorker / sender instances may run on different machines against
+one shared vault directory. Before a worker acts on a note it claims the note
+by atomically creating a lock file under ``<vault>/.leases`` (``O_CREAT |
+O_EXCL``, which is atomic on local disks, SMB and NFSv3+). The lock file holds
+the owner, an expiry time and a fencing token.
+
+- The lease expires after ``LEASE_TTL`` seconds unless a heartbeat thread
+  renews it every ``LEASE_TTL / 3``.
+- An expired lock is broken under a short-lived ``.break`` lock, so only one
+  contender takes it over.
+- Every acquisition increments a per-note fence counter (``.fence`` file,
+  only ever written by the lease holder). ``Lease.valid()`` is true only
+  while the counter still equals the token handed out, so a worker that
+  stalled past its lease (GC pause, suspended VM) finds out before it sends
+  anything and aborts instead of acting a second time.
+
+Handlers call ``assert_held()`` right before an irreversible side effect.
+Clocks of the hosts sharing a vault are assumed to agree within
+``LEASE_SKEW`` seconds.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from agent_skills import metrics
+from agent_skills.file_skills.vault_writer import atomic_write
+from .workqueue import default_owner
+
+LEASE_TTL = float(os.environ.get("LEASE_TTL", "60"))
+LEASE_SKEW = float(os.environ.get("LEASE_SKEW", "5"))
+LEASE_DIRNAME = ".leases"
+
+PathLike = Union[str, Path]
+
+_current = threading.local()
+
+
+class LeaseLost(RuntimeError):
+    """The lease expired or was taken over; the holder must not act any more."""
+
+
+def _read_json(path: Path) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.loads(f.read() or "null")
+    except (OSError, ValueError):
+        return None
+
+
+class Lease:
+    """A held claim on one note; use as a context manager or call ``release``."""
+
+    def __init__(self, resource: str, base: Path, owner: str, token: int, ttl: float):
+        self.resource = resource
+        self.lock_path = base.with_suffix(".lease")
+        self.fence_path = base.with_suffix(".fence")
+        self.owner = owner
+        self.token = token
+        self.ttl = ttl
+        self.expires = time.time() + ttl
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._beat, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _record(self) -> dict:
+        return {"resource": self.resource, "owner": self.owner, "token": self.token, "expires": self.expires}
+
+    def valid(self) -> bool:
+        """True while the lease is unexpired and no newer token was handed out."""
+        if self._stop.is_set() or time.time() >= self.expires:
+            return False
+        fence = _read_json(self.fence_path)
+        return isinstance(fence, dict) and fence.get("token") == self.token
+
+    def renew(self) -> bool:
+        """Push the expiry out by ``ttl``; False (and the lease is dead) if it was lost."""
+        record = _read_json(self.lock_path)
+        if not self.valid() or not record or record.get("owner") != self.owner or record.get("token") != self.token:
+            self._stop.set()
+            metrics.incr("vault.lease.lost")
+            return False
+        self.expires = time.time() + self.ttl
+        atomic_write(self.lock_path, json.dumps(self._record()), durability="none")
+        metrics.incr("vault.lease.renewals")
+        return True
+
+    def _beat(self):
+        while not self._stop.wait(self.ttl / 3):
+            if not self.renew():
+                print(f"WARNING: Lost lease on {self.resource}", flush=True)
+                return
+
+    def release(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        record = _read_json(self.lock_path)
+        if record and record.get("owner") == self.owner and record.get("token") == self.token:
+            try:
+                os.unlink(self.lock_path)
+            except OSError:
+                pass
+        metrics.incr("vault.lease.released")
+
+    def __enter__(self) -> "Lease":
+        _current.lease = self
+        return self
+
+    def __exit__(self, *exc):
+        _current.lease = None
+        self.release()
+
+
+class LeaseManager:
+    """Hands out leases on the notes of one (possibly shared) vault."""
+
+    def __init__(self, vault_path: PathLike, ttl: float = LEASE_TTL):
+        self.vault_path = Path(os.path.abspath(vault_path))
+        self.directory = self.vault_path / LEASE_DIRNAME
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def _base(self, resource: str) -> Path:
+        return self.directory / hashlib.blake2b(resource.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _create(self, path: Path, record: dict) -> bool:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(json.dumps(record))
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def _break_expired(self, lock_path: Path) -> bool:
+        """Remove ``lock_path`` if its lease expired; True if it is gone now."""
+        record = _read_json(lock_path)
+        if record is not None:
+            expires = record.get("expires", 0)
+        else:
+            # Unreadable or still being written: judge by its age instead
+            try:
+                expires = lock_path.stat().st_mtime + self.ttl
+            except FileNotFoundError:
+                return True
+        if expires + LEASE_SKEW > time.time():
+            return False
+        breaker = lock_path.with_suffix(".break")
+        try:
+            # A breaker left behind by a crashed contender expires too
+            if time.time() - breaker.stat().st_mtime > self.ttl:
+                os.unlink(breaker)
+        except OSError:
+            pass
+        if not self._create(breaker, {"owner": default_owner()}):
+            return False
+        try:
+            # Re-check under the breaker: the lock may have been replaced meanwhile
+            if _read_json(lock_path) == record:
+                try:
+                    os.unlink(lock_path)
+                except FileNotFoundError:
+                    pass
+                metrics.incr("vault.lease.broken")
+                return True
+            return False
+        finally:
+            os.unlink(breaker)
+
+    def acquire(self, resource: PathLike, owner: Optional[str] = None) -> Optional[Lease]:
+        """Claim ``resource`` (normally a note path); None if someone else holds it."""
+        resource = Path(os.path.abspath(resource))
+        # Hosts may mount the vault at different paths, so leases are vault-relative
+        try:
+            resource = resource.relative_to(self.vault_path).as_posix()
+        except ValueError:
+            resource = resource.as_posix()
+        owner = owner or default_owner()
+        base = self._base(resource)
+        lock_path = base.with_suffix(".lease")
+        placeholder = {"resource": resource, "owner": owner, "token": None, "expires": time.time() + self.ttl}
+        if not self._create(lock_path, placeholder):
+            if not self._break_expired(lock_path) or not self._create(lock_path, placeholder):
+                metrics.incr("vault.lease.contended")
+                return None
+
+        # Only the lock holder writes the fence counter, so tokens only grow
+        fence = _read_json(base.with_suffix(".fence")) or {}
+        token = int(fence.get("token") or 0) + 1
+        atomic_write(base.with_suffix(".fence"), json.dumps({"resource": resource, "token": token}), durability="fsync")
+        lease = Lease(resource, base, owner, token, self.ttl)
+        atomic_write(lock_path, json.dumps(lease._record()), durability="fsync")
+        metrics.incr("vault.lease.acquired")
+        return lease
+
+
+def current() -> Optional[Lease]:
+    """The lease the current thread is working under, if any."""
+    return getattr(_current, "lease", None)
+
+
+def assert_held():
+    """Raise LeaseLost if the current thread's lease is no longer valid (no-op without one)."""
+    lease = current()
+    if lease is not None and not lease.valid():
+        metrics.incr("vault.lease.fenced")
+        raise LeaseLost(f"Lease on {lease.resource} (token {lease.token}) is no longer held")
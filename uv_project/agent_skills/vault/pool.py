@@ -0,0 +1,91 @@
+"""Worker pool for processing vault files.
+
+File-system events are cheap to receive but expensive to handle (a triage is
+an LLM round trip), so the observer thread only publishes paths to the work
+queue and a ``WorkerPool`` of threads drains one of its topics (through a
+``workqueue.TopicConsumer``). Throughput scales with the number of workers
+instead of being pinned to one LLM call at a time.
+
+The number of busy workers and handled items are published as
+``queue.<name>.*`` metrics. Queue depth (``workqueue.<topic>.ready`` /
+``leased`` / ``dead``), publish-to-claim wait (``last_wait_seconds``,
+``wait_seconds`` over ``first_claims``) and retries are published by the
+work queue on every publish and claim.
+"""
+
+import threading
+import time
+from typing import Any, Callable, List
+
+from agent_skills import metrics
+
+
+class WorkerPool:
+    """Threads that drain a queue in batches of up to ``batch_size`` items.
+
+    ``queue`` needs a ``name`` and ``get(timeout)`` / ``get_nowait()`` methods
+    returning None when nothing is ready.
+
+    A worker that finds a single item waits up to ``batch_window`` seconds for
+    more, so a burst of files can still be handled in one batch.
+    """
+
+    def __init__(
+        self,
+        queue,
+        handler: Callable[[List[Any]], None],
+        workers: int = 4,
+        batch_size: int = 1,
+        batch_window: float = 0.0
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        for i in range(self.workers):
+            threading.Thread(
+                target=self._work, name=f"{self.queue.name}-worker-{i}", daemon=True
+            ).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _next_batch(self) -> List[Any]:
+        first = self.queue.get(timeout=1)
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            path = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            if path is None:
+                break
+            batch.append(path)
+        return batch
+
+    def _work(self):
+        name = self.queue.name
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            with self._busy_lock:
+                self._busy += 1
+                metrics.set_gauge(f"queue.{name}.busy_workers", self._busy)
+            try:
+                self.handler(batch)
+            except Exception as e:
+                metrics.incr(f"queue.{name}.errors")
+                print(f"ERROR: {name} worker failed for {len(batch)} file(s): {e}", flush=True)
+            finally:
+                with self._busy_lock:
+                    self._busy -= 1
+                    metrics.set_gauge(f"queue.{name}.busy_workers", self._busy)
+                metrics.incr(f"queue.{name}.handled", len(batch))
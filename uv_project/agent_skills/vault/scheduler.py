@@ -0,0 +1,204 @@
+"""Event-driven dispatcher for the vault pipeline stages.
+
+Each stage (planning, execution, sending) is a query over the vault index
+plus a handler for one note. File events from the index's watchdog observer
+are matched against every stage's query and matching notes are queued for
+that stage right away, instead of each daemon sleeping and rescanning. A
+low-frequency rescan (``SCHEDULER_RESCAN_INTERVAL``) re-runs every query as
+a safety net for missed events and for work that failed earlier. Without
+watchdog the rescan becomes the only trigger and runs every
+``SCHEDULER_POLL_INTERVAL`` seconds.
+
+Matching notes are published to the stage's topic of the durable work queue
+(keyed by path and content hash, so a note is queued once per version) and
+every stage has its own worker thread consuming that topic, so a slow plan
+never delays a send. A handler that raises or returns False fails the job,
+which is retried with backoff and dead-lettered after too many attempts.
+
+Stages added with ``exclusive=True`` (execution and sending) take a lease on
+the note before running its handler, so several instances on different hosts
+can share one vault without acting on the same note twice. A note leased
+elsewhere is deferred and looked at again after ``LEASE_TTL`` seconds.
+
+Completed work is also recorded in the vault journal (one scope per stage)
+against the note's content hash. A note the stage already handled is skipped
+until its content changes, so a restart only re-runs notes that were new,
+edited or in flight when the process stopped. Once a note leaves a stage
+(e.g. a draft goes from approved to failed) its journal entry and queue
+completion marker are cleared, so returning to the stage with the same
+content queues it again.
+"""
+
+import os
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from agent_skills import metrics
+from .index import VaultIndex, WATCHDOG_AVAILABLE, get_index
+from .journal import VaultJournal, get_journal
+from .lease import LEASE_TTL, LeaseManager
+from .workqueue import WorkQueue, get_work_queue
+
+SCHEDULER_RESCAN_INTERVAL = float(os.environ.get("SCHEDULER_RESCAN_INTERVAL", "300"))
+SCHEDULER_POLL_INTERVAL = float(os.environ.get("SCHEDULER_POLL_INTERVAL", "5"))
+
+
+@dataclass
+class Stage:
+    """A pipeline stage: which notes it wants and what to do with one."""
+    name: str
+    query: Dict[str, Any]
+    handler: Callable[[Path], Any]
+    exclusive: bool = False
+
+
+class VaultScheduler:
+    """Dispatches vault notes to stage handlers as soon as they change."""
+
+    def __init__(
+        self,
+        vault_path,
+        index: Optional[VaultIndex] = None,
+        journal: Optional[VaultJournal] = None,
+        work: Optional[WorkQueue] = None
+    ):
+        self.index = index or get_index(vault_path)
+        self.journal = journal or get_journal()
+        self.work = work or get_work_queue()
+        self.leases = LeaseManager(self.index.vault_path)
+        self.stages: List[Stage] = []
+        self._stop = threading.Event()
+        self.index.subscribe(self.on_change)
+
+    def add_stage(self, name: str, handler: Callable[[Path], Any], exclusive: bool = False, **query) -> Stage:
+        """Register a stage; ``query`` takes the keyword arguments of ``VaultIndex.find``.
+
+        With ``exclusive`` the handler runs under a lease on the note.
+        """
+        stage = Stage(name, query, handler, exclusive)
+        self.stages.append(stage)
+        return stage
+
+    def matches(self, stage: Stage, path: Path) -> bool:
+        """True if the indexed note at ``path`` satisfies the stage's query."""
+        return path in self.index.find(name=path.name, **stage.query)
+
+    def completed(self, stage: Stage, path: Path) -> bool:
+        """True if the journal shows ``stage`` already handled this content of ``path``."""
+        entry = self.journal.get(stage.name, path)
+        if entry is None or entry.stage != "done":
+            return False
+        record = self.index.get(path)
+        return record is not None and record["hash"] == entry.hash
+
+    def on_change(self, path: Path):
+        """Index listener: queue ``path`` for every stage whose query it matches."""
+        key = self.index.key(path)
+        if key is None:
+            return
+        path = self.index.vault_path / key
+        for stage in self.stages:
+            if self.matches(stage, path):
+                self.enqueue(stage, path)
+            else:
+                self.left(stage, path)
+
+    def left(self, stage: Stage, path: Path):
+        """``path`` no longer matches ``stage``; forget that the stage handled it."""
+        self.journal.forget(stage.name, path)
+        self.work.reopen(stage.name, path)
+
+    def enqueue(self, stage: Stage, path: Path):
+        """Publish the current version of ``path`` to the stage's topic."""
+        record = self.index.get(path)
+        self.work.publish(stage.name, path, (record or {}).get("hash") or "")
+
+    def rescan(self):
+        """Reconcile the index and queue everything every stage matches."""
+        self.index.reconcile()
+        for stage in self.stages:
+            paths = self.index.find(**stage.query)
+            # Notes that no longer match have moved on; their entries are obsolete
+            self.journal.retain(stage.name, paths)
+            self.work.retain(stage.name, paths)
+            skipped = 0
+            for path in paths:
+                if self.completed(stage, path):
+                    skipped += 1
+                else:
+                    self.enqueue(stage, path)
+            metrics.set_gauge(f"scheduler.{stage.name}.skipped_done", skipped)
+            self.work.depth(stage.name)
+        self.work.prune()
+        metrics.incr("scheduler.rescans")
+
+    def _work(self, stage: Stage):
+        while not self._stop.is_set():
+            job = self.work.wait_claim(stage.name, timeout=1)
+            if job is None:
+                continue
+            path = job.path
+            # Jobs may come from other processes, before our index saw the file
+            self.index.refresh(path)
+            # The note may have moved on since it was queued
+            if not self.matches(stage, path):
+                self.work.complete(job, remember=False)
+                continue
+            if self.completed(stage, path):
+                self.work.complete(job)
+                continue
+            lease = None
+            if stage.exclusive:
+                lease = self.leases.acquire(path)
+                if lease is None:
+                    self.work.defer(job, LEASE_TTL)
+                    continue
+                # Another host may have finished the note just before we got the lease
+                self.index.refresh(path)
+                if not self.matches(stage, path):
+                    lease.release()
+                    self.work.complete(job, remember=False)
+                    continue
+            started = time.monotonic()
+            try:
+                with lease or nullcontext(), self.work.keepalive([job]):
+                    done = stage.handler(path) is not False
+                error = "handler reported failure"
+            except Exception as e:
+                done, error = False, str(e)
+                metrics.incr(f"scheduler.{stage.name}.errors")
+                print(f"ERROR: {stage.name} stage failed for {path.name}: {e}", flush=True)
+            if done:
+                self.journal.record(stage.name, path, "done")
+                self.work.complete(job)
+            else:
+                self.work.fail(job, error)
+            metrics.incr(f"scheduler.{stage.name}.handled")
+            metrics.incr(f"scheduler.{stage.name}.seconds", time.monotonic() - started)
+
+    def start(self):
+        """Start one worker thread per stage and queue what is already waiting."""
+        for stage in self.stages:
+            threading.Thread(
+                target=self._work, args=(stage,), name=f"stage-{stage.name}", daemon=True
+            ).start()
+        self.rescan()
+
+    def run_forever(self):
+        """``start`` and then rescan periodically until interrupted."""
+        self.start()
+        interval = SCHEDULER_RESCAN_INTERVAL if self.index.observer else SCHEDULER_POLL_INTERVAL
+        if not WATCHDOG_AVAILABLE:
+            print("watchdog is not installed; falling back to polling the vault.", flush=True)
+        try:
+            while not self._stop.wait(interval):
+                self.rescan()
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
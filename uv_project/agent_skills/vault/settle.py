@@ -0,0 +1,124 @@
+"""Write-settle detection for files arriving in a watched folder.
+
+A file-system event only says that *something* happened to a path; the
+writer may still be busy. ``SettleTracker`` coalesces every create, modify
+and move event per path and hands a path on only once it has settled: its
+size and mtime stayed the same for ``SETTLE_QUIET_PERIOD`` seconds, or the
+writer closed it (the close-write event inotify provides on Linux). Readers
+downstream therefore never have to sleep and retry. ``emit`` always runs on
+the tracker's own thread, never on the caller's (e.g. the watchdog observer).
+
+An editor's save-via-rename shows up as a move onto the path and is tracked
+like any other write; a path that is deleted or moved away is dropped.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from agent_skills import metrics
+
+SETTLE_QUIET_PERIOD = float(os.environ.get("SETTLE_QUIET_PERIOD", "0.5"))
+SETTLE_POLL_INTERVAL = float(os.environ.get("SETTLE_POLL_INTERVAL", "0.1"))
+
+PathLike = Union[str, Path]
+
+
+class SettleTracker:
+    """Calls ``emit(path)`` once per burst of writes, after the file settles."""
+
+    def __init__(
+        self,
+        emit: Callable[[str], None],
+        quiet: float = SETTLE_QUIET_PERIOD,
+        poll: float = SETTLE_POLL_INTERVAL,
+        name: str = "settle"
+    ):
+        self.emit = emit
+        self.quiet = quiet
+        self.poll = poll
+        self.name = name
+        # path -> ((size, mtime_ns) last seen, when it was first seen that way, first event)
+        self._pending: Dict[str, Tuple[Optional[tuple], float, float]] = {}
+        # path -> first event, for paths the writer closed; emitted on the next wake-up
+        self._closed: Dict[str, float] = {}
+        self._lock = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def touch(self, path: PathLike):
+        """Note a create/modify event; the quiet period restarts."""
+        path = str(path)
+        now = time.monotonic()
+        with self._lock:
+            first = self._pending[path][2] if path in self._pending else now
+            if path in self._pending:
+                metrics.incr(f"{self.name}.coalesced")
+            self._pending[path] = (None, now, first)
+            self._publish()
+            self._start()
+
+    def _start(self):
+        # Caller holds self._lock
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-tracker", daemon=True)
+            self._thread.start()
+
+    def moved(self, src: PathLike, dest: Optional[PathLike]):
+        """Note a move: ``src`` is gone, ``dest`` (if tracked by the caller) was written."""
+        self.discard(src)
+        if dest is not None:
+            self.touch(dest)
+
+    def discard(self, path: PathLike):
+        with self._lock:
+            self._pending.pop(str(path), None)
+            self._closed.pop(str(path), None)
+            self._publish()
+
+    def closed(self, path: PathLike):
+        """Close-write: the writer is done, so the tracker emits without waiting."""
+        path = str(path)
+        with self._lock:
+            entry = self._pending.pop(path, None)
+            if entry is not None:
+                self._closed[path] = entry[2]
+                self._start()
+                self._lock.notify()
+            self._publish()
+
+    def _emit(self, path: str, first: float):
+        metrics.incr(f"{self.name}.emitted")
+        metrics.set_gauge(f"{self.name}.last_settle_seconds", round(time.monotonic() - first, 3))
+        try:
+            self.emit(path)
+        except Exception as e:
+            print(f"ERROR: Could not hand on settled file {path}: {e}", flush=True)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._closed:
+                    self._lock.wait(self.poll)
+                settled = list(self._closed.items())
+                self._closed.clear()
+                now = time.monotonic()
+                for path, (last, since, first) in list(self._pending.items()):
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        del self._pending[path]  # gone before it settled
+                        continue
+                    signature = (stat.st_size, stat.st_mtime_ns)
+                    if signature != last:
+                        self._pending[path] = (signature, now, first)
+                    elif now - since >= self.quiet:
+                        del self._pending[path]
+                        settled.append((path, first))
+                self._publish()
+            for path, first in settled:
+                self._emit(path, first)
+
+    def _publish(self):
+        metrics.set_gauge(f"{self.name}.pending", len(self._pending) + len(self._closed))
@@ -0,0 +1,107 @@
+"""Persistent content-hash -> triage verdict store.
+
+The same email can reach the Inbox twice (Gmail watcher and a manual drop),
+and test notes are often copied verbatim. The watcher already hashes every
+settled file with BLAKE2b (``content_hash``, on the settle thread rather than
+the observer thread); before triage it looks the hash up here and, on a hit,
+routes the file with the verdict the first copy got instead of paying for
+another LLM call. Entries survive restarts.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Union
+
+from agent_skills import metrics
+
+VAULT_VERDICTS_PATH = Path(os.environ.get(
+    "VAULT_VERDICTS_PATH", Path(__file__).resolve().parents[2] / "vault_verdicts.sqlite3"
+))
+
+PathLike = Union[str, Path]
+
+
+class KnownVerdict(NamedTuple):
+    verdict: dict
+    first_path: str  # the file the verdict was produced for
+    seen: int        # how many copies have been routed with it, the first included
+
+
+class VerdictStore:
+    """Triage verdicts keyed by the content hash of the file they were made for."""
+
+    def __init__(self, path: PathLike = VAULT_VERDICTS_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " hash TEXT PRIMARY KEY, verdict TEXT NOT NULL, first_path TEXT NOT NULL,"
+            " seen INTEGER NOT NULL DEFAULT 1, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def get(self, digest: Optional[str]) -> Optional[KnownVerdict]:
+        if not digest:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT verdict, first_path, seen FROM verdicts WHERE hash = ?", (digest,)
+            ).fetchone()
+        if row is None:
+            metrics.incr("verdicts.misses")
+            return None
+        metrics.incr("verdicts.hits")
+        return KnownVerdict(json.loads(row[0]), row[1], row[2])
+
+    def put(self, digest: Optional[str], verdict: dict, path: PathLike):
+        """Remember ``verdict`` for ``digest``; the first file with that content is kept."""
+        if not digest:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO verdicts (hash, verdict, first_path, created, updated)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(hash) DO UPDATE SET verdict = excluded.verdict, updated = excluded.updated",
+                (digest, json.dumps(verdict), Path(path).name, now, now)
+            )
+
+    def seen(self, digest: str):
+        """Count one more copy routed with the stored verdict."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE verdicts SET seen = seen + 1, updated = ? WHERE hash = ?", (time.time(), digest)
+            )
+
+    def forget(self, digest: str):
+        with self._lock:
+            self._db.execute("DELETE FROM verdicts WHERE hash = ?", (digest,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_stores: Dict[Path, VerdictStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_verdict_store(path: PathLike = VAULT_VERDICTS_PATH) -> VerdictStore:
+    """Return the per-process verdict store kept at ``path``."""
+    path = Path(os.path.abspath(path))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = VerdictStore(path)
+        return _stores[path]
@@ -0,0 +1,420 @@
+"""Durable multi-stage work queue (SQLite, WAL mode).
+
+Every pipeline stage is a topic: ``triage`` (Inbox), ``planning``,
+``execution`` and ``sending``. A job names one vault file (``key``, its
+absolute path) plus a ``dedupe`` token, normally the file's content hash.
+The markdown files stay the human-facing view; the queue is how the daemons
+hand work to each other and survive restarts.
+
+- ``publish`` adds a job unless the same (topic, key, dedupe) is already
+  waiting, running, dead-lettered or completed. A completion marker only
+  stands while the note is still in the stage: ``reopen`` / ``retain`` clear
+  it once the note moves on, so a later arrival with the same content is new
+  work, and ``prune`` drops markers older than ``WORK_COMPLETION_RETENTION``.
+- ``claim`` leases the next ready job for ``WORK_VISIBILITY_TIMEOUT``
+  seconds and records how long a new job waited to be claimed. Handlers run
+  under ``keepalive``, which extends the lease while they work. A worker
+  that dies without finishing lets the lease expire and the job is
+  delivered again, unless it already used up its attempts: a job that keeps
+  killing its worker is dead-lettered instead of looping forever.
+- ``complete`` records a completion marker and removes the job. The marker is
+  written only by the lease holder, so a job is completed exactly once even if
+  a slow worker and its replacement both finish it.
+- ``fail`` schedules a retry with exponential backoff; after
+  ``WORK_MAX_ATTEMPTS`` attempts the job is dead-lettered.
+
+Every publish and claim refreshes the ``workqueue.<topic>.<state>`` depth
+gauges. The database is shared by every daemon process, like the vault index.
+"""
+
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from agent_skills import metrics
+
+VAULT_QUEUE_PATH = Path(os.environ.get(
+    "VAULT_QUEUE_PATH", Path(__file__).resolve().parents[2] / "vault_queue.sqlite3"
+))
+WORK_VISIBILITY_TIMEOUT = float(os.environ.get("WORK_VISIBILITY_TIMEOUT", "900"))
+WORK_MAX_ATTEMPTS = int(os.environ.get("WORK_MAX_ATTEMPTS", "5"))
+WORK_BACKOFF_BASE = float(os.environ.get("WORK_BACKOFF_BASE", "5"))
+WORK_BACKOFF_MAX = float(os.environ.get("WORK_BACKOFF_MAX", "900"))
+# Seconds a completion marker is kept at most (default one week)
+WORK_COMPLETION_RETENTION = float(os.environ.get("WORK_COMPLETION_RETENTION", str(7 * 86400)))
+# How often a waiting consumer looks for jobs published by other processes
+WORK_POLL_INTERVAL = float(os.environ.get("WORK_POLL_INTERVAL", "1"))
+
+READY, LEASED, DEAD = "ready", "leased", "dead"
+
+PathLike = Union[str, Path]
+
+
+@dataclass
+class Job:
+    id: int
+    topic: str
+    key: str
+    dedupe: str
+    payload: Any
+    attempts: int
+    owner: str
+
+    @property
+    def path(self) -> Path:
+        return Path(self.key)
+
+
+def default_owner() -> str:
+    """Identifies this worker thread in leases (host, process and thread)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def backoff(attempts: int) -> float:
+    """Delay before retry number ``attempts``: exponential, capped, with jitter."""
+    delay = min(WORK_BACKOFF_MAX, WORK_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class WorkQueue:
+    """Durable queue of vault files, one topic per pipeline stage."""
+
+    def __init__(self, path: PathLike = VAULT_QUEUE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._published = threading.Condition()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " topic TEXT NOT NULL, key TEXT NOT NULL, dedupe TEXT NOT NULL, payload TEXT,"
+            " priority INTEGER NOT NULL DEFAULT 0, state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL,"
+            " lease_owner TEXT, lease_until REAL, last_error TEXT,"
+            " created REAL NOT NULL, UNIQUE (topic, key, dedupe))"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(topic, state, priority, available_at)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " topic TEXT NOT NULL, key TEXT NOT NULL, dedupe TEXT NOT NULL,"
+            " completed REAL NOT NULL, owner TEXT, PRIMARY KEY (topic, key, dedupe))"
+        )
+
+    def _transaction(self):
+        self._db.execute("BEGIN IMMEDIATE")
+
+    def publish(
+        self,
+        topic: str,
+        key: PathLike,
+        dedupe: str = "",
+        payload: Any = None,
+        priority: int = 0,
+        delay: float = 0.0
+    ) -> bool:
+        """Add a job; returns False if this (topic, key, dedupe) is already known."""
+        key = os.path.abspath(key)
+        with self._lock:
+            self._transaction()
+            try:
+                done = self._db.execute(
+                    "SELECT 1 FROM completions WHERE topic = ? AND key = ? AND dedupe = ?",
+                    (topic, key, dedupe)
+                ).fetchone()
+                cursor = None
+                if done is None:
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO jobs"
+                        " (topic, key, dedupe, payload, priority, state, available_at, created)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (topic, key, dedupe, json.dumps(payload), priority, READY,
+                         time.time() + delay, time.time())
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        added = cursor is not None and cursor.rowcount > 0
+        if added:
+            metrics.incr(f"workqueue.{topic}.published")
+            with self._published:
+                self._published.notify_all()
+            self.depth(topic)
+        else:
+            metrics.incr(f"workqueue.{topic}.{'refused_completed' if done else 'refused_pending'}")
+        return added
+
+    def claim(
+        self,
+        topic: str,
+        owner: Optional[str] = None,
+        visibility: float = WORK_VISIBILITY_TIMEOUT,
+        max_attempts: int = WORK_MAX_ATTEMPTS
+    ) -> Optional[Job]:
+        """Lease the next ready job of ``topic`` (or one whose lease expired).
+
+        A job whose lease expired after its last allowed attempt is
+        dead-lettered rather than delivered again.
+        """
+        owner = owner or default_owner()
+        now = time.time()
+        dead = []
+        with self._lock:
+            self._transaction()
+            try:
+                while True:
+                    row = self._db.execute(
+                        "SELECT id, key, dedupe, payload, attempts, state, created FROM jobs"
+                        " WHERE topic = ? AND ((state = ? AND available_at <= ?)"
+                        "  OR (state = ? AND lease_until <= ?))"
+                        " ORDER BY priority, available_at, id LIMIT 1",
+                        (topic, READY, now, LEASED, now)
+                    ).fetchone()
+                    if row is None or row[5] != LEASED or row[4] < max_attempts:
+                        break
+                    self._db.execute(
+                        "UPDATE jobs SET state = ?, lease_owner = NULL, lease_until = NULL,"
+                        " last_error = ? WHERE id = ?",
+                        (DEAD, f"lease expired on attempt {row[4]}; the worker died or hung", row[0])
+                    )
+                    dead.append(row[1])
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET state = ?, lease_owner = ?, lease_until = ?,"
+                        " attempts = attempts + 1 WHERE id = ?",
+                        (LEASED, owner, now + visibility, row[0])
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        for key in dead:
+            metrics.incr(f"workqueue.{topic}.dead_lettered")
+            print(f"ERROR: {topic} job for {Path(key).name} dead-lettered: its lease expired "
+                  f"after {max_attempts} attempts", flush=True)
+        if row is None:
+            return None
+        if row[5] == LEASED:
+            metrics.incr(f"workqueue.{topic}.redelivered")
+        elif row[4] == 0:
+            # Publish -> first claim latency; the average is wait_seconds / first_claims
+            wait = max(0.0, now - row[6])
+            metrics.set_gauge(f"workqueue.{topic}.last_wait_seconds", round(wait, 3))
+            metrics.incr(f"workqueue.{topic}.wait_seconds", wait)
+            metrics.incr(f"workqueue.{topic}.first_claims")
+        metrics.incr(f"workqueue.{topic}.claimed")
+        self.depth(topic)
+        return Job(row[0], topic, row[1], row[2], json.loads(row[3]), row[4] + 1, owner)
+
+    def wait_claim(
+        self,
+        topic: str,
+        timeout: float,
+        owner: Optional[str] = None,
+        visibility: float = WORK_VISIBILITY_TIMEOUT
+    ) -> Optional[Job]:
+        """``claim``, waiting up to ``timeout`` seconds for a job to become ready."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.claim(topic, owner, visibility)
+            remaining = deadline - time.monotonic()
+            if job is not None or remaining <= 0:
+                return job
+            with self._published:
+                self._published.wait(min(remaining, WORK_POLL_INTERVAL))
+
+    def extend(self, job: Job, visibility: float = WORK_VISIBILITY_TIMEOUT) -> bool:
+        """Heartbeat: push the lease out; False if ``job`` is no longer ours."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND state = ? AND lease_owner = ?",
+                (time.time() + visibility, job.id, LEASED, job.owner)
+            )
+        return cursor.rowcount > 0
+
+    @contextmanager
+    def keepalive(self, jobs: Iterable[Job], visibility: float = WORK_VISIBILITY_TIMEOUT) -> Iterator[None]:
+        """Extend the leases of ``jobs`` every ``visibility / 3`` seconds while the block runs."""
+        jobs = list(jobs)
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(visibility / 3):
+                for job in jobs:
+                    if self.extend(job, visibility):
+                        metrics.incr(f"workqueue.{job.topic}.extended")
+
+        thread = threading.Thread(target=beat, name="workqueue-keepalive", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, job: Job, remember: bool = True) -> bool:
+        """Mark ``job`` done exactly once; False if its lease was lost to another worker.
+
+        With ``remember=False`` no completion marker is left, e.g. for a job
+        dropped because its note had already left the stage.
+        """
+        with self._lock:
+            self._transaction()
+            try:
+                cursor = self._db.execute(
+                    "DELETE FROM jobs WHERE id = ? AND state = ? AND lease_owner = ? AND attempts = ?",
+                    (job.id, LEASED, job.owner, job.attempts)
+                )
+                owned = cursor.rowcount > 0
+                if owned and remember:
+                    self._db.execute(
+                        "INSERT OR IGNORE INTO completions (topic, key, dedupe, completed, owner)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (job.topic, job.key, job.dedupe, time.time(), job.owner)
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        metrics.incr(f"workqueue.{job.topic}.{'completed' if owned else 'lost_leases'}")
+        return owned
+
+    def fail(self, job: Job, error: str = "", max_attempts: int = WORK_MAX_ATTEMPTS) -> str:
+        """Retry ``job`` after a backoff, or dead-letter it; returns its new state."""
+        dead = job.attempts >= max_attempts
+        state = DEAD if dead else READY
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, available_at = ?, lease_owner = NULL,"
+                " lease_until = NULL, last_error = ?"
+                " WHERE id = ? AND state = ? AND lease_owner = ? AND attempts = ?",
+                (state, time.time() + (0 if dead else backoff(job.attempts)), error[:2000],
+                 job.id, LEASED, job.owner, job.attempts)
+            )
+        if dead:
+            metrics.incr(f"workqueue.{job.topic}.dead_lettered")
+            print(f"ERROR: {job.topic} job for {job.path.name} dead-lettered after "
+                  f"{job.attempts} attempts: {error}", flush=True)
+        else:
+            metrics.incr(f"workqueue.{job.topic}.retried")
+        return state
+
+    def defer(self, job: Job, delay: float) -> bool:
+        """Hand ``job`` back without counting the attempt, e.g. when its note is busy elsewhere."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = ?, available_at = ?, attempts = attempts - 1,"
+                " lease_owner = NULL, lease_until = NULL"
+                " WHERE id = ? AND state = ? AND lease_owner = ? AND attempts = ?",
+                (READY, time.time() + delay, job.id, LEASED, job.owner, job.attempts)
+            )
+        metrics.incr(f"workqueue.{job.topic}.deferred")
+        return cursor.rowcount > 0
+
+    def reopen(self, topic: str, key: PathLike) -> int:
+        """Clear the completion markers of ``key``: it left the stage, so its next arrival is new work."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM completions WHERE topic = ? AND key = ?", (topic, os.path.abspath(key))
+            )
+        return cursor.rowcount
+
+    def retain(self, topic: str, keys: Iterable[PathLike]) -> int:
+        """Clear the completion markers of ``topic`` except those for ``keys``; returns rows dropped."""
+        keep = {os.path.abspath(key) for key in keys}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT key FROM completions WHERE topic = ?", (topic,)
+            ).fetchall()
+            stale = [(topic, row[0]) for row in rows if row[0] not in keep]
+            self._db.executemany("DELETE FROM completions WHERE topic = ? AND key = ?", stale)
+        return len(stale)
+
+    def prune(self, max_age: float = WORK_COMPLETION_RETENTION) -> int:
+        """Drop completion markers older than ``max_age`` seconds; returns rows dropped."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM completions WHERE completed < ?", (time.time() - max_age,)
+            )
+        if cursor.rowcount:
+            metrics.incr("workqueue.completions_pruned", cursor.rowcount)
+        return cursor.rowcount
+
+    def dead_letters(self, topic: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Jobs that ran out of attempts, with their last error."""
+        query = "SELECT id, topic, key, attempts, last_error FROM jobs WHERE state = ?"
+        args: tuple = (DEAD,)
+        if topic:
+            query += " AND topic = ?"
+            args += (topic,)
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+        names = ("id", "topic", "key", "attempts", "last_error")
+        return [dict(zip(names, row)) for row in rows]
+
+    def retry_dead(self, job_id: int) -> bool:
+        """Put a dead-lettered job back on its topic with a fresh attempt count."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, available_at = ? WHERE id = ? AND state = ?",
+                (READY, time.time(), job_id, DEAD)
+            )
+        return cursor.rowcount > 0
+
+    def depth(self, topic: str) -> Dict[str, int]:
+        """Number of jobs of ``topic`` per state; also published as gauges."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE topic = ? GROUP BY state", (topic,)
+            ).fetchall()
+        counts = {state: 0 for state in (READY, LEASED, DEAD)}
+        counts.update(dict(rows))
+        for state, count in counts.items():
+            metrics.set_gauge(f"workqueue.{topic}.{state}", count)
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class TopicConsumer:
+    """Adapts one topic of a WorkQueue to the ``get`` interface WorkerPool drains."""
+
+    def __init__(self, queue: WorkQueue, topic: str, visibility: float = WORK_VISIBILITY_TIMEOUT):
+        self.queue = queue
+        self.name = topic
+        self.visibility = visibility
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Job]:
+        return self.queue.wait_claim(self.name, timeout or 0, visibility=self.visibility)
+
+    def get_nowait(self) -> Optional[Job]:
+        return self.queue.claim(self.name, visibility=self.visibility)
+
+
+_queues: Dict[Path, WorkQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_work_queue(path: PathLike = VAULT_QUEUE_PATH) -> WorkQueue:
+    """Return the per-process work queue stored at ``path``."""
+    path = Path(os.path.abspath(path))
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = WorkQueue(path)
+        return _queues[path]
@@ -1,37 +1,47 @@
-import time
 from pathlib import Path
 from agent_skills.file_skills.read_md import read_md
-from agent_skills.file_skills.write_md import write_md
-from agent_skills.ai_skills.plan_email import plan_email
+from agent_skills.ai_skills.plan_email import plan_complete, plan_email, plan_path_for
+from agent_skills.vault import VaultScheduler
 
 VAULT = Path("../AI_Employee_Vault")
 NEEDS_ACTION = VAULT / "Needs_Action"
 
-def run_brain():
-    print("Brain loop started. Watching for new emails in vault...")
-    while True:
-        for item_path in NEEDS_ACTION.iterdir():
-            if not item_path.is_file() or item_path.suffix != ".md" or item_path.name.startswith("PLAN_"):
-                continue
+def plan_item(item_path: Path, index) -> bool:
+    # Check if a plan already exists for this item (fused triage in
+    # watcher.py writes it before moving the item here). A plan left
+    # half-written by a failed or interrupted run is generated again.
+    plan_path = plan_path_for(item_path)
+    if plan_complete(plan_path):
+        return True
 
-            # Check if a plan already exists for this item
-            plan_path = NEEDS_ACTION / f"PLAN_{item_path.stem}.md" # Use stem to be more general
-            if plan_path.exists():
-                continue
+    print(f"Processing new item for planning: {item_path.name}")
+    text = read_md(item_path)
+    
+    print("Requesting plan from Claude...")
+    # Sections stream into plan_path, which gets the finished plan at the end
+    plan = plan_email(text, out_path=plan_path) # Assuming plan_email can handle general text
+    index.refresh(plan_path)
+    if not plan:
+        # Fail the job so the work queue retries it with backoff
+        print(f"ERROR: No plan produced for {item_path.name}")
+        return False
+    print(f"Plan saved to {plan_path.name}")
 
-            print(f"Processing new item for planning: {item_path.name}")
-            text = read_md(item_path)
-            
-            print("Requesting plan from Claude...")
-            plan = plan_email(text) # Assuming plan_email can handle general text
-            
-            write_md(plan_path, plan)
-            print(f"Plan saved to {plan_path.name}")
+    # Optionally, mark the original item as processed or move it to a 'planned' subfolder
+    # For now, we'll just create the plan.
+    return True
 
-            # Optionally, mark the original item as processed or move it to a 'planned' subfolder
-            # For now, we'll just create the plan.
+def add_planning_stage(scheduler: VaultScheduler) -> None:
+    scheduler.add_stage(
+        "planning", lambda path: plan_item(path, scheduler.index),
+        folder="Needs_Action", suffix=".md", exclude_prefix=("PLAN_",)
+    )
 
-        time.sleep(60)
+def run_brain():
+    print("Brain loop started. Watching for new emails in vault...")
+    scheduler = VaultScheduler(VAULT)
+    add_planning_stage(scheduler)
+    scheduler.run_forever()
 
 if __name__ == "__main__":
     run_brain()
@@ -0,0 +1,127 @@
+"""Runs N sender workers as local processes against one temp vault and checks
+that every approved draft is "sent" exactly once.
+
+Each worker stands in for a separate host: it has its own index, journal and
+work queue and shares only the vault directory (and its .leases folder) with
+the others. Sending is simulated by appending a line to sent.log.
+
+    python scripts/lease_harness.py --workers 4 --drafts 50
+    python scripts/lease_harness.py --workers 4 --drafts 50 --crash
+
+With --crash the first worker is killed mid-run; its leases must expire and
+the other workers must pick up its drafts. A draft it had already sent but not
+yet archived when it died may legitimately be sent once more (that window is
+reported separately and is the only duplicate tolerated).
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+
+
+def run_worker(number: int, vault: Path, run_dir: Path, ttl: float, max_delay: float, deadline: float):
+    # Settings are read at import time, so configure before importing the vault package
+    os.environ["LEASE_TTL"] = str(ttl)
+    os.environ["WORK_BACKOFF_BASE"] = "0.2"
+    sys.path.insert(0, str(PROJECT_DIR))
+    from agent_skills.vault.index import VaultIndex
+    from agent_skills.vault.journal import VaultJournal
+    from agent_skills.vault.lease import assert_held, current
+    from agent_skills.vault.scheduler import VaultScheduler
+    from agent_skills.vault.workqueue import WorkQueue
+
+    state = run_dir / f"worker{number}"
+    state.mkdir()
+    index = VaultIndex(vault, state / "index.sqlite3")
+    scheduler = VaultScheduler(
+        vault, index, VaultJournal(state / "journal.sqlite3"), WorkQueue(state / "queue.sqlite3")
+    )
+    drafts, done = vault / "Drafts", vault / "Done"
+
+    def send(path: Path):
+        time.sleep(random.uniform(0, max_delay))
+        assert_held()
+        with open(run_dir / "sent.log", "a", encoding="utf-8") as f:
+            f.write(f"{path.name} {number} {current().token}\n")
+        path.rename(done / path.name)
+        index.refresh(path, done / path.name)
+
+    scheduler.add_stage(
+        "sending", send, exclusive=True,
+        folder="Drafts", status="approved", prefix="DRAFT_EMAIL_", suffix=".md"
+    )
+    scheduler.start()
+    while time.time() < deadline and any(drafts.iterdir()):
+        time.sleep(0.2)
+        scheduler.rescan()
+    scheduler.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--drafts", type=int, default=50)
+    parser.add_argument("--ttl", type=float, default=3.0, help="lease TTL in seconds")
+    parser.add_argument("--max-delay", type=float, default=0.2, help="longest simulated send")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--crash", action="store_true", help="kill the first worker mid-run")
+    args = parser.parse_args()
+
+    run_dir = Path(tempfile.mkdtemp(prefix="lease_harness_"))
+    vault = run_dir / "vault"
+    (vault / "Drafts").mkdir(parents=True)
+    (vault / "Done").mkdir()
+    for i in range(args.drafts):
+        (vault / "Drafts" / f"DRAFT_EMAIL_{i:05d}.md").write_text(
+            f"---\nstatus: approved\nrecipient: user{i}@example.com\nsubject: Test {i}\n---\n\nBody {i}\n",
+            encoding="utf-8"
+        )
+
+    started = time.time()
+    deadline = started + args.timeout
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=run_worker, args=(n, vault, run_dir, args.ttl, args.max_delay, deadline))
+        for n in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    if args.crash:
+        time.sleep(max(1.0, args.ttl / 2))
+        workers[0].kill()
+        print("Killed worker 0")
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - started
+
+    log = run_dir / "sent.log"
+    lines = [line.split() for line in log.read_text(encoding="utf-8").splitlines()] if log.exists() else []
+    sends = Counter(name for name, _, _ in lines)
+    per_worker = Counter(worker for _, worker, _ in lines)
+    duplicates = {name: count for name, count in sends.items() if count > 1}
+    # Sent by the killed worker and then again by another: the tolerated crash window
+    crash_window = {
+        name for name in duplicates
+        if args.crash and [w for n, w, _ in lines if n == name][0] == "0" and duplicates[name] == 2
+    }
+    unsent = [p.name for p in (vault / "Drafts").iterdir()]
+
+    print(f"{len(sends)}/{args.drafts} drafts sent by {args.workers} workers in {elapsed:.1f}s")
+    print(f"Sends per worker: {dict(sorted(per_worker.items()))}")
+    print(f"Duplicates: {len(duplicates)} (crash window: {len(crash_window)}); unsent: {len(unsent)}")
+    print(f"Run directory: {run_dir}")
+    ok = not unsent and set(duplicates) <= crash_window and len(crash_window) <= 1
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,69 @@
 import time
 import os
-import re
 from pathlib import Path
 from agent_skills.file_skills.read_md import read_md
-from agent_skills.file_skills.write_md import write_md
+from agent_skills.file_skills.frontmatter import set_status, split_body
 from agent_skills.ai_skills.send_email_direct import send_email_direct
+from agent_skills.vault import VaultScheduler
+from agent_skills.vault.lease import assert_held
 
 VAULT = Path("../AI_Employee_Vault")
 DRAFTS_PATH = VAULT / "Drafts"
 DONE_PATH = VAULT / "Done"
 
 def parse_email_file(content: str):
-    # Extract metadata using regex
-    meta_match = re.search(r'---\s*(.*?)\s*---', content, re.DOTALL)
-    if not meta_match:
+    fm, body = split_body(content)
+    if not fm.present:
         return None, None, None, None
+    return fm.status, fm.recipient, fm.subject, body.strip()
 
-    metadata = {}
-    for line in meta_match.group(1).split('\n'):
-        if ':' in line:
-            key, val = line.split(':', 1)
-            metadata[key.strip().lower()] = val.strip()
+def send_draft(draft_path: Path, index) -> bool:
+    """Sends one approved draft; returns False if it should be retried later."""
+    try:
+        content = read_md(draft_path)
+        status, recipient, subject, body = parse_email_file(content)
+        print(f"DEBUG: Processing {draft_path.name} - Status: {status}, Recipient: {recipient}", flush=True)
 
-    # Extract body (everything after the second ---)
-    parts = content.split('---')
-    body = parts[2].strip() if len(parts) > 2 else ""
+        if status == "approved" and recipient and body:
+            print(f"[{time.strftime('%H:%M:%S')}] Detected approved draft to send email to {recipient}", flush=True)
+            
+            # Never send on a lease another instance has taken over
+            assert_held()
+            success = send_email_direct(recipient, subject or "(No Subject)", body)
+            
+            if success:
+                print(f"SUCCESS: Email sent to {recipient}", flush=True)
+                # Move to Done folder
+                DONE_PATH.mkdir(exist_ok=True)
+                draft_path.rename(DONE_PATH / draft_path.name)
+                index.refresh(draft_path, DONE_PATH / draft_path.name)
+                print(f"Archived draft: {draft_path.name}", flush=True)
+            else:
+                print(f"FAILED: Could not send email to {recipient}", flush=True)
+                # Update status to failed (header only; the body is never touched)
+                set_status(draft_path, "failed")
+                index.refresh(draft_path)
+        return True
 
-    return metadata.get("status"), metadata.get("recipient"), metadata.get("subject"), body
+    except Exception as e:
+        print(f"ERROR: Loop encountered an error processing {draft_path.name}: {e}", flush=True)
+        return False
 
-def run_sender():
-    print(f"Sender loop started. Monitoring {DRAFTS_PATH.absolute()} for approved drafts every 10s...", flush=True)
-    
-    while True:
-        # Ensure directories exist
-        DRAFTS_PATH.mkdir(exist_ok=True)
-        DONE_PATH.mkdir(exist_ok=True)
-
-        for draft_path in DRAFTS_PATH.glob("DRAFT_EMAIL_*.md"):
-            try:
-                content = read_md(draft_path)
-                status, recipient, subject, body = parse_email_file(content)
-                print(f"DEBUG: Processing {draft_path.name} - Status: {status}, Recipient: {recipient}", flush=True)
+def add_sending_stage(scheduler: VaultScheduler) -> None:
+    scheduler.add_stage(
+        "sending", lambda path: send_draft(path, scheduler.index), exclusive=True,
+        folder="Drafts", status="approved", prefix="DRAFT_EMAIL_", suffix=".md"
+    )
 
-                if status == "approved" and recipient and body:
-                    print(f"[{time.strftime('%H:%M:%S')}] Detected approved draft to send email to {recipient}", flush=True)
-                    
-                    success = send_email_direct(recipient, subject or "(No Subject)", body)
-                    
-                    if success:
-                        print(f"SUCCESS: Email sent to {recipient}", flush=True)
-                        # Move to Done folder
-                        draft_path.rename(DONE_PATH / draft_path.name)
-                        print(f"Archived draft: {draft_path.name}", flush=True)
-                    else:
-                        print(f"FAILED: Could not send email to {recipient}", flush=True)
-                        # Update status to failed
-                        new_content = content.replace("status: approved", "status: failed")
-                        write_md(draft_path, new_content)
-                
-            except Exception as e:
-                print(f"ERROR: Loop encountered an error processing {draft_path.name}: {e}", flush=True)
+def run_sender():
+    print(f"Sender loop started. Monitoring {DRAFTS_PATH.absolute()} for approved drafts...", flush=True)
+    # Ensure directories exist
+    DRAFTS_PATH.mkdir(exist_ok=True)
+    DONE_PATH.mkdir(exist_ok=True)
 
-        time.sleep(10)
+    scheduler = VaultScheduler(VAULT)
+    add_sending_stage(scheduler)
+    scheduler.run_forever()
 
 if __name__ == "__main__":
     run_sender()
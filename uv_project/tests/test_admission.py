@@ -0,0 +1,30 @@
+from agent_skills.llm.admission import AdmissionController
+
+
+def call(controller, latency, ok=True, key="triage:small"):
+    assert controller.acquire()
+    controller.release(latency, ok, key=key)
+
+
+def test_slow_skill_is_not_judged_against_another_skills_baseline():
+    controller = AdmissionController(3)
+    for _ in range(5):
+        call(controller, 1.0)
+    call(controller, 20.0, key="plan_email:large")
+    call(controller, 25.0, key="plan_email:large")
+    assert controller.limit == 3
+
+
+def test_slow_call_within_a_skill_halves_the_limit():
+    controller = AdmissionController(4)
+    call(controller, 1.0)
+    call(controller, 5.0)
+    assert controller.limit == 2
+
+
+def test_error_halves_and_success_recovers():
+    controller = AdmissionController(4, min_limit=1)
+    call(controller, 1.0, ok=False)
+    assert controller.limit == 2
+    call(controller, 1.0)
+    assert controller.limit == 2.5
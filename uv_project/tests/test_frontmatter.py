@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from agent_skills.file_skills import frontmatter
+from agent_skills.file_skills.frontmatter import parse_frontmatter, read_body, read_frontmatter, split_body
+
+NOTE = '---\ntype: email\nSubject: "Quarterly report"\nstatus: pending\n---\n\nBody line\n'
+
+
+def write(path, text):
+    path.write_bytes(text.encode("utf-8"))
+    return path
+
+
+def test_parse_lowercases_keys_and_unquotes_values():
+    fm = parse_frontmatter(NOTE)
+    assert fm.present
+    assert fm.fields == {"type": "email", "subject": "Quarterly report", "status": "pending"}
+    assert fm.subject == "Quarterly report"
+    assert NOTE[fm.body_offset:] == "\nBody line\n"
+
+
+def test_no_header_or_unterminated_header_is_absent():
+    assert not parse_frontmatter("just a note\n").present
+    assert not parse_frontmatter("---\nstatus: pending\nno closing fence\n").present
+    fm, body = split_body("plain body")
+    assert not fm.present and body == "plain body"
+
+
+def test_read_frontmatter_matches_parse_and_reads_the_body(tmp_path):
+    note = write(tmp_path / "note.md", "\ufeff" + NOTE)
+    fm = read_frontmatter(note)
+    assert fm.fields == parse_frontmatter(NOTE).fields
+    assert read_body(note, fm) == "\nBody line\n"
+
+
+def test_read_frontmatter_grows_the_read_for_long_headers(tmp_path, monkeypatch):
+    monkeypatch.setattr(frontmatter, "HEADER_READ_SIZE", 16)
+    fields = "".join(f"key{i}: value {i}\n" for i in range(50))
+    note = write(tmp_path / "note.md", f"---\n{fields}status: done\n---\nbody\n")
+    fm = read_frontmatter(note)
+    assert fm.status == "done"
+    assert fm.get("key49") == "value 49"
+    assert read_body(note, fm) == "body\n"
+
+
+def test_read_frontmatter_is_memoized_until_the_file_changes(tmp_path):
+    note = write(tmp_path / "note.md", NOTE)
+    first = read_frontmatter(note)
+    assert read_frontmatter(note) is first
+    write(note, NOTE.replace("pending", "approved"))
+    stat = os.stat(note)
+    os.utime(note, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert read_frontmatter(note).status == "approved"
+
+
+def test_missing_file_raises(tmp_path):
+    with pytest.raises(OSError):
+        read_frontmatter(tmp_path / "missing.md")
+
+
+def test_padded_status_is_overwritten_in_place(tmp_path):
+    note = write(tmp_path / "note.md", f"---\ntype: email\n{frontmatter.status_line('pending')}---\nBody\n")
+    inode = os.stat(note).st_ino
+    size = os.path.getsize(note)
+    assert frontmatter.set_status(note, "approved")
+    assert os.stat(note).st_ino == inode
+    assert os.path.getsize(note) == size
+    assert read_frontmatter(note).status == "approved"
+    assert read_body(note) == "Body\n"
+
+
+def test_status_without_room_rewrites_only_the_header(tmp_path):
+    body = "Body\r\n" * 1000
+    note = write(tmp_path / "note.md", f"---\r\ntype: email\r\nstatus: new\r\n---\r\n{body}")
+    assert not frontmatter.set_status(note, "awaiting_approval_from_a_human")
+    fm = read_frontmatter(note)
+    assert fm.status == "awaiting_approval_from_a_human"
+    assert fm.get("type") == "email"
+    assert read_body(note, fm) == body
+    # The rewrite pads the line, so the next change fits in place
+    assert frontmatter.set_status(note, "done")
+
+
+def test_status_is_added_to_notes_without_one(tmp_path):
+    note = write(tmp_path / "note.md", "---\ntype: email\n---\nBody\n")
+    assert not frontmatter.set_status(note, "done")
+    assert read_frontmatter(note).fields == {"status": "done", "type": "email"}
+
+    plain = write(tmp_path / "plain.md", "Just a body\n")
+    assert not frontmatter.set_status(plain, "done")
+    assert read_frontmatter(plain).status == "done"
+    assert read_body(plain) == "Just a body\n"
+
+
+def test_unterminated_header_is_refused(tmp_path):
+    text = "---\nstatus: pending\nno closing fence\n"
+    note = write(tmp_path / "note.md", text)
+    with pytest.raises(ValueError):
+        frontmatter.set_status(note, "done")
+    assert note.read_text() == text
+
+
+def test_status_key_in_the_body_is_left_alone(tmp_path):
+    note = write(tmp_path / "note.md", "---\ntype: email\n---\nstatus: not a header\n")
+    frontmatter.set_status(note, "done")
+    assert read_frontmatter(note).status == "done"
+    assert read_body(note) == "status: not a header\n"
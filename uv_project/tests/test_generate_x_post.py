@@ -0,0 +1,42 @@
+from agent_skills.ai_skills.generate_x_post import (
+    X_POST_MAX_CHARS, check_post, is_meta, parse_candidates, pick_best
+)
+
+
+def test_preamble_is_never_picked():
+    output = "Here are five punchy posts for you:\nShip small, ship daily.\nBuilt an AI employee today.\n"
+    best = pick_best(parse_candidates(output))
+    assert best is not None
+    assert best.text == "Built an AI employee today."
+
+
+def test_meta_lines_are_dropped():
+    output = "Sure! Here is what I came up with\nOption 1\nShip it.\nPost 2:\nKeep going.\nCandidates:"
+    assert [c.text for c in parse_candidates(output)] == ["Ship it.", "Keep going."]
+
+
+def test_json_array_is_parsed():
+    output = 'Posts below\n```json\n["Ship it.", "Ship it.", "Built a thing #ai"]\n```'
+    candidates = parse_candidates(output)
+    assert [c.text for c in candidates] == ["Ship it.", "Built a thing #ai"]
+    assert candidates[1].violations == ["hashtag"]
+
+
+def test_decoded_list_is_accepted():
+    assert [c.text for c in parse_candidates(['1. "Quoted post"', 42, ""])] == ["Quoted post"]
+
+
+def test_list_markers_and_quotes_are_stripped():
+    assert [c.text for c in parse_candidates('1. "First"\n- **Second**\n')] == ["First", "Second"]
+
+
+def test_pick_best_prefers_longest_valid():
+    candidates = parse_candidates("Short.\nA somewhat longer post.\n" + "x" * (X_POST_MAX_CHARS + 1))
+    assert pick_best(candidates).text == "A somewhat longer post."
+    assert pick_best(parse_candidates("#tag only")) is None
+
+
+def test_check_post_violations():
+    assert check_post("").violations == ["empty"]
+    assert "emoji" in check_post("Shipped \U0001F680").violations
+    assert not is_meta("Ship small, ship daily.")
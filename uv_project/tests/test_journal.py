@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from agent_skills.vault.journal import VaultJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    j = VaultJournal(tmp_path / "journal.sqlite3")
+    yield j
+    j.close()
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    directory = tmp_path / "Inbox"
+    directory.mkdir()
+    return directory
+
+
+def touch(path, ns_later=1_000_000_000):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + ns_later))
+
+
+def test_new_files_are_changed_and_recorded_ones_resume(journal, inbox):
+    (inbox / "a.md").write_text("alpha")
+    (inbox / "b.md").write_text("beta")
+    assert sorted(p.name for p in journal.diff("watcher", inbox).changed) == ["a.md", "b.md"]
+
+    journal.record("watcher", inbox / "a.md", "triaged", {"destination": "Done"})
+    diff = journal.diff("watcher", inbox)
+    assert [p.name for p in diff.changed] == ["b.md"]
+    [entry] = diff.unchanged
+    assert entry.stage == "triaged"
+    assert entry.data == {"destination": "Done"}
+
+
+def test_touched_file_with_same_content_stays_unchanged(journal, inbox):
+    note = inbox / "a.md"
+    note.write_text("alpha")
+    journal.record("watcher", note, "triaged")
+    touch(note)
+    assert len(journal.diff("watcher", inbox).unchanged) == 1
+    # The new mtime was taken over, so the next diff does not hash again
+    assert journal.get("watcher", note).mtime == os.stat(note).st_mtime
+
+
+def test_edited_file_is_changed(journal, inbox):
+    note = inbox / "a.md"
+    note.write_text("alpha")
+    journal.record("watcher", note, "triaged")
+    note.write_text("alphA")  # same size, different content
+    touch(note)
+    assert journal.diff("watcher", inbox).changed == [note]
+
+
+def test_entries_for_deleted_files_are_dropped(journal, inbox, tmp_path):
+    note = inbox / "a.md"
+    note.write_text("alpha")
+    journal.record("watcher", note, "triaged")
+    elsewhere = tmp_path / "Done"
+    elsewhere.mkdir()
+    (elsewhere / "b.md").write_text("beta")
+    journal.record("watcher", elsewhere / "b.md", "filed")
+    note.unlink()
+    assert journal.diff("watcher", inbox) == ([], [])
+    assert journal.get("watcher", note) is None
+    # Entries outside the scanned directory are left alone
+    assert journal.get("watcher", elsewhere / "b.md") is not None
+
+
+def test_scopes_and_suffix_are_separate(journal, inbox):
+    (inbox / "a.md").write_text("alpha")
+    (inbox / "a.tmp").write_text("partial")
+    journal.record("watcher", inbox / "a.md", "triaged")
+    assert [p.name for p in journal.diff("planner", inbox, ".md").changed] == ["a.md"]
+    assert journal.diff("watcher", inbox, ".md").changed == []
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from agent_skills.llm.cache import LLMCache, model_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = LLMCache(tmp_path / "cache.sqlite3", max_bytes=10_000, ttl=60)
+    yield c
+    c.close()
+
+
+def test_hit_after_compute(cache):
+    calls = []
+    compute = lambda: calls.append(1) or {"category": "email"}
+    assert cache.get_or_compute("triage", "1", "body", compute, model="m") == {"category": "email"}
+    assert cache.get_or_compute("triage", "1", "body", compute, model="m") == {"category": "email"}
+    assert len(calls) == 1
+
+
+def test_model_and_version_are_part_of_the_key(cache):
+    cache.store("triage", "1", "body", "small answer", model="ccr|small-model")
+    assert cache.peek("triage", "1", "body", model="ccr|small-model") == "small answer"
+    assert cache.peek("triage", "1", "body", model="ccr|large-model") is None
+    assert cache.peek("triage", "2", "body", model="ccr|small-model") is None
+
+
+def test_expired_entry_is_a_miss(tmp_path):
+    c = LLMCache(tmp_path / "cache.sqlite3", ttl=0.05)
+    c.store("triage", "1", "body", "old", model="m")
+    time.sleep(0.1)
+    assert c.peek("triage", "1", "body", model="m") is None
+    c.close()
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    c = LLMCache(tmp_path / "cache.sqlite3", max_bytes=25)  # room for two 10-byte values
+    c.store("x_post", "1", "a", "a" * 8, model="m")
+    time.sleep(0.01)
+    c.store("x_post", "1", "b", "b" * 8, model="m")
+    time.sleep(0.01)
+    assert c.peek("x_post", "1", "a", model="m") is not None  # "a" is now the fresher one
+    time.sleep(0.01)
+    c.store("x_post", "1", "c", "c" * 8, model="m")
+    assert c.peek("x_post", "1", "a", model="m") is not None
+    assert c.peek("x_post", "1", "b", model="m") is None
+    assert c.peek("x_post", "1", "c", model="m") is not None
+    c.close()
+
+
+def test_concurrent_misses_share_one_computation(cache):
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            cache.get_or_compute("plan_email", "1", "body", compute, model="m")
+        ))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls == [1]
+    assert results == ["answer"] * 4
+
+
+def test_failed_computation_is_not_cached(cache):
+    def fail():
+        raise RuntimeError("backend down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("triage", "1", "body", fail, model="m")
+    assert cache.get_or_compute("triage", "1", "body", lambda: "ok", model="m") == "ok"
+
+
+def test_model_key_follows_the_routed_tier(monkeypatch):
+    class Executor:
+        model_id = "ccr:default"
+
+    monkeypatch.setattr("agent_skills.llm.executor.get_executor", lambda: Executor())
+    monkeypatch.setenv("LLM_MODEL_SMALL", "small-model")
+    monkeypatch.setenv("LLM_MODEL_LARGE", "large-model")
+    assert model_key("triage") == "ccr:default|small-model"
+    assert model_key("plan_email") == "ccr:default|large-model"
+    assert model_key("plan_email", "low") == "ccr:default|small-model"
+    monkeypatch.setenv("LLM_MODEL_SMALL", "other-small-model")
+    assert model_key("triage") == "ccr:default|other-small-model"
@@ -0,0 +1,88 @@
+import pytest
+
+from agent_skills.ai_skills import plan_email as plan_module
+from agent_skills.ai_skills.plan_email import plan_complete
+from agent_skills.file_skills.frontmatter import read_frontmatter
+from agent_skills.llm import LLMBackendError
+from agent_skills.llm.cache import _NullCache
+
+PLAN = [
+    "1. **Intent**: Renew the contract\n",
+    "2. **Proposed Action**: Reply with the signed copy\n",
+    "3. **Draft Response**: Hi Alice, attached.\n",
+    "status: awaiting_approval\n",
+    "Anything else I can help with?\n",
+]
+
+
+class FakeStream:
+    def __init__(self, chunks, seen):
+        self.chunks = chunks
+        self.seen = seen
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield chunk
+            self.seen.append(chunk)
+
+
+def fake_llm(monkeypatch, chunks):
+    seen = []
+    monkeypatch.setattr(plan_module, "get_cache", lambda: _NullCache())
+    monkeypatch.setattr(plan_module, "stream", lambda *args, **kwargs: FakeStream(chunks, seen))
+    return seen
+
+
+def test_generation_stops_at_the_status_line(tmp_path, monkeypatch):
+    seen = fake_llm(monkeypatch, PLAN)
+    out = tmp_path / "PLAN_a.md"
+    plan = plan_module.plan_email("subject: Contract\n\nPlease renew.", out)
+    assert plan.endswith("status: awaiting_approval")
+    assert "Anything else" not in plan
+    assert len(seen) == 3  # nothing was pulled after the status chunk
+    assert out.read_text() == plan
+    assert plan_complete(out)
+
+
+def test_partial_plan_is_marked_as_generating(tmp_path, monkeypatch):
+    out = tmp_path / "PLAN_a.md"
+    states = []
+
+    class Watching(FakeStream):
+        def __iter__(self):
+            for chunk in super().__iter__():
+                states.append((out.exists(), plan_complete(out)))
+                yield chunk
+
+    monkeypatch.setattr(plan_module, "get_cache", lambda: _NullCache())
+    monkeypatch.setattr(plan_module, "stream", lambda *args, **kwargs: Watching(PLAN, []))
+    plan_module.plan_email("subject: Contract", out)
+    assert any(exists for exists, _ in states)
+    assert not any(complete for _, complete in states)
+
+
+def test_cut_off_plan_is_removed(tmp_path, monkeypatch):
+    fake_llm(monkeypatch, PLAN[:3])
+    out = tmp_path / "PLAN_a.md"
+    assert plan_module.plan_email("subject: Contract", out) == ""
+    assert not out.exists()
+
+
+def test_in_progress_marker_reads_as_generating(tmp_path):
+    out = tmp_path / "PLAN_a.md"
+    out.write_text(plan_module.in_progress("1. **Intent**: ..."))
+    assert read_frontmatter(out).status == plan_module.GENERATING_STATUS
+    assert not plan_complete(out)
+    assert not plan_complete(tmp_path / "missing.md")
+
+
+def test_empty_output_is_a_backend_error(monkeypatch):
+    fake_llm(monkeypatch, [" \n"])
+    with pytest.raises(LLMBackendError, match="empty"):
+        plan_module.stream_plan("prompt", [])
@@ -0,0 +1,58 @@
+import json
+import time
+
+from agent_skills.ai_skills import preclassifier
+from agent_skills.ai_skills.preclassifier import PreClassifier
+
+
+def note(i):
+    return f"---\ntype: email\n---\nsubject: invoice {i}\nplease pay invoice {i}\n"
+
+
+def test_same_content_is_learned_once(tmp_path):
+    model = PreClassifier(tmp_path / "model.json")
+    assert model.learn(note(1), {"destination": "Done"})
+    assert not model.learn(note(1), {"destination": "Done"})
+    assert model.heads["destination"].n_docs == 1
+
+
+def test_seen_digests_are_capped_oldest_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(preclassifier, "PRECLASSIFIER_MAX_SEEN", 3)
+    model = PreClassifier(tmp_path / "model.json")
+    for i in range(3):
+        model.learn(note(i), {"destination": "Done"})
+    model.learn(note(0), {"destination": "Done"})  # seen again: now the freshest
+    model.learn(note(3), {"destination": "Done"})
+    assert len(model.seen) == 3
+    assert not model.learn(note(0), {"destination": "Done"})
+    assert model.learn(note(1), {"destination": "Done"})  # the one that was dropped
+
+
+def test_vault_scan_forgets_removed_notes(tmp_path):
+    vault = tmp_path / "vault"
+    (vault / "Done").mkdir(parents=True)
+    for i in range(3):
+        (vault / "Done" / f"EMAIL_{i}.md").write_text(note(i))
+    model = PreClassifier(tmp_path / "model.json")
+    assert model.train_from_vault(vault) == 3
+    assert len(model.files) == 3
+    (vault / "Done" / "EMAIL_0.md").unlink()
+    assert model.train_from_vault(vault) == 0
+    assert len(model.files) == 2
+
+
+def test_save_runs_in_the_background_and_round_trips(tmp_path, monkeypatch):
+    monkeypatch.setattr(preclassifier, "SAVE_INTERVAL", 0)
+    path = tmp_path / "model.json"
+    model = PreClassifier(path)
+    model.learn(note(1), {"destination": "Needs_Action", "priority": "high"})
+    for _ in range(100):
+        if path.exists() and not model._saving:
+            break
+        time.sleep(0.01)
+    data = json.loads(path.read_text())
+    assert data["version"] == preclassifier.MODEL_VERSION
+    assert len(data["seen"]) == 1
+    reloaded = PreClassifier(path)
+    assert not reloaded.learn(note(1), {"destination": "Done"})
+    assert reloaded.heads["priority"].docs == {"high": 1}
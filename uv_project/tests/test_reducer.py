@@ -0,0 +1,50 @@
+from agent_skills.llm.reducer import TRUNCATION_MARKER, estimate_tokens, fit_to_budget, reduce_content
+
+HEADER = "---\ntype: email\nfrom: alice@example.com\nsubject: Contract renewal\n---\n"
+
+
+def test_frontmatter_is_kept_verbatim():
+    reduced = reduce_content(HEADER + "Can we renew the contract?\n", "triage")
+    assert reduced.text.startswith(HEADER)
+    assert reduced.text.endswith("Can we renew the contract?")
+
+
+def test_quoted_chain_signature_and_footer_are_dropped():
+    body = (
+        "Hi Bob,\r\n\r\nPlease send the signed contract by Friday.\r\n\r\n"
+        + "The scope is unchanged from last year.\r\n" * 6
+        + "Thanks,\r\nAlice\r\n\r\n"
+        "On Mon, 3 Mar 2025 at 10:00, Bob <bob@example.com> wrote:\r\n"
+        "> Shall we renew?\r\n> Bob\r\n"
+    )
+    newsletter = (
+        "Big news this week.\n" * 5
+        + "You are receiving this because you subscribed.\nUnsubscribe here.\n"
+    )
+    reduced = reduce_content(HEADER + body, "plan_email").text
+    assert "Please send the signed contract by Friday." in reduced
+    assert "wrote:" not in reduced and "Shall we renew" not in reduced
+    assert "Thanks," not in reduced and "\r" not in reduced
+    assert "Unsubscribe" not in reduce_content(newsletter, "triage").text
+
+
+def test_html_is_flattened_to_text():
+    text = "<html><head><style>p {}</style></head><body><p>Hello &amp; welcome</p><br>Bye</body></html>"
+    reduced = reduce_content(text, "triage").text
+    assert reduced.split() == ["Hello", "&", "welcome", "Bye"]
+    assert "<" not in reduced and "p {}" not in reduced
+
+
+def test_long_body_is_cut_to_the_skill_budget():
+    body = "\n".join(f"Line {i} with a few more words to pay for" for i in range(500))
+    reduced = reduce_content(HEADER + body, "triage")
+    assert reduced.text.endswith(TRUNCATION_MARKER)
+    assert reduced.reduced_tokens <= 500 + estimate_tokens(TRUNCATION_MARKER)
+    assert reduced.tokens_saved > 0 and reduced.bytes_saved > 0
+
+
+def test_short_text_is_left_alone():
+    assert fit_to_budget("short note", 50) == "short note"
+    reduced = reduce_content("short note", "x_post")
+    assert reduced.text == "short note"
+    assert reduced.bytes_saved == 0
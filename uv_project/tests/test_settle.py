@@ -0,0 +1,85 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from agent_skills.vault.settle import SettleTracker
+
+
+@pytest.fixture
+def settled():
+    emitted = queue.Queue()
+    threads = []
+
+    def emit(path):
+        threads.append(threading.current_thread().name)
+        emitted.put(path)
+
+    tracker = SettleTracker(emit, quiet=0.2, poll=0.02, name="test_settle")
+    return tracker, emitted, threads
+
+
+def collect(emitted, wait):
+    deadline = time.monotonic() + wait
+    paths = []
+    while time.monotonic() < deadline:
+        try:
+            paths.append(emitted.get(timeout=max(0.0, deadline - time.monotonic())))
+        except queue.Empty:
+            break
+    return paths
+
+
+def test_burst_of_writes_is_emitted_once_after_it_settles(tmp_path, settled):
+    tracker, emitted, threads = settled
+    note = tmp_path / "a.md"
+    with open(note, "w") as f:
+        for i in range(5):
+            f.write(f"line {i}\n")
+            f.flush()
+            tracker.touch(note)
+            time.sleep(0.05)
+        # Still being written: nothing may be handed on yet
+        assert emitted.empty()
+    assert collect(emitted, 1.0) == [str(note)]
+    assert threads == ["test_settle-tracker"]
+
+
+def test_close_write_emits_without_the_quiet_period(tmp_path, settled):
+    tracker, emitted, _ = settled
+    note = tmp_path / "a.md"
+    note.write_text("done")
+    tracker.touch(note)
+    tracker.closed(note)
+    assert emitted.get(timeout=0.15) == str(note)
+    assert collect(emitted, 0.4) == []
+
+
+def test_deleted_or_moved_away_paths_are_dropped(tmp_path, settled):
+    tracker, emitted, _ = settled
+    gone, moved, target = tmp_path / "gone.md", tmp_path / "moved.md", tmp_path / "target.md"
+    for path in (gone, moved):
+        path.write_text("x")
+        tracker.touch(path)
+    gone.unlink()
+    moved.rename(target)
+    tracker.moved(moved, target)
+    assert collect(emitted, 0.6) == [str(target)]
+
+
+def test_failing_emit_does_not_stop_the_tracker(tmp_path):
+    emitted = queue.Queue()
+
+    def emit(path):
+        if path.endswith("bad.md"):
+            raise RuntimeError("boom")
+        emitted.put(path)
+
+    tracker = SettleTracker(emit, quiet=0.05, poll=0.02, name="test_settle")
+    for name in ("bad.md", "good.md"):
+        (tmp_path / name).write_text("x")
+        tracker.touch(tmp_path / name)
+        tracker.closed(tmp_path / name)
+        time.sleep(0.05)
+    assert collect(emitted, 0.5) == [str(tmp_path / "good.md")]
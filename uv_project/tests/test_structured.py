@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+
+import pytest
+
+from agent_skills.llm import LLMParseError, SchemaError, validate
+from agent_skills.llm.backends import Backend
+from agent_skills.llm.executor import LLMExecutor
+
+SCHEMA = {
+    "type": "object",
+    "required": ["category", "priority"],
+    "properties": {
+        "category": {"type": "string"},
+        "priority": {"type": "string", "enum": ["low", "medium", "high"]},
+        "action_needed": {"type": "boolean"},
+    },
+}
+
+
+class ScriptedBackend(Backend):
+    """Answers with the next scripted reply and records every prompt."""
+
+    name = "scripted"
+
+    def __init__(self, replies, prompts):
+        self.replies = replies
+        self.prompts = prompts
+
+    def complete(self, request):
+        self.prompts.append(request)
+        return self.replies.pop(0)
+
+
+@pytest.fixture
+def run():
+    executors = []
+
+    def run(replies, **kwargs):
+        prompts = []
+        executor = LLMExecutor(lambda: ScriptedBackend(list(replies), prompts), pool_size=1, model_id="test")
+        executors.append(executor)
+        return executor.structured("classify this", SCHEMA, skill="triage", **kwargs), prompts
+
+    yield run
+    for executor in executors:
+        executor.shutdown()
+
+
+def test_validate_reports_every_problem():
+    errors = validate({"priority": "urgent", "action_needed": "yes"}, SCHEMA)
+    assert errors == [
+        "$: missing required field 'category'",
+        "$.priority: 'urgent' is not one of ['low', 'medium', 'high']",
+        "$.action_needed: expected boolean, got str",
+    ]
+    assert validate(True, {"type": "integer"}) == ["$: expected integer, got bool"]
+    assert validate([1, "2"], {"type": "array", "items": {"type": "integer"}}) == ["$[1]: expected integer, got str"]
+
+
+def test_valid_answer_needs_one_call(run):
+    value, prompts = run(['Sure! {"category": "Email", "priority": "low"}'])
+    assert value == {"category": "Email", "priority": "low"}
+    assert len(prompts) == 1
+
+
+def test_invalid_answer_is_repaired_once(run):
+    value, prompts = run([
+        '{"category": "Email", "priority": "urgent"}',
+        '{"category": "Email", "priority": "high"}',
+    ])
+    assert value == {"category": "Email", "priority": "high"}
+    assert len(prompts) == 2
+    repair = prompts[1]
+    assert repair.skill == "triage_repair"
+    assert "'urgent' is not one of" in repair.prompt
+    assert '"priority": "urgent"' in repair.prompt
+
+
+def test_second_invalid_answer_raises(run):
+    with pytest.raises(SchemaError) as info:
+        run(['{"category": "Email"}', '{"priority": "low"}'])
+    assert "missing required field 'category'" in str(info.value)
+    with pytest.raises(LLMParseError):
+        run(["no json here", "still no json"])
+
+
+def test_answer_is_built_into_a_dataclass(run):
+    @dataclass
+    class Verdict:
+        category: str
+        priority: str
+
+    value, _ = run(['{"category": "Email", "priority": "low", "extra": 1}'], into=Verdict)
+    assert value == Verdict("Email", "low")
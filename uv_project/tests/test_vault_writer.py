@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from agent_skills.file_skills import vault_writer
+from agent_skills.file_skills.vault_writer import GroupCommitter, atomic_write, is_temp_file, open_atomic
+
+
+@pytest.fixture
+def synced(monkeypatch):
+    """Record every fsync as ("data", fd) or ("path", path) instead of making it."""
+    calls = []
+    monkeypatch.setattr(vault_writer, "_fdatasync", lambda fd: calls.append(("data", fd)))
+    monkeypatch.setattr(vault_writer, "_fsync_path", lambda path: calls.append(("path", path)))
+    committer = GroupCommitter(60)
+    monkeypatch.setattr(vault_writer, "_committer", committer)
+    return calls, committer
+
+
+def test_group_mode_syncs_data_before_the_rename(tmp_path, synced):
+    calls, committer = synced
+    note = tmp_path / "note.md"
+    atomic_write(note, "hello", durability="group")
+    assert note.read_text() == "hello"
+    assert [kind for kind, _ in calls] == ["data"]
+    # Only the directory is left for the group commit
+    assert committer.flush() == 1
+    assert calls[-1] == ("path", tmp_path)
+
+
+def test_group_commit_fsyncs_each_directory_once(tmp_path, synced):
+    calls, committer = synced
+    for i in range(5):
+        atomic_write(tmp_path / f"{i}.md", str(i), durability="group")
+    committer.flush()
+    assert [c for c in calls if c[0] == "path"] == [("path", tmp_path)]
+
+
+def test_in_place_change_batches_the_file_fsync(tmp_path, synced):
+    calls, committer = synced
+    note = tmp_path / "note.md"
+    note.write_text("x")
+    vault_writer.commit(note, durability="group")
+    assert calls == []
+    assert committer.flush() == 2
+    assert ("path", note) in calls and ("path", tmp_path) in calls
+
+
+def test_failed_write_leaves_the_note_untouched(tmp_path):
+    note = tmp_path / "note.md"
+    note.write_text("old")
+    with pytest.raises(RuntimeError):
+        with open_atomic(note, durability="none") as f:
+            f.write(b"partial")
+            raise RuntimeError("boom")
+    assert note.read_text() == "old"
+    assert not [p for p in os.listdir(tmp_path) if is_temp_file(p)]
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        atomic_write(tmp_path / "note.md", "x", durability="sometimes")
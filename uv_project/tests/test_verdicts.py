@@ -0,0 +1,39 @@
+import pytest
+
+from agent_skills.vault.verdicts import VerdictStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = VerdictStore(tmp_path / "verdicts.sqlite3")
+    yield s
+    s.close()
+
+
+def test_unknown_or_missing_digest_is_a_miss(store):
+    assert store.get("abc") is None
+    assert store.get(None) is None
+    store.put(None, {"destination": "Done"}, "a.md")
+    assert len(store) == 0
+
+
+def test_first_file_is_kept_and_copies_are_counted(store):
+    store.put("abc", {"destination": "Needs_Action"}, "/vault/Inbox/a.md")
+    store.put("abc", {"destination": "Done"}, "/vault/Inbox/b.md")
+    store.seen("abc")
+    known = store.get("abc")
+    assert known.verdict == {"destination": "Done"}
+    assert known.first_path == "a.md"
+    assert known.seen == 2
+
+
+def test_verdicts_survive_a_restart(tmp_path):
+    path = tmp_path / "verdicts.sqlite3"
+    store = VerdictStore(path)
+    store.put("abc", {"destination": "Done", "priority": "low"}, "a.md")
+    store.close()
+    reopened = VerdictStore(path)
+    assert reopened.get("abc").verdict == {"destination": "Done", "priority": "low"}
+    reopened.forget("abc")
+    assert reopened.get("abc") is None
+    reopened.close()
@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+from agent_skills.vault import workqueue
+from agent_skills.vault.workqueue import DEAD, WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(workqueue, "WORK_BACKOFF_BASE", 0.0)
+    q = WorkQueue(tmp_path / "queue.sqlite3")
+    yield q
+    q.close()
+
+
+def test_publish_is_deduplicated_until_completed(queue):
+    assert queue.publish("triage", "/vault/Inbox/a.md", "h1")
+    assert not queue.publish("triage", "/vault/Inbox/a.md", "h1")
+    assert queue.publish("triage", "/vault/Inbox/a.md", "h2")
+    assert queue.depth("triage")["ready"] == 2
+
+
+def test_completed_job_is_refused_until_reopened(queue):
+    queue.publish("triage", "/vault/Inbox/a.md", "h")
+    job = queue.claim("triage")
+    assert queue.complete(job)
+    assert not queue.publish("triage", "/vault/Inbox/a.md", "h")
+    assert queue.claim("triage") is None
+
+    assert queue.reopen("triage", "/vault/Inbox/a.md") == 1
+    assert queue.publish("triage", "/vault/Inbox/a.md", "h")
+    assert queue.claim("triage") is not None
+
+
+def test_complete_without_marker_and_retain(queue):
+    queue.publish("sending", "/vault/Drafts/a.md", "h")
+    assert queue.complete(queue.claim("sending"), remember=False)
+    assert queue.publish("sending", "/vault/Drafts/a.md", "h")
+    queue.complete(queue.claim("sending"))
+    assert queue.retain("sending", ["/vault/Drafts/other.md"]) == 1
+    assert queue.publish("sending", "/vault/Drafts/a.md", "h")
+
+
+def test_only_the_lease_holder_completes(queue):
+    queue.publish("sending", "/vault/Drafts/a.md", "h")
+    first = queue.claim("sending", owner="a", visibility=0.0)
+    second = queue.claim("sending", owner="b")
+    assert second.attempts == 2
+    assert not queue.complete(first)
+    assert queue.complete(second)
+
+
+def test_claim_order_follows_priority(queue):
+    queue.publish("triage", "/vault/Inbox/low.md", "h", priority=2)
+    queue.publish("triage", "/vault/Inbox/high.md", "h", priority=0)
+    assert queue.claim("triage").path.name == "high.md"
+
+
+def test_fail_retries_then_dead_letters(queue):
+    queue.publish("planning", "/vault/Needs_Action/a.md", "h")
+    for attempt in range(1, 3):
+        job = queue.claim("planning")
+        assert job.attempts == attempt
+        state = queue.fail(job, "boom", max_attempts=2)
+    assert state == DEAD
+    assert queue.claim("planning") is None
+    [dead] = queue.dead_letters("planning")
+    assert dead["last_error"] == "boom"
+    assert queue.retry_dead(dead["id"])
+    assert queue.claim("planning").attempts == 1
+
+
+def test_expired_lease_on_last_attempt_is_dead_lettered(queue):
+    queue.publish("execution", "/vault/Needs_Action/PLAN_a.md", "h")
+    for _ in range(2):
+        assert queue.claim("execution", visibility=0.0, max_attempts=2) is not None
+    # The worker "crashed" twice: the expired lease is not delivered a third time
+    assert queue.claim("execution", max_attempts=2) is None
+    assert queue.depth("execution")["dead"] == 1
+
+
+def test_defer_does_not_count_the_attempt(queue):
+    queue.publish("sending", "/vault/Drafts/a.md", "h")
+    job = queue.claim("sending")
+    assert queue.defer(job, 0.0)
+    assert queue.claim("sending").attempts == 1
+
+
+def test_keepalive_extends_the_lease(queue):
+    queue.publish("planning", "/vault/Needs_Action/a.md", "h")
+    job = queue.claim("planning", visibility=0.3)
+    with queue.keepalive([job], visibility=0.3):
+        time.sleep(0.6)
+        assert queue.claim("planning") is None
+    assert queue.complete(job)
+
+
+def test_prune_drops_old_markers(queue):
+    queue.publish("triage", "/vault/Inbox/a.md", "h")
+    queue.complete(queue.claim("triage"))
+    assert queue.prune(max_age=3600) == 0
+    assert queue.prune(max_age=0) == 1
+    assert queue.publish("triage", "/vault/Inbox/a.md", "h")
@@ -0,0 +1,32 @@
+"""
+Runs the planning, execution and sending stages in one process.
+
+Replaces running brain_loop.py, vault_worker.py and sender_loop.py side by
+side: one watchdog observer on the vault feeds all three stages, so a note
+moves from Needs_Action to a plan, a draft and a sent email as soon as each
+step's file appears or is approved.
+"""
+import logging
+from pathlib import Path
+
+from agent_skills.vault import VaultScheduler
+from brain_loop import add_planning_stage
+from sender_loop import add_sending_stage
+from vault_worker import VaultWorker
+
+VAULT = Path("../AI_Employee_Vault")
+
+def run_scheduler():
+    worker = VaultWorker(VAULT)
+    scheduler = VaultScheduler(VAULT, worker.index)
+    add_planning_stage(scheduler)
+    worker.add_execution_stage(scheduler)
+    add_sending_stage(scheduler)
+    print("Vault scheduler started: planning, execution and sending stages are live.", flush=True)
+    scheduler.run_forever()
+
+if __name__ == "__main__":
+    try:
+        run_scheduler()
+    except KeyboardInterrupt:
+        logging.info("Vault scheduler stopped by user.")
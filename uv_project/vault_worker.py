@@ -1,8 +1,9 @@
-import time
 import logging
 from pathlib import Path
 import yaml
 from agent_skills.ai_skills.draft_email import draft_email_from_plan
+from agent_skills.vault import VaultScheduler, get_index
+from agent_skills.vault.lease import assert_held
 
 # --- Logging Setup ---
 logging.basicConfig(
@@ -28,6 +29,8 @@ class VaultWorker:
         self.needs_action_path.mkdir(exist_ok=True)
         self.done_path.mkdir(exist_ok=True)
 
+        self.index = get_index(self.vault_path)
+
         logging.info("Vault Worker initialized.")
         logging.info(f"Watching: {self.needs_action_path}")
 
@@ -35,17 +38,8 @@ class VaultWorker:
         """
         Finds plan files in the Needs_Action directory that have been approved.
         """
-        approved_plans = []
-        for plan_path in self.needs_action_path.glob("PLAN_*.md"):
-            try:
-                with open(plan_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # A simple check for the status in the frontmatter
-                    if "status: approved" in content.split("---")[1]:
-                        approved_plans.append(plan_path)
-            except Exception as e:
-                logging.error(f"Error reading or parsing {plan_path}: {e}")
-        return approved_plans
+        self.index.sync()
+        return self.index.find(folder="Needs_Action", status="approved", prefix="PLAN_", suffix=".md")
 
     def parse_plan(self, plan_path):
         """
@@ -80,11 +74,13 @@ class VaultWorker:
 
             # Move plan file
             plan_path.rename(self.done_path / plan_path.name)
+            self.index.refresh(plan_path, self.done_path / plan_path.name)
             logging.info(f"Archived plan: {plan_path.name}")
 
             # Move source file if it exists
             if source_path.exists():
                 source_path.rename(self.done_path / source_path.name)
+                self.index.refresh(source_path, self.done_path / source_path.name)
                 logging.info(f"Archived source: {source_path.name}")
             else:
                 logging.warning(f"Source file not found for {plan_path.name}, only archived plan.")
@@ -92,39 +88,50 @@ class VaultWorker:
         except Exception as e:
             logging.error(f"Error during archiving of {plan_path.name}: {e}")
 
+    def process_plan(self, plan_path):
+        """
+        Executes the action of one approved plan and archives it on success.
+        Returns False if the plan still needs to be executed.
+        """
+        logging.info(f"Processing {plan_path.name}")
+        action, content = self.parse_plan(plan_path)
+
+        if action:
+            logging.info(f"Action found: {action}")
+            handler = self.dispatcher.get(action)
+            if handler:
+                # Another instance may have taken the plan over while we stalled
+                assert_held()
+                success = handler(content)
+                if success:
+                    logging.info(f"Successfully executed action: {action}")
+                    self.archive_completed_item(plan_path)
+                    return True
+                logging.error(f"Failed to execute action: {action}")
+                return False
+            else:
+                logging.warning(f"No handler found for action: {action}")
+        else:
+            logging.warning(f"No action found in {plan_path.name}")
+        return True
+
+    def add_execution_stage(self, scheduler):
+        """
+        Registers approved plans as the execution stage of ``scheduler``.
+        """
+        scheduler.add_stage(
+            "execution", self.process_plan, exclusive=True,
+            folder="Needs_Action", status="approved", prefix="PLAN_", suffix=".md"
+        )
+
     def run(self):
         """
-        The main loop for the worker.
+        The main loop for the worker: plans are executed as soon as they are approved.
         """
         logging.info("Vault Worker started. Press Ctrl+C to stop.")
-        while True:
-            logging.info("Checking for approved plans...")
-            approved_plans = self.find_approved_plans()
-
-            if not approved_plans:
-                logging.info("No approved plans found.")
-            else:
-                logging.info(f"Found {len(approved_plans)} approved plans.")
-                for plan_path in approved_plans:
-                    logging.info(f"Processing {plan_path.name}")
-                    action, content = self.parse_plan(plan_path)
-
-                    if action:
-                        logging.info(f"Action found: {action}")
-                        handler = self.dispatcher.get(action)
-                        if handler:
-                            success = handler(content)
-                            if success:
-                                logging.info(f"Successfully executed action: {action}")
-                                self.archive_completed_item(plan_path)
-                            else:
-                                logging.error(f"Failed to execute action: {action}")
-                        else:
-                            logging.warning(f"No handler found for action: {action}")
-                    else:
-                        logging.warning(f"No action found in {plan_path.name}")
-
-            time.sleep(30) # Wait for 30 seconds before the next check
+        scheduler = VaultScheduler(self.vault_path, self.index)
+        self.add_execution_stage(scheduler)
+        scheduler.run_forever()
 
 if __name__ == "__main__":
     try:
@@ -1,51 +1,242 @@
+import os
 import time
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import subprocess
 
 # Import your Agent Skills
-from agent_skills.file_skills.process_file import process_file_with_claude
+from agent_skills.file_skills.process_file import (
+    TRIAGE_BATCH_SIZE, process_file_with_claude, triage_files, unavailable_verdict, unreadable_verdict
+)
 from agent_skills.file_skills.write_vault import write_dashboard_entry
+from agent_skills.file_skills.write_md import write_md
+from agent_skills.ai_skills.plan_email import plan_path_for
+from agent_skills.vault.index import content_hash
+from agent_skills.vault.pool import WorkerPool
+from agent_skills.vault.settle import SettleTracker
+from agent_skills.vault.journal import get_journal
+from agent_skills.vault.verdicts import KnownVerdict, get_verdict_store
+from agent_skills.vault.workqueue import TopicConsumer, get_work_queue
+from agent_skills import metrics
 
+# Seconds to wait after the first new file so a burst can be triaged together
+BATCH_WINDOW = 0.5
+# Triage workers draining the triage topic of the work queue
+INBOX_WORKERS = int(os.environ.get("INBOX_WORKERS", "4"))
+# Lower is triaged first; anything not listed gets DEFAULT_INBOX_PRIORITY
+INBOX_PRIORITIES = {"EMAIL_": 0, "LINKEDIN_MESSAGE_": 1}
+DEFAULT_INBOX_PRIORITY = 2
+# Journal scope of files the watcher has queued or triaged
+JOURNAL_SCOPE = "inbox"
+# Work queue topics: the watcher consumes TRIAGE_TOPIC and feeds PLANNING_TOPIC
+TRIAGE_TOPIC = "triage"
+PLANNING_TOPIC = "planning"
 
 
+def inbox_priority(path) -> int:
+    name = Path(path).name
+    for prefix, priority in INBOX_PRIORITIES.items():
+        if name.startswith(prefix):
+            return priority
+    return DEFAULT_INBOX_PRIORITY
+
 
 class InboxHandler(FileSystemEventHandler):
-    def __init__(self, vault_path):
+    def __init__(self, vault_path, workers=INBOX_WORKERS):
         self.vault_path = Path(vault_path)
         self.inbox = self.vault_path / "Inbox"
         self.inbox.mkdir(exist_ok=True)
-    
+
+        # The observer thread only publishes paths; a pool of workers triages them
+        self.work = get_work_queue()
+        self.pool = WorkerPool(
+            TopicConsumer(self.work, TRIAGE_TOPIC), self.process_jobs,
+            workers=workers, batch_size=TRIAGE_BATCH_SIZE, batch_window=BATCH_WINDOW
+        )
+        self.settle = SettleTracker(self._queue, name="inbox.settle")
+        self.journal = get_journal()
+        self.verdicts = get_verdict_store()
+        self.pool.start()
+
+    def _wanted(self, path) -> bool:
+        path = Path(path)
+        return path.parent == self.inbox and not path.name.endswith((".tmp", ".swp"))
+
+    # Events only feed the settle tracker; a file is queued once it stops changing
     def on_created(self, event):
+        if not event.is_directory and self._wanted(event.src_path):
+            self.settle.touch(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory and self._wanted(event.src_path):
+            self.settle.touch(event.src_path)
+
+    def on_moved(self, event):
+        # Notes written by vault_writer, and editors' save-via-rename, arrive as moves
         if event.is_directory:
             return
-        if event.src_path.endswith((".tmp", ".swp")):
+        dest = event.dest_path if self._wanted(event.dest_path) else None
+        self.settle.moved(event.src_path, dest)
+
+    def on_closed(self, event):
+        if not event.is_directory and self._wanted(event.src_path):
+            self.settle.closed(event.src_path)
+
+    def on_deleted(self, event):
+        self.settle.discard(event.src_path)
+
+    def _queue(self, path):
+        entry = self.journal.record(JOURNAL_SCOPE, path, "queued")
+        if entry is None:
             return
+        # Triaged files are routed out of the Inbox before their job completes, so
+        # a settled file here is a new arrival (a re-drop, or moved back from Done)
+        self.work.reopen(TRIAGE_TOPIC, entry.path)
+        if not self.work.publish(TRIAGE_TOPIC, entry.path, entry.hash, priority=inbox_priority(path)):
+            print(f"DEBUG: {Path(path).name} is already queued for triage")
+
+    def resume(self):
+        """Pick up what arrived or was left half-done while the watcher was down.
+
+        One scandir pass over the Inbox is diffed against the journal: new or
+        changed files go through the settle stage, files already triaged are
+        routed with their journaled verdict, and the rest are queued again.
+        """
+        diff = self.journal.diff(JOURNAL_SCOPE, self.inbox)
+        self.work.prune()
+        for path in diff.changed:
+            if self._wanted(path):
+                self.settle.touch(path)
+        for entry in diff.unchanged:
+            if entry.stage == "triaged" and entry.data:
+                metrics.incr("inbox.resumed_triaged")
+                self.route(entry.path, entry.data)
+            else:
+                self._queue(entry.path)
+        print(f"Inbox resume: {len(diff.changed)} new or changed, {len(diff.unchanged)} in flight")
+
+    def process_jobs(self, jobs):
+        """Triage and route a batch of claimed jobs, completing each one exactly once."""
+        by_path = {str(job.path): job for job in jobs}
+        try:
+            # The dedupe key of a triage job is the hash taken when the file settled
+            with self.work.keepalive(jobs):
+                results = self.process_batch(list(by_path), {path: job.dedupe for path, job in by_path.items()})
+        except Exception as e:
+            for job in jobs:
+                self.work.fail(job, str(e))
+            raise
+        for path, job in by_path.items():
+            if path in results:
+                self.work.complete(job)
+            else:
+                self.work.fail(job, "not routed")
+
+    def process_batch(self, paths, hashes=None):
+        """Triage and route ``paths``; returns the verdict of every file that was routed.
+
+        A file whose content was triaged before (or that appears twice in the
+        batch) is routed with the earlier verdict instead of being analysed again.
+        """
+        hashes = dict(hashes or {})
+        known = {}       # path -> KnownVerdict it is a duplicate of
+        first_of = {}    # hash -> first path in this batch with that content
+        fresh = []
+        for path in paths:
+            if not hashes.get(path):
+                try:
+                    hashes[path] = content_hash(Path(path))
+                except OSError:
+                    hashes[path] = None
+            digest = hashes[path]
+            if digest in first_of:
+                continue
+            hit = self.verdicts.get(digest)
+            if hit is not None:
+                known[path] = hit
+            else:
+                fresh.append(path)
+                if digest:
+                    first_of[digest] = path
 
         # Analyze FIRST
-        result = process_file_with_claude(event.src_path)
-        
+        if len(fresh) > 1:
+            results = triage_files(fresh)
+        else:
+            results = {path: process_file_with_claude(path) for path in fresh}
+
+        fallbacks = (unavailable_verdict(), unreadable_verdict())
+        for path, result in results.items():
+            # A fallback says nothing about the content, so the next copy gets a real triage
+            if result not in fallbacks:
+                self.verdicts.put(hashes[path], result, path)
+        for path in paths:
+            first = first_of.get(hashes[path])
+            if first is not None and first != path and first in results:
+                known[path] = KnownVerdict(results[first], Path(first).name, 1)
+
+        routed = {}
+        for path in paths:
+            duplicate = known.get(path)
+            result = duplicate.verdict if duplicate else results.get(path)
+            if result is None:
+                continue
+            self.journal.record(JOURNAL_SCOPE, path, "triaged", result, hashes[path])
+            try:
+                self.route(path, result, duplicate_of=duplicate.first_path if duplicate else None)
+            except OSError as e:
+                print(f"ERROR: Could not route {path}: {e}")
+                continue
+            if duplicate:
+                metrics.incr("inbox.duplicates")
+                self.verdicts.seen(hashes[path])
+            routed[path] = result
+        return routed
+
+    def route(self, src_path, result, duplicate_of=None):
+        src = Path(src_path)
+        if not src.exists():
+            print(f"File disappeared before it could be moved: {src_path}")
+            self.journal.forget(JOURNAL_SCOPE, src_path)
+            return
+
         # Move based on decision
         if result['destination'] == 'Needs_Action':
-            dest = self.vault_path / "Needs_Action" / Path(event.src_path).name
+            dest = self.vault_path / "Needs_Action" / src.name
         else:
-            dest = self.vault_path / "Done" / Path(event.src_path).name
-        
+            dest = self.vault_path / "Done" / src.name
+
         dest.parent.mkdir(exist_ok=True)
-        
+
         # Remove existing file if it exists
         if dest.exists():
             dest.unlink()
-        
-        Path(event.src_path).rename(dest)
-        
+
+        # Fused triage already drafted the plan. Write it before the item lands in
+        # Needs_Action so brain_loop never sees the item without its plan.
+        plan = result.get('plan')
+        if plan and result['destination'] == 'Needs_Action':
+            plan_path = plan_path_for(dest)
+            write_md(plan_path, plan)
+            print(f"Plan saved to {plan_path.name}")
+
+        src.rename(dest)
+        self.journal.forget(JOURNAL_SCOPE, src_path)
+        if result['destination'] == 'Needs_Action':
+            # Hand the item straight to the planning stage
+            self.work.publish(PLANNING_TOPIC, dest, content_hash(dest))
+
         # Log it
-        write_dashboard_entry(self.vault_path, 
-            f"[{result['category']}] {dest.name}: {result['summary']} (Priority: {result['priority']})")
-        
+        if duplicate_of:
+            write_dashboard_entry(self.vault_path,
+                f"[Duplicate] {dest.name}: same content as {duplicate_of}, "
+                f"moved to {result['destination']} without re-analysis")
+        else:
+            write_dashboard_entry(self.vault_path,
+                f"[{result['category']}] {dest.name}: {result['summary']} (Priority: {result['priority']})")
+
         # Print to terminal
-        print(f"New file detected: {event.src_path} -> moved to {dest}")
+        print(f"New file detected: {src_path} -> moved to {dest}")
         print(f"  Category: {result['category']}, Priority: {result['priority']}, Action Needed: {result['action_needed']}")
 
 
@@ -54,6 +245,7 @@ def watch_inbox(vault_path):
     observer = Observer()
     observer.schedule(handler, str(handler.inbox), recursive=False)
     observer.start()
+    handler.resume()
 
     try:
         while True:
@@ -2,6 +2,7 @@ import time
 from pathlib import Path
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from agent_skills.file_skills.vault_writer import atomic_write
 
 VAULT = Path("../AI_Employee_Vault")
 INBOX = VAULT / "Inbox"
@@ -47,7 +48,7 @@ status: new
 {data.get('snippet')}
 """
                 path = INBOX / f"EMAIL_{msg['id']}.md"
-                path.write_text(content, encoding="utf-8")
+                atomic_write(path, content)
                 print(f"Saved email to {path.name}")
                 self.service.users().messages().modify(userId='me', id=msg['id'], body={'removeLabelIds': ['UNREAD']}).execute()
                 print(f"Marked email {msg['id']} as read.")
@@ -9,6 +9,8 @@ import hashlib
 from datetime import datetime
 from playwright.async_api import async_playwright
 
+from agent_skills.file_skills.vault_writer import atomic_write
+
 class LinkedInWatcher:
     """
     Watches LinkedIn for new activity, such as notifications and messages.
@@ -136,8 +138,7 @@ hash: {content_hash}
         
         content = frontmatter + "\n" + body
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        atomic_write(filepath, content)
         
         self.seen_ids.add(content_hash)
         print(f"Saved new item to {filepath}")